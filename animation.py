@@ -0,0 +1,163 @@
+# animation.py
+# 球幕（+ 房間框）轉台動畫 / 運鏡：N 個相機位置共用同一組幾何與 artist
+# 每個 worker 對同一幾何只建一次 figure（make_sphere_fig），之後每格只改 view_init / zoom 再 draw
+# 影格依順序切塊丟進 compare 的常駐 process pool，依序收回後邊收邊寫出（PNG 序列 / GIF / 影片）
+#
+# 註：show_height_dims 的標註是依單一視角投影後畫在 2D 上，動畫不適用
+import io
+import os
+import numpy as np
+from calculator import make_sphere_fig
+from compare import submit_all, iter_results
+from metrics import timed
+
+_FIG_CACHE = {}
+_FIG_CACHE_MAX = 4
+
+
+def sphere_fig_kwargs(param, result, show_room_box=True, show_room_dims=False):
+    # make_sphere_fig 的幾何參數（不含 elev / azim / title）
+    kwargs = {
+        "diameter": float(param["diameter"]),
+        "fov_h": float(param["fov_h"]),
+        "fov_v_n_final": float(result["fov_v_n_final"]),
+        "fov_v_s_final": float(result["fov_v_s_final"]),
+        "n_equator_final": int(result["n_equator_final"]),
+        "n_vertical_final": int(result["n_vertical_final"]),
+        "bottom_edge_height": float(param.get("bottom_edge_height", 0.0)),
+        "show_room_box": bool(show_room_box),
+        "show_room_dims": bool(show_room_box and show_room_dims),
+    }
+    if show_room_box:
+        kwargs.update(
+            room_w=float(result["room_size_w"]),
+            room_l=float(result["room_size_l"]),
+            room_h=float(result["room_size_h"]),
+        )
+    return kwargs
+
+
+def orbit_views(n_frames=360, elev=25.0, azim_start=-145.0, turns=1.0, elev_swing=0.0, zoom=(1.0, 1.0)):
+    # 轉台：azim 等速轉 turns 圈；運鏡：elev 上下擺動 elev_swing 度、zoom 由 zoom[0] 漸變到 zoom[1]
+    k = np.arange(n_frames) / n_frames
+    azims = azim_start + 360.0 * turns * k
+    elevs = elev + elev_swing * np.sin(2 * np.pi * k)
+    zooms = np.linspace(zoom[0], zoom[1], n_frames)
+    return [(float(e), float(a), float(z)) for e, a, z in zip(elevs, azims, zooms)]
+
+
+def _figure(fig_kwargs, title, size_px, dpi):
+    key = (tuple(sorted(fig_kwargs.items())), title, size_px, dpi)
+    fig = _FIG_CACHE.get(key)
+    if fig is None:
+        import matplotlib.pyplot as plt
+
+        if len(_FIG_CACHE) >= _FIG_CACHE_MAX:
+            for old in _FIG_CACHE.values():
+                plt.close(old)
+            _FIG_CACHE.clear()
+        fig = make_sphere_fig(**fig_kwargs, elev=25, azim=-145, title=title)
+        fig.set_dpi(dpi)
+        fig.set_size_inches(size_px / dpi, size_px / dpi)
+        _FIG_CACHE[key] = fig
+    return fig
+
+
+def _encode(rgb, encoding):
+    if encoding == "rgb":
+        return rgb
+    from PIL import Image
+
+    im = Image.fromarray(rgb)
+    if encoding == "gif":
+        return im.quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    buf = io.BytesIO()
+    im.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def _render_chunk(task):
+    fig_kwargs, title, views, size_px, dpi, encoding = task
+    fig = _figure(fig_kwargs, title, size_px, dpi)
+    ax = fig.axes[0]
+    frames = []
+    for elev, azim, zoom in views:
+        with timed("turntable_frame"):
+            ax.view_init(elev=elev, azim=azim)
+            ax.set_box_aspect([1, 1, 1], zoom=zoom)
+            fig.canvas.draw()
+            rgb = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+            frames.append(_encode(rgb, encoding))
+    return frames
+
+
+def _output_format(out, fmt):
+    if fmt is not None:
+        return fmt.lower().lstrip(".")
+    if not isinstance(out, (str, os.PathLike)):
+        raise ValueError("fmt is required when writing to a file object")
+    ext = os.path.splitext(os.fspath(out))[1].lower().lstrip(".")
+    return ext or "png"
+
+
+def _write_png_sequence(frames, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, png in enumerate(frames):
+        path = os.path.join(out_dir, f"frame_{i:05d}.png")
+        with open(path, "wb") as f:
+            f.write(png)
+        paths.append(path)
+    return paths
+
+
+def _write_gif(frames, out, fps):
+    frames = iter(frames)
+    first = next(frames)
+    first.save(out, format="GIF", save_all=True, append_images=frames, duration=int(round(1000 / fps)), loop=0)
+    return out
+
+
+def _write_video(frames, out, fps):
+    try:
+        import imageio.v2 as imageio
+    except ImportError as e:
+        raise ImportError("Writing video files needs imageio: pip install imageio[ffmpeg]") from e
+
+    with imageio.get_writer(out, fps=fps) as writer:
+        for rgb in frames:
+            writer.append_data(rgb)
+    return out
+
+
+def render_orbit(param, result, out, views=None, n_frames=360, fps=30, fmt=None,
+                 size_px=720, dpi=120, title="", show_room_box=True, show_room_dims=False,
+                 max_workers=None, chunk_frames=None, progress=None):
+    # out：資料夾（PNG 序列）、*.gif、或 imageio 支援的影片檔（*.mp4 …）；寫到 file object 時需給 fmt
+    fmt = _output_format(out, fmt)
+    encoding = {"png": "png", "gif": "gif"}.get(fmt, "rgb")
+    if views is None:
+        views = orbit_views(n_frames)
+
+    fig_kwargs = sphere_fig_kwargs(param, result, show_room_box, show_room_dims)
+    if chunk_frames is None:
+        chunk_frames = max(1, min(24, len(views) // ((os.cpu_count() or 1) * 4) or 1))
+    tasks = [
+        (fig_kwargs, title, views[start:start + chunk_frames], size_px, dpi, encoding)
+        for start in range(0, len(views), chunk_frames)
+    ]
+
+    def frames():
+        done = 0
+        for chunk in iter_results(submit_all(_render_chunk, tasks, max_workers)):
+            for frame in chunk:
+                yield frame
+            done += len(chunk)
+            if progress is not None:
+                progress(done, len(views))
+
+    if fmt == "png":
+        return _write_png_sequence(frames(), out)
+    if fmt == "gif":
+        return _write_gif(frames(), out, fps)
+    return _write_video(frames(), out, fps)
@@ -1,7 +1,29 @@
 import math
+import numpy as np
 import pandas as pd
 import streamlit as st
-from calculator import calculate, make_sphere_fig
+import io
+import json
+import time
+from calculator import calculate, result_digest, make_sphere_fig, figure_png, ENGINEERING_DEFAULTS
+from room_solver import solve_room
+from module_power import module_power_map
+from cabling import plan_cabling, assignment_table
+from atlas import ensure_atlas, atlas_building, lookup
+from compare import VARIANT_FIELDS, evaluate_variants, comparison_table, highlight_changes
+from mesh_export import export_mesh
+from hardware import timing_support, support_matrix
+from tiling import evaluate_tilings, tiling_table
+from psu import allocate_psus, with_psu, psu_assignment, psu_table
+from sightlines import seat_grid, load_seats, analyze_sightlines, seat_table
+from uniformity import DEFAULT_TOLERANCE, row_uniformity, module_nits, uniformity_table
+from clearance import UNIT_SCALE, DEFAULT_CLEARANCE, DEFAULT_FLOOR_Z, load_point_cloud, PointIndex, analyze_clearance, violation_table
+from catalog import load_catalog, catalog_index
+from jobs import (ACTIVE, get_runner, parse_values, sweep_params, submit_job, cancel_job, delete_job,
+                  list_jobs, job_items, job_zip, jobs_table, items_table)
+from metrics import start_metrics_server, register_lru_cache, timed, record_calculation, cache_lookups, cache_fill
+from animation import render_orbit, orbit_views
+from quote import get_part_catalog, bom_quantities, bom_unit, spec_rows, build_quote, write_quote_pdf, write_quote_xlsx
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import re
@@ -27,6 +49,12 @@ if "result" not in st.session_state:
 if "param_used" not in st.session_state:
     st.session_state["param_used"] = None
 
+if "psu_alloc" not in st.session_state:
+    st.session_state["psu_alloc"] = None
+
+if "result_key" not in st.session_state:
+    st.session_state["result_key"] = None
+
 if "fig1" not in st.session_state:
     st.session_state["fig1"] = None
 
@@ -39,13 +67,152 @@ if "fig3" not in st.session_state:
 if "fig4" not in st.session_state:
     st.session_state["fig4"] = None
 
+if "power_map" not in st.session_state:
+    st.session_state["power_map"] = None
+
+if "uniformity_map" not in st.session_state:
+    st.session_state["uniformity_map"] = None
+
 if "quote_parts" not in st.session_state:
     st.session_state["quote_parts"] = {}
 
+if "room_fit" not in st.session_state:
+    st.session_state["room_fit"] = None
+
+if "comparison" not in st.session_state:
+    st.session_state["comparison"] = None
+
+if "turntable" not in st.session_state:
+    st.session_state["turntable"] = None
+
+if "sightlines" not in st.session_state:
+    st.session_state["sightlines"] = None
+
+if "clearance" not in st.session_state:
+    st.session_state["clearance"] = None
+
+if "job_selected" not in st.session_state:
+    st.session_state["job_selected"] = None
+
+# =============================
+# Operational Metrics
+# 本機 GET /metrics（Prometheus text format），每個 process 只啟動一次；port 見 metrics.py
+# =============================
+@st.cache_resource
+def get_metrics_server():
+    register_lru_cache("catalog", load_catalog)
+    register_lru_cache("catalog_index", catalog_index)
+    return start_metrics_server()
+
+get_metrics_server()
+
+# =============================
+# Input Fragment
+# Only inputs + quick estimate rerun while typing
+# =============================
+@st.fragment
+def render_inputs():
+    st.text_input("Project Name", value="", key="in_project_name")
+
+    st.number_input(
+        "Diameter (mm)",
+        value=3000.0,
+        step=1.0,
+        format="%.1f",
+        key="in_diameter"
+    )
+
+    st.number_input(
+        "FOV Horizontal (deg)",
+        value=180.00,
+        step=0.01,
+        format="%.2f",
+        key="in_fov_h"
+    )
+
+    st.number_input(
+        "FOV North (deg)",
+        value=67.50,
+        step=0.01,
+        format="%.2f",
+        key="in_fov_v_n"
+    )
+
+    st.number_input(
+        "FOV South (deg)",
+        value=33.75,
+        step=0.01,
+        format="%.2f",
+        key="in_fov_v_s"
+    )
+
+    st.number_input(
+        "Resolution Horizontal (px)",
+        value=3840,
+        step=1,
+        key="in_resolution_h"
+    )
+
+    st.number_input(
+        "Luminance (nits)",
+        value=800.0,
+        step=1.0,
+        format="%.1f",
+        key="in_luminance"
+    )
+
+    st.selectbox(
+        "Frame Rate",
+        options=[30, 50, 60, 120, 144, 240],
+        index=2,
+        key="in_frame_rate"
+    )
+
+    st.number_input(
+        "Bottom Edge Height Above Floor (mm)",
+        value=500.0,
+        step=1.0,
+        format="%.1f",
+        key="in_bottom_edge_height"
+    )
+
+    st.checkbox(
+        "Exact LED count (per pixel row)",
+        value=False,
+        key="in_exact_led_count",
+        help="Count LEDs row by row from each pixel row's latitude instead of averaging the module's top and bottom edges."
+    )
+
+    with timed("atlas_lookup"):
+        # Design Atlas：圖譜不存在 / 過期時在背景建置，建好前不顯示估算
+        estimate = lookup(ensure_atlas(), {
+            "diameter": st.session_state["in_diameter"],
+            "fov_h": st.session_state["in_fov_h"],
+            "fov_v_n": st.session_state["in_fov_v_n"],
+            "fov_v_s": st.session_state["in_fov_v_s"],
+            "resolution_h": st.session_state["in_resolution_h"],
+            "frame_rate": st.session_state["in_frame_rate"],
+            "luminance": st.session_state["in_luminance"],
+            "bottom_edge_height": st.session_state["in_bottom_edge_height"],
+            "led_count_mode": "exact" if st.session_state["in_exact_led_count"] else "average",
+            **ENGINEERING_DEFAULTS,
+        })
+
+    if estimate is not None:
+        st.caption("Quick estimate (exact grid hit)" if estimate["exact"] else "Quick estimate (approx., nearest grid point)")
+        q1, q2 = st.columns(2)
+        q1.metric("Pitch (mm)", f'{estimate["pitch_mm"]:.3f}')
+        q2.metric("Total Power (kW)", f'{estimate["total_power_W"]:.2f}')
+        q3, q4 = st.columns(2)
+        q3.metric("Module Qty", f'{estimate["total_n_module"]}')
+        q4.metric("Resolution V", f'{estimate["resolution_v_final"]}')
+    elif atlas_building():
+        st.caption("Quick estimate available once the design atlas finishes building.")
+
 # =============================
 # Sidebar – Core Inputs
 # mode / passcode: immediate UI update
-# calculation inputs: submit only on Calculate
+# calculation inputs: fragment rerun only (quick estimate), full calculation on Calculate
 # =============================
 with st.sidebar:
     st.header("Input Parameters")
@@ -58,7 +225,8 @@ with st.sidebar:
         "Mode",
         options=["Visitor", "Yenrich"],
         index=0,
-        horizontal=True
+        horizontal=True,
+        key="mode"
     )
 
     passcode = ""
@@ -71,72 +239,49 @@ with st.sidebar:
         )
 
     # -----------------------------
-    # Submit-only widgets (inside form)
+    # Calculation inputs (fragment) + Calculate
     # -----------------------------
-    with st.form("input_form", clear_on_submit=False, enter_to_submit=False):
-        project_name = st.text_input("Project Name", value="")
-
-        diameter = st.number_input(
-            "Diameter (mm)",
-            value=3000.0,
-            step=1.0,
-            format="%.1f"
-        )
-
-        fov_h = st.number_input(
-            "FOV Horizontal (deg)",
-            value=180.00,
-            step=0.01,
-            format="%.2f"
-        )
-
-        fov_v_n = st.number_input(
-            "FOV North (deg)",
-            value=67.50,
-            step=0.01,
-            format="%.2f"
-        )
-
-        fov_v_s = st.number_input(
-            "FOV South (deg)",
-            value=33.75,
-            step=0.01,
-            format="%.2f"
-        )
+    render_inputs()
 
-        resolution_h = st.number_input(
-            "Resolution Horizontal (px)",
-            value=3840,
-            step=1
-        )
+    run_btn = st.button("Calculate", type="primary")
 
-        luminance = st.number_input(
-            "Luminance (nits)",
-            value=800.0,
-            step=1.0,
-            format="%.1f"
-        )
-
-        frame_rate = st.selectbox(
-            "Frame Rate",
-            options=[60, 120],
-            index=0
-        )
-
-        bottom_edge_height = st.number_input(
-            "Bottom Edge Height Above Floor (mm)",
-            value=500.0,
-            step=1.0,
-            format="%.1f"
-        )
+    # -----------------------------
+    # Room Fit Solver (inverse mode)
+    # -----------------------------
+    with st.expander("Room Fit Solver"):
+        with st.form("room_form", clear_on_submit=False, enter_to_submit=False):
+            room_w_in = st.number_input("Room Width W (mm)", value=8000.0, step=1.0, format="%.1f")
+            room_l_in = st.number_input("Room Length L (mm)", value=7000.0, step=1.0, format="%.1f")
+            room_h_in = st.number_input("Room Height H (mm)", value=5000.0, step=1.0, format="%.1f")
+            room_bottom_in = st.number_input(
+                "Bottom Edge Height Above Floor (mm)",
+                value=500.0,
+                step=1.0,
+                format="%.1f",
+                key="room_bottom_edge_height"
+            )
+            room_target = st.selectbox("Target", options=["Resolution", "Pitch"], index=0)
+            room_resolution_h = st.number_input("Resolution Horizontal (px)", value=3840, step=4, key="room_resolution_h")
+            room_pitch = st.number_input("Pitch (mm)", value=1.5, step=0.1, format="%.2f", key="room_pitch")
 
-        run_btn = st.form_submit_button("Calculate", type="primary")
+            solve_btn = st.form_submit_button("Solve")
 
 show_bom = (mode == "Yenrich" and passcode == "25087030")
 
 # =============================
 # Internal Engineering Defaults
 # =============================
+project_name = st.session_state["in_project_name"]
+diameter = st.session_state["in_diameter"]
+fov_h = st.session_state["in_fov_h"]
+fov_v_n = st.session_state["in_fov_v_n"]
+fov_v_s = st.session_state["in_fov_v_s"]
+resolution_h = st.session_state["in_resolution_h"]
+luminance = st.session_state["in_luminance"]
+frame_rate = st.session_state["in_frame_rate"]
+bottom_edge_height = st.session_state["in_bottom_edge_height"]
+led_count_mode = "exact" if st.session_state["in_exact_led_count"] else "average"
+
 safe_project_name = re.sub(r"[^A-Za-z0-9_-]", "_", project_name)
 
 param = {
@@ -148,15 +293,10 @@ param = {
     "luminance": luminance,
     "frame_rate": frame_rate,
     "bottom_edge_height": bottom_edge_height,
+    "led_count_mode": led_count_mode,
 
     # Internal Engineering Defaults
-    "module_angle_limit": 6,
-    "module_size_limit": 250,
-    "dclk_limit": 10,
-    "waveform_duty": 0.7,
-    "scan_ratio_limit": 45,
-    "channel_threshold_for_double_scan": 64,
-    "calibration_ratio": 0.1,
+    **ENGINEERING_DEFAULTS,
 }
 
 # =============================
@@ -218,10 +358,17 @@ if run_btn:
             "⚠️ Please correct the following:\n\n"
             + "\n".join([f"- {field}" for field in missing_fields])
         )
+        record_calculation("rejected")
         st.stop()
 
     try:
-        result = calculate(param)
+        calc_start = time.perf_counter()
+        with timed("calculate"):
+            result = calculate(param)
+        # PSU 裝箱只在 Calculate 時做一次：結果（BOM / 規格 / 報價單）與 PSU 區塊共用
+        with timed("psu_allocation"):
+            psu_alloc = allocate_psus(result, derating=result["psu_derating"])
+            result = with_psu(result, psu_alloc)
         need_superstructure_eval = param["diameter"] >= 10000
 
         fig1 = make_sphere_fig(
@@ -296,96 +443,63 @@ if run_btn:
 
         st.session_state["result"] = result
         st.session_state["param_used"] = param.copy()
-        st.session_state["fig1"] = fig1
-        st.session_state["fig2"] = fig2
-        st.session_state["fig3"] = fig3
-        st.session_state["fig4"] = fig4
+        st.session_state["psu_alloc"] = psu_alloc
+        # 下面 st.cache_data 的 key（_param / _result 不進 hash，document_no 只到秒）
+        st.session_state["result_key"] = result_digest(param, result)
+        # 圖只 render 一次成 PNG：畫面與報價單匯出共用
+        # 功耗圖 / 均勻度圖 / 佈線 / 3D 模型不在這裡算，由各自的 fragment 或下載時才產生
+        st.session_state["fig1"] = figure_png(fig1)
+        st.session_state["fig2"] = figure_png(fig2)
+        st.session_state["fig3"] = figure_png(fig3) if fig3 is not None else None
+        st.session_state["fig4"] = figure_png(fig4) if fig4 is not None else None
         st.session_state["has_result"] = True
 
+        record_calculation("ok", time.perf_counter() - calc_start)
         st.toast("Result updated!", icon="✅")
 
     except Exception as e:
+        record_calculation("failed")
         st.error(f"Calculation failed: {e}")
         st.stop()
 
 # =============================
-# BOM Fragment
-# Only BOM reruns when BOM widgets change
+# Room Fit Solver (ONLY when Solve clicked)
 # =============================
+if solve_btn:
+    if min(room_w_in, room_l_in, room_h_in) <= 0 or room_bottom_in < 0:
+        st.error("⚠️ Room W/L/H must be greater than 0 and Bottom Edge Height cannot be negative")
+        st.stop()
 
-def get_led_options_by_pitch(pitch_mm: float) -> dict:
-    if pitch_mm <= 1.2:
-        return {
-            "MIP-C0606TM": 2.11,
-            "LSSF0606CC2": 3.2,
-            "LSSF0606CC3": 2.78,
-        }
-    elif pitch_mm <= 1.7:
-        return {
-            "MIP-C1010TM": 2.78,
-            "MIP-C0606TM": 2.11,
-            "LSSF0606CC2": 3.2,
-            "LSSF0606CC3": 2.78,
-        }
-    elif pitch_mm <= 2.2:
-        return {
-            "NH1515": 1.35,
-            "RS1515": 5.04,
-            "MIP-C1010TM": 2.78,
-        }
-    else:
-        return {
-            "NH2020": 2.14,
-            "FM2020": 4.71,
-            "RS2020": 7.43,
-            "NH1515": 1.35,
-            "RS1515": 5.04,
-        }
-
-def get_mechanical(diameter: float) -> dict:
-    if diameter < 10000:
-        return {
-            "Mechanical": 600,
-        }
-    else:
-        return {
-            "Mechanical": 0,
-        }
+    try:
+        st.session_state["room_fit"] = solve_room(
+            room_w=room_w_in,
+            room_l=room_l_in,
+            room_h=room_h_in,
+            bottom_edge_height=room_bottom_in,
+            base_param=param,
+            resolution_h=int(room_resolution_h) if room_target == "Resolution" else None,
+            pitch=float(room_pitch) if room_target == "Pitch" else None,
+        )
+    except Exception as e:
+        st.error(f"Room fit failed: {e}")
+        st.stop()
 
-def get_part_catalog(pitch_mm: float) -> dict:
-    return {
-        "LED": get_led_options_by_pitch(pitch_mm),
-        "PWM IC": {"ICND-2069": 0.09},
-        "SCAN IC": {"ICND-2019": 0.07},
-        "Module (PCB)": {"4 layer": 200},
-        "Hub": {"2 layer": 58.29},
-        "RX": {"AUO-R3E": 35, "Mooncell-A10X": 21.2},
-        "Controller": {"AUO-D4000": 2000, "Mooncell-B2000ES": 1686},
-        "PSU": {"UHP-200": 28.01},
-        "Mechanical": get_mechanical(diameter),
-    }
+# =============================
+# BOM Fragment
+# Only BOM reruns when BOM widgets change
+# =============================
 
 @st.fragment
-def render_bom(show_bom: bool, result: dict):
+def render_bom(show_bom: bool, result: dict, param_used: dict):
     if not show_bom:
         return
 
     st.divider()
     st.subheader("Key Component List (Quantity)")
 
-    PART_CATALOG = get_part_catalog(result["pitch_mm"])
+    PART_CATALOG = get_part_catalog(result["pitch_mm"], param_used["diameter"])
 
-    qty_map = {
-        "LED": int(result["total_n_led_kpcs"]),
-        "PWM IC": int(result["total_n_pwm"]),
-        "SCAN IC": int(result["total_n_scan"]),
-        "Module (PCB)": round(result["display_area"],1),
-        "Hub": int(result["total_n_hub"]),
-        "RX": int(result["total_n_hub"]),
-        "Controller": int(result["total_n_controller"]),
-        "PSU": int(result["total_n_hub"]),
-        "Mechanical": round(result["display_area"], 1),
-    }
+    qty_map = bom_quantities(result)
 
     if not st.session_state["quote_parts"]:
         st.session_state["quote_parts"] = {
@@ -443,15 +557,7 @@ def render_bom(show_bom: bool, result: dict):
         total_price = unit_price * qty
         grand_total += total_price
 
-        # Qty unit rule
-        if item == "LED":
-            unit = "kpcs"
-        elif item == "Module (PCB)":
-            unit = "m²"
-        elif item == "Mechanical":
-            unit = "m²"
-        else:
-            unit = "pcs"
+        unit = bom_unit(item)
 
         with c3:
             st.write(f"{qty:,} {unit}")
@@ -465,6 +571,432 @@ def render_bom(show_bom: bool, result: dict):
     st.markdown("---")
     st.metric("Reference Key Component Cost (USD)", f"{grand_total:,.2f}")
 
+    render_export(result, param_used, st.session_state["quote_parts"])
+
+# =============================
+# Quote Export (PDF / XLSX)
+# 圖用 session_state 內已 render 的 PNG bytes；同一份報價單 + 結果 + 選料只產生一次
+# =============================
+@cache_lookups("quote_export")
+@st.cache_data(max_entries=16, show_spinner=False)
+@cache_fill
+def export_quote_files(document_no: str, result_key: str, parts_key, _quote: dict):
+    with timed("quote_pdf"):
+        pdf = io.BytesIO()
+        write_quote_pdf(_quote, pdf)
+    with timed("quote_xlsx"):
+        xlsx = io.BytesIO()
+        write_quote_xlsx(_quote, xlsx)
+    return pdf.getvalue(), xlsx.getvalue()
+
+def render_export(result: dict, param_used: dict, quote_parts):
+    # 按下載才產生（download_button 的 callable 在另一個 thread 執行，不能讀 session_state，所以先取出）
+    document_no = st.session_state["document_no"]
+    result_key = st.session_state["result_key"]
+    figures = [st.session_state[k] for k in ("fig1", "fig2", "fig3", "fig4")]
+    quote_parts = dict(quote_parts) if quote_parts is not None else None
+    parts_key = tuple(sorted(quote_parts.items())) if quote_parts is not None else None
+
+    def quote_files():
+        quote = build_quote(
+            document_no,
+            param_used,
+            result,
+            quote_parts=quote_parts,
+            figures=figures + [power_map_png(result_key, param_used, result)],
+        )
+        return export_quote_files(document_no, result_key, parts_key, quote)
+
+    st.divider()
+    st.subheader("Export Quote")
+    e1, e2 = st.columns(2)
+    with e1:
+        st.download_button(
+            "Download Quote (PDF)",
+            data=lambda: quote_files()[0],
+            file_name=f"{document_no}.pdf",
+            mime="application/pdf",
+        )
+    with e2:
+        st.download_button(
+            "Download Quote (XLSX)",
+            data=lambda: quote_files()[1],
+            file_name=f"{document_no}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+# =============================
+# 3D Model Export (STL / OBJ / glTF)
+# 同一份結果 + 格式只產生一次
+# =============================
+MESH_FORMATS = {
+    "STL (binary)": ("stl", "model/stl"),
+    "OBJ": ("obj", "model/obj"),
+    "glTF (.glb)": ("glb", "model/gltf-binary"),
+}
+
+@cache_lookups("mesh_export")
+@st.cache_data(max_entries=8, show_spinner=False)
+@cache_fill
+def export_mesh_file(result_key: str, fmt: str, subdiv: int, _result: dict, bottom_edge_height: float):
+    with timed("mesh_export"):
+        return export_mesh(_result, fmt, subdiv=subdiv, bottom_edge_height=bottom_edge_height)
+
+# =============================
+# Module Power Map / Brightness Uniformity / Cabling (on demand)
+# 球面熱圖 render 一張約 2 秒（2 萬片模組），按了才畫；同一份結果只畫一次
+# =============================
+@cache_lookups("power_map_png")
+@st.cache_data(max_entries=8, show_spinner=False)
+@cache_fill
+def power_map_png(result_key: str, _param: dict, _result: dict):
+    with timed("power_map"):
+        power_map = module_power_map(_result)
+    return figure_png(make_sphere_fig(
+        diameter=_param["diameter"],
+        fov_h=_param["fov_h"],
+        fov_v_n_final=_result["fov_v_n_final"],
+        fov_v_s_final=_result["fov_v_s_final"],
+        n_equator_final=_result["n_equator_final"],
+        n_vertical_final=_result["n_vertical_final"],
+        bottom_edge_height=_param.get("bottom_edge_height", 0.0),
+        face_values=power_map["module_power_W"],
+        face_label="Module power (W)",
+        elev=25,
+        azim=-145,
+        title="Module Power Map (Full White)"
+    ))
+
+@cache_lookups("uniformity_png")
+@st.cache_data(max_entries=8, show_spinner=False)
+@cache_fill
+def uniformity_png(result_key: str, _param: dict, _result: dict, _nits):
+    # 預期亮度與 tolerance 無關，同一份結果只畫一次
+    return figure_png(make_sphere_fig(
+        diameter=_param["diameter"],
+        fov_h=_param["fov_h"],
+        fov_v_n_final=_result["fov_v_n_final"],
+        fov_v_s_final=_result["fov_v_s_final"],
+        n_equator_final=_result["n_equator_final"],
+        n_vertical_final=_result["n_vertical_final"],
+        bottom_edge_height=_param.get("bottom_edge_height", 0.0),
+        face_values=_nits,
+        face_cmap="coolwarm",
+        face_label="Expected luminance (nits)",
+        elev=25,
+        azim=-145,
+        title="Brightness Uniformity"
+    ))
+
+@cache_lookups("cabling")
+@st.cache_data(max_entries=8, show_spinner=False)
+@cache_fill
+def cabling_files(result_key: str, _result: dict):
+    # 佈線不可行（例如單片模組超過 receiver 容量）回傳 (None, None, 原因)，只影響佈線區塊
+    try:
+        with timed("cabling"):
+            plan = plan_cabling(_result)
+            return plan, assignment_table(_result, plan).to_csv(index=False).encode("utf-8"), None
+    except ValueError as e:
+        return None, None, str(e)
+
+@st.fragment
+def render_power_map(param_used: dict, result: dict):
+    st.divider()
+    st.subheader("Module Power Map")
+
+    result_key = st.session_state["result_key"]
+    power_map = module_power_map(result)
+    p1, p2 = st.columns(2)
+
+    with p1:
+        if st.session_state["power_map"] != result_key and st.button("Show Power Map"):
+            st.session_state["power_map"] = result_key
+        if st.session_state["power_map"] == result_key:
+            st.image(power_map_png(result_key, param_used, result))
+
+    with p2:
+        hub_power = power_map["hub_power_W"]
+        h1, h2 = st.columns(2)
+        h1.metric("Max Hub Power (W)", f"{hub_power.max():.1f}")
+        h2.metric("Avg Hub Power (W)", f"{hub_power.mean():.1f}")
+
+        row_df = pd.DataFrame({
+            "Row": range(1, len(power_map["row_power_W"]) + 1),
+            "LED per Module": [int(v) for v in result["n_module_led_counts"]],
+            "Module Power (W)": [round(float(v), 2) for v in power_map["row_power_W"]],
+        })
+        st.dataframe(row_df, hide_index=True, use_container_width=True)
+
+@st.fragment
+def render_uniformity(param_used: dict, result: dict):
+    st.divider()
+    st.subheader("Brightness Uniformity")
+
+    result_key = st.session_state["result_key"]
+    tolerance = st.number_input(
+        "Density / Brightness Tolerance (%)",
+        min_value=0.1, max_value=50.0, value=DEFAULT_TOLERANCE * 100, step=0.5,
+        key="uniformity_tolerance",
+    ) / 100
+    with timed("uniformity"):
+        uniformity = row_uniformity(result, param_used["luminance"], tolerance)
+    n1, n2, n3, n4 = st.columns(4)
+    n1.metric("Min Nits", f'{uniformity["min_nits"]:.1f}')
+    n2.metric("Max Nits", f'{uniformity["max_nits"]:.1f}')
+    n3.metric("Uniformity (min/max)", f'{uniformity["uniformity"] * 100:.1f}%')
+    n4.metric("Rows Out of Tolerance", f'{uniformity["n_flagged"]} / {len(uniformity["nits"])}')
+
+    g1, g2 = st.columns(2)
+    with g1:
+        if st.session_state["uniformity_map"] != result_key and st.button("Show Uniformity Map"):
+            st.session_state["uniformity_map"] = result_key
+        if st.session_state["uniformity_map"] == result_key:
+            st.image(uniformity_png(result_key, param_used, result, module_nits(result, uniformity)))
+    with g2:
+        st.caption(f'Nominal pitch {uniformity["nominal_pitch_mm"]:.4f} mm, vertical pitch {uniformity["v_pitch_mm"]:.4f} mm')
+        st.dataframe(uniformity_table(uniformity), hide_index=True, use_container_width=True)
+
+@st.fragment
+def render_cabling(result: dict):
+    st.divider()
+    st.subheader("Cabling Plan")
+
+    cabling_plan, cabling_csv, error = cabling_files(st.session_state["result_key"], result)
+    if cabling_plan is None:
+        st.warning(f"Cabling plan not available: {error}")
+        return
+
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Layout", cabling_plan["strategy"])
+    k2.metric("Hub Qty", f'{cabling_plan["n_hub"]}')
+    k3.metric("Controller Qty", f'{cabling_plan["n_controller"]}')
+    k4.metric("Total Cable (m)", f'{cabling_plan["total_cable_m"]:.1f}')
+
+    st.download_button(
+        "Download Module Assignment (CSV)",
+        data=cabling_csv,
+        file_name=f'{st.session_state["document_no"]}_cabling.csv',
+        mime="text/csv",
+    )
+
+# =============================
+# Tiling Strategies
+# 各分割方式在本 process 依序評估（每個只要毫秒級），同一份結果只算一次
+# =============================
+@cache_lookups("tiling")
+@st.cache_data(max_entries=8, show_spinner=False)
+@cache_fill
+def evaluate_tiling_layouts(result_key: str, _param: dict, _result: dict):
+    with timed("tiling"):
+        return evaluate_tilings(_param, _result)
+
+# =============================
+# Turntable Animation Fragment
+# 影格平行 render（compare 的 process pool），只有這段 rerun
+# =============================
+@st.fragment
+def render_turntable(param_used: dict, result: dict):
+    st.divider()
+    st.subheader("Turntable Animation")
+
+    a1, a2, a3 = st.columns(3)
+    with a1:
+        n_frames = st.number_input("Frames", min_value=12, max_value=360, value=72, step=12)
+    with a2:
+        fps = st.number_input("FPS", min_value=5, max_value=60, value=24, step=1)
+    with a3:
+        swing = st.number_input("Camera Elevation Swing (deg)", min_value=0.0, max_value=60.0, value=0.0, step=5.0)
+
+    if st.button("Render Turntable (GIF)"):
+        bar = st.progress(0.0)
+        buf = io.BytesIO()
+        with timed("turntable"):
+            render_orbit(
+                param_used,
+                result,
+                buf,
+                views=orbit_views(int(n_frames), elev_swing=float(swing)),
+                fps=int(fps),
+                fmt="gif",
+                size_px=480,
+                dpi=80,
+                show_room_box=param_used["diameter"] < 10000,
+                progress=lambda done, total: bar.progress(done / total),
+            )
+        bar.empty()
+        st.session_state["turntable"] = (st.session_state["document_no"], buf.getvalue())
+
+    turntable = st.session_state["turntable"]
+    if turntable is not None and turntable[0] == st.session_state["document_no"]:
+        st.image(turntable[1])
+        st.download_button(
+            "Download Turntable (GIF)",
+            data=turntable[1],
+            file_name=f"{turntable[0]}_turntable.gif",
+            mime="image/gif",
+        )
+
+# =============================
+# Audience Sightlines Fragment
+# 座位 × 模組的視角 / 距離（分塊矩陣運算），只有這段 rerun
+# =============================
+@st.fragment
+def render_sightlines(param_used: dict, result: dict):
+    st.divider()
+    st.subheader("Audience Sightlines")
+
+    b1, b2, b3, b4 = st.columns(4)
+    with b1:
+        viewing = st.radio("Audience", options=["Inside (dome)", "Outside (ball)"], index=0, horizontal=True)
+    with b2:
+        spacing = st.number_input("Seat Spacing (mm)", min_value=300.0, max_value=5000.0, value=1000.0, step=100.0)
+    with b3:
+        eye_height = st.number_input("Eye Height (mm)", min_value=0.0, max_value=20000.0, value=1200.0, step=100.0)
+    with b4:
+        clearance = st.number_input("Clearance to Screen (mm)", min_value=0.0, max_value=10000.0, value=500.0, step=100.0)
+    seat_file = st.file_uploader("Seat Layout (CSV: x, y, z in mm; floor z = 0, sphere axis at x = y = 0)", type=["csv"])
+
+    if st.button("Analyze Sightlines"):
+        inward = viewing.startswith("Inside")
+        bottom_edge_height = float(param_used.get("bottom_edge_height", 0.0))
+        try:
+            if seat_file is not None:
+                seats = load_seats(seat_file)
+            else:
+                seats = seat_grid(result, bottom_edge_height, spacing=spacing, eye_height=eye_height,
+                                  clearance=clearance, inward=inward)
+        except Exception as e:
+            st.error(f"Seat layout failed: {e}")
+            seats = None
+
+        if seats is not None and len(seats) == 0:
+            st.warning("No seats in the viewing area; reduce the spacing or clearance.")
+        elif seats is not None:
+            with timed("sightlines"):
+                lines = analyze_sightlines(result, seats, bottom_edge_height, inward=inward)
+            worst = np.nan_to_num(lines["module_worst_angle_deg"], nan=90.0)
+            fig = make_sphere_fig(
+                diameter=param_used["diameter"],
+                fov_h=param_used["fov_h"],
+                fov_v_n_final=result["fov_v_n_final"],
+                fov_v_s_final=result["fov_v_s_final"],
+                n_equator_final=result["n_equator_final"],
+                n_vertical_final=result["n_vertical_final"],
+                elev=25, azim=-145,
+                title="Worst-case Viewing Angle",
+                bottom_edge_height=bottom_edge_height,
+                face_values=worst,
+                face_cmap="RdYlGn_r",
+                face_label="Worst viewing angle (deg)",
+            )
+            st.session_state["sightlines"] = (st.session_state["document_no"], lines, figure_png(fig))
+
+    sightlines = st.session_state["sightlines"]
+    if sightlines is not None and sightlines[0] == st.session_state["document_no"]:
+        _, lines, png = sightlines
+        v1, v2, v3, v4 = st.columns(4)
+        v1.metric("Seats", f'{lines["n_seats"]:,}')
+        v2.metric("Worst Angle (deg)", f'{lines["worst_angle_deg"]:.1f}')
+        v3.metric(f'Modules over {lines["max_angle_deg"]:.0f}°', f'{lines["modules_over_limit"]:,}')
+        v4.metric("Avg Seat Coverage (%)", f'{lines["mean_coverage"] * 100:.1f}')
+        if lines["modules_unseen"]:
+            st.caption(f'{lines["modules_unseen"]:,} modules face away from every seat (shown as 90°).')
+
+        s1, s2 = st.columns(2)
+        with s1:
+            st.image(png)
+        with s2:
+            seat_df = seat_table(lines)
+            st.dataframe(seat_df, hide_index=True, use_container_width=True, height=360)
+            st.download_button(
+                "Download Seat Coverage (CSV)",
+                data=seat_df.to_csv(index=False).encode("utf-8"),
+                file_name=f'{st.session_state["document_no"]}_sightlines.csv',
+                mime="text/csv",
+            )
+
+# =============================
+# Venue Clearance Fragment
+# 場地掃描點雲 vs 球面模組的淨空（voxel 索引，同一份上傳只建一次），只有這段 rerun
+# =============================
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_point_index(file_id: str, name: str, units: str, _data: bytes):
+    with timed("clearance_index"):
+        return PointIndex(load_point_cloud(_data, name, units))
+
+@st.fragment
+def render_clearance(param_used: dict, result: dict):
+    st.divider()
+    st.subheader("Venue Clearance")
+
+    k1, k2, k3 = st.columns(3)
+    with k1:
+        units = st.selectbox("Scan Units", options=list(UNIT_SCALE), index=0, key="clearance_units")
+    with k2:
+        required = st.number_input("Required Clearance (mm)", min_value=0.0, max_value=10000.0,
+                                   value=DEFAULT_CLEARANCE, step=100.0, key="clearance_required")
+    with k3:
+        floor_z = st.number_input("Ignore Points Below Z (mm, floor)", min_value=-1000.0, max_value=10000.0,
+                                  value=DEFAULT_FLOOR_Z, step=10.0, key="clearance_floor_z")
+    scan = st.file_uploader("Venue Scan (PLY or XYZ; floor z = 0, sphere axis at x = y = 0)",
+                            type=["ply", "xyz", "txt", "csv", "pts"])
+
+    if st.button("Check Clearance", disabled=scan is None):
+        bottom_edge_height = float(param_used.get("bottom_edge_height", 0.0))
+        try:
+            index = get_point_index(scan.file_id, scan.name, units, scan.getvalue())
+        except Exception as e:
+            st.error(f"Point cloud failed: {e}")
+            index = None
+
+        if index is not None:
+            with timed("clearance"):
+                check = analyze_clearance(result, index, bottom_edge_height, clearance=required, floor_z=floor_z)
+            fig = make_sphere_fig(
+                diameter=param_used["diameter"],
+                fov_h=param_used["fov_h"],
+                fov_v_n_final=result["fov_v_n_final"],
+                fov_v_s_final=result["fov_v_s_final"],
+                n_equator_final=result["n_equator_final"],
+                n_vertical_final=result["n_vertical_final"],
+                elev=25, azim=-145,
+                title="Obstruction Clearance",
+                bottom_edge_height=bottom_edge_height,
+                face_values=np.nan_to_num(check["module_min_clearance_mm"], nan=required),
+                face_cmap="RdYlGn",
+                face_label="Min clearance (mm)",
+            )
+            st.session_state["clearance"] = (st.session_state["document_no"], check, figure_png(fig))
+
+    clearance = st.session_state["clearance"]
+    if clearance is not None and clearance[0] == st.session_state["document_no"]:
+        _, check, png = clearance
+        x1, x2, x3, x4 = st.columns(4)
+        x1.metric("Scan Points", f'{check["n_points"]:,}')
+        x2.metric("Min Clearance (mm)", "—" if np.isnan(check["min_clearance_mm"]) else f'{check["min_clearance_mm"]:,.0f}')
+        x3.metric(f'Modules under {check["clearance_mm"]:,.0f} mm', f'{check["modules_violating"]:,}')
+        x4.metric("Check Time (s)", f'{check["seconds"]:.2f}')
+        if check["min_clearance_point"] is not None:
+            st.caption("Closest obstruction at X / Y / Z = "
+                       + " / ".join(f"{c:,.0f}" for c in check["min_clearance_point"]) + " mm")
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.image(png)
+        with c2:
+            clearance_df = violation_table(check)
+            if clearance_df.empty:
+                st.success("No obstruction within the required clearance.")
+            else:
+                st.dataframe(clearance_df, hide_index=True, use_container_width=True, height=360)
+                st.download_button(
+                    "Download Clearance Violations (CSV)",
+                    data=clearance_df.to_csv(index=False).encode("utf-8"),
+                    file_name=f'{st.session_state["document_no"]}_clearance.csv',
+                    mime="text/csv",
+                )
+
 # =============================
 # Display Area
 # =============================
@@ -488,58 +1020,35 @@ if st.session_state["has_result"]:
     st.subheader("Product Specification")
 
     need_superstructure_eval = param_used["diameter"] >= 10000
-    superstructure_msg = "Need external superstructure evaluation"
 
-    if need_superstructure_eval:
-        weight_display = superstructure_msg
-        room_size = superstructure_msg
-    else:
-        weight_display = math.ceil(result["weight"])
-        room_w_display = math.ceil(result["room_size_w"])
-        room_l_display = math.ceil(result["room_size_l"])
-        room_h_display = math.ceil(result["room_size_h"])
-        room_size = f"{room_w_display} × {room_l_display} × {room_h_display}"
-
-    deg = "\u00B0"
-
-    spec_df = pd.DataFrame({
-        "Product": [
-            "Sphere Diameter (m)",
-            "Display area (m2)",
-            "Pixel Pitch (mm)",
-            "Resolution (H*V)",
-            "Sphere FOV (H*V)",
-            "Module Types",
-            "Maximum Module Size (mm)",
-            "Module Qty",
-            "Hub Qty (with PSU/RX)",
-            "4K controller Qty",
-            "Brightness (nits)",
-            "Total Power (kW)",
-            "Weight (kg)",
-            "Room size_W * L * H (mm)",
-        ],
-        "Dome Display": [
-            round(param_used["diameter"] / 1000, 2),
-            round(result["display_area"], 2),
-            round(result["pitch_mm"], 3),
-            f'{int(param_used["resolution_h"])} × {int(result["resolution_v_final"])}',
-            f'{round(param_used["fov_h"], 2)}{deg} × {round(result["fov_v_n_final"], 2) + round(result["fov_v_s_final"], 2)}{deg}',
-            int(result["n_vertical_final"]),
-            f'{result["width_per_module_mm"]:.2f} x {result["height_per_module_mm"]:.2f}',
-            int(result["total_n_module"]),
-            int(result["total_n_hub"]),
-            int(result["total_n_controller"]),
-            round(param_used["luminance"], 1),
-            round(result["total_power_W"], 2),
-            weight_display,
-            room_size,
-        ]
-    })
-
-    spec_df["Dome Display"] = spec_df["Dome Display"].astype(str)
+    spec_df = pd.DataFrame(spec_rows(param_used, result), columns=["Product", "Dome Display"])
     st.table(spec_df.set_index("Product"))
 
+    # =============================
+    # Refresh Rate / Grayscale Support
+    # =============================
+    st.divider()
+    st.subheader("Refresh Rate / Grayscale Support")
+
+    support = timing_support(result, param_used)
+    rx_options = list(dict.fromkeys(support["receiver"]))
+    rx = st.selectbox("Receiver", options=rx_options, index=0, key="support_receiver")
+    st.table(support_matrix(support, rx))
+
+    # =============================
+    # Tiling Strategies
+    # =============================
+    st.divider()
+    st.subheader("Tiling Strategies")
+
+    tilings = evaluate_tiling_layouts(st.session_state["result_key"], param_used, result)
+    if tilings["best"] is not None:
+        st.caption(
+            f'Fastest to build: **{tilings["best"]}** (estimated from module count, module types and hubs). '
+            'For comparison only: the specification, BOM and quote still use the meridian layout.'
+        )
+    st.dataframe(tiling_table(tilings), hide_index=True, use_container_width=True)
+
     # =============================
     # Sphere Preview
     # =============================
@@ -550,35 +1059,283 @@ if st.session_state["has_result"]:
 
     with r1c1:
         if st.session_state["fig1"] is not None:
-            st.pyplot(st.session_state["fig1"], clear_figure=False)
+            st.image(st.session_state["fig1"])
 
     with r1c2:
         if st.session_state["fig2"] is not None:
-            st.pyplot(st.session_state["fig2"], clear_figure=False)
+            st.image(st.session_state["fig2"])
 
     if not need_superstructure_eval:
         r2c1, r2c2 = st.columns(2)
 
         with r2c1:
             if st.session_state["fig3"] is not None:
-                st.pyplot(
-                    st.session_state["fig3"],
-                    use_container_width=True,
-                    clear_figure=False
-                )
+                st.image(st.session_state["fig3"], use_container_width=True)
 
         with r2c2:
             if st.session_state["fig4"] is not None:
-                st.pyplot(
-                    st.session_state["fig4"],
-                    use_container_width=True,
-                    clear_figure=False
-                )
+                st.image(st.session_state["fig4"], use_container_width=True)
+
+    render_power_map(param_used, result)
+
+    render_uniformity(param_used, result)
+
+    # =============================
+    # PSU Allocation
+    # =============================
+    st.divider()
+    st.subheader("PSU Allocation")
+
+    psu_alloc = st.session_state["psu_alloc"]
+    psu_df = psu_table(psu_assignment(result, psu_alloc))
+    u1, u2, u3, u4 = st.columns(4)
+    u1.metric("PSU Qty", f'{psu_alloc["total_n_psu"]}')
+    u2.metric("Max PSU / Hub", f'{psu_alloc["psu_per_hub_max"]}')
+    u3.metric("Avg Utilization (%)", f'{psu_alloc["mean_utilization"] * 100:.1f}')
+    u4.metric("Max Utilization (%)", f'{psu_alloc["max_utilization"] * 100:.1f}')
+    st.caption(
+        f'{psu_alloc["psu_part_no"]}: {psu_alloc["rated_W"]:.0f} W rated, '
+        f'{psu_alloc["usable_W"]:.0f} W usable at {psu_alloc["derating"]:.0%} derating; PSUs never span hubs.'
+    )
+    if psu_alloc["overloaded_modules"]:
+        st.warning(f'{psu_alloc["overloaded_modules"]} modules exceed one PSU\'s usable power on their own.')
+    st.dataframe(psu_df, hide_index=True, use_container_width=True, height=240)
+    st.download_button(
+        "Download PSU Assignment (CSV)",
+        data=psu_df.to_csv(index=False).encode("utf-8"),
+        file_name=f'{st.session_state["document_no"]}_psu.csv',
+        mime="text/csv",
+    )
+
+    render_cabling(result)
+
+    # =============================
+    # 3D Model (mechanical CAD)
+    # =============================
+    st.divider()
+    st.subheader("3D Model Export")
+    st.caption("One object per module panel (ID = column × module types + row, row 0 at the top); units mm, Z up. glTF is in meters, Y up.")
+
+    m1, m2, m3 = st.columns([2, 1, 2])
+    with m1:
+        mesh_format = st.selectbox("Format", options=list(MESH_FORMATS.keys()), index=0)
+    with m2:
+        mesh_subdiv = st.number_input("Subdivisions per module", min_value=1, max_value=8, value=2, step=1)
+    mesh_ext, mesh_mime = MESH_FORMATS[mesh_format]
+    mesh_args = (st.session_state["result_key"], mesh_ext, int(mesh_subdiv), result,
+                 float(param_used.get("bottom_edge_height", 0.0)))
+    with m3:
+        # 按下載才產生
+        st.download_button(
+            f"Download {mesh_format}",
+            data=lambda: export_mesh_file(*mesh_args),
+            file_name=f'{st.session_state["document_no"]}_modules.{mesh_ext}',
+            mime=mesh_mime,
+        )
+
+    render_sightlines(param_used, result)
+
+    render_clearance(param_used, result)
+
+    render_turntable(param_used, result)
 
     # =============================
     # BOM List (Quotation)
     # =============================
-    render_bom(show_bom, result)
+    render_bom(show_bom, result, param_used)
+
+    if not show_bom:
+        render_export(result, param_used, None)
 
 else:
-    st.info("Click the >> button in the top-left corner, fill in the parameters and click Calculate.")
\ No newline at end of file
+    st.info("Click the >> button in the top-left corner, fill in the parameters and click Calculate.")
+
+# =============================
+# Room Fit Result (Pareto set)
+# =============================
+if st.session_state["room_fit"] is not None:
+    st.divider()
+    st.subheader("Largest Dome for Room")
+
+    pareto = st.session_state["room_fit"]["pareto"]
+    if not pareto:
+        st.warning("No dome fits this room.")
+    else:
+        fit_df = pd.DataFrame([
+            {
+                "Diameter (mm)": int(c["diameter"]),
+                "FOV H (deg)": round(c["fov_h"], 2),
+                "FOV V (deg)": round(c["fov_v_final"], 2),
+                "Resolution (H*V)": f'{c["resolution_h"]} × {int(c["resolution_v_final"])}',
+                "Pitch (mm)": round(c["pitch_mm"], 3),
+                "Room size_W * L * H (mm)": f'{math.ceil(c["room_size_w"])} × {math.ceil(c["room_size_l"])} × {math.ceil(c["room_size_h"])}',
+                "Total Power (kW)": round(c["total_power_W"], 2),
+            }
+            for c in pareto
+        ])
+        st.dataframe(fit_df, hide_index=True, use_container_width=True)
+
+# =============================
+# Design Comparison Fragment
+# Only this section reruns while editing variants
+# =============================
+@st.fragment
+def render_compare(param: dict):
+    st.divider()
+    st.subheader("Compare Designs")
+    st.caption("Each row is one design. Design 1 is the reference; changed cells are highlighted.")
+
+    seed = pd.DataFrame([{f: param[f] for f in VARIANT_FIELDS}] * 2)
+    variants_df = st.data_editor(
+        seed,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key="compare_editor"
+    )
+
+    if st.button("Compare"):
+        variants = [
+            {f: row[f] for f in VARIANT_FIELDS}
+            for row in variants_df.dropna().to_dict("records")
+        ]
+        if not variants:
+            st.warning("Add at least one design.")
+            return
+        with timed("compare"):
+            st.session_state["comparison"] = evaluate_variants(param, variants)
+
+    comparison = st.session_state["comparison"]
+    if comparison is None:
+        return
+
+    st.dataframe(highlight_changes(comparison_table(comparison)), use_container_width=True)
+
+    thumbs = comparison["thumbnails"]
+    for start in range(0, len(thumbs), 4):
+        cols = st.columns(4)
+        for col, i in zip(cols, range(start, min(start + 4, len(thumbs)))):
+            with col:
+                if thumbs[i] is not None:
+                    st.image(thumbs[i], caption=f"Design {i + 1}")
+
+
+render_compare(param)
+
+
+# =============================
+# Background Jobs
+# 參數掃描 / 批次報價單送進背景佇列（jobs.py，SQLite + 獨立 process pool）
+# 送出只寫入 DB 就返回；清單由自動 rerun 的 fragment 顯示進度與部分結果
+# =============================
+JOB_REFRESH_S = 3
+
+@st.cache_resource
+def get_job_runner():
+    return get_runner()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def job_archive(job_id: int, n_done: int):
+    return job_zip(job_id)
+
+@st.fragment
+def render_job_submit(param: dict, show_bom: bool):
+    st.divider()
+    st.subheader("Background Jobs")
+    st.caption("Sweeps and bulk quotes run in the background. Results are kept after you leave and can be reopened below.")
+
+    kind = st.radio("Job Type", options=["Parameter Sweep", "Bulk Quotes"], index=0, horizontal=True, key="job_kind")
+    j1, j2 = st.columns(2)
+    with j1:
+        field_a = st.selectbox("Sweep Field 1", options=VARIANT_FIELDS, index=0, key="job_field_a")
+        values_a = st.text_input("Values 1 (a, b, c or start:stop:step)", value="2000:8000:1000", key="job_values_a")
+    with j2:
+        field_b = st.selectbox("Sweep Field 2", options=["(none)"] + VARIANT_FIELDS, index=0, key="job_field_b")
+        values_b = st.text_input("Values 2", value="", key="job_values_b")
+
+    project = st.session_state["in_project_name"].strip()
+    if st.button("Submit Job"):
+        try:
+            if not project:
+                raise ValueError("Enter a Project Name first")
+            axes = {field_a: parse_values(values_a)}
+            if field_b != "(none)":
+                if field_b == field_a:
+                    raise ValueError("Pick two different fields")
+                axes[field_b] = parse_values(values_b)
+            params = sweep_params(param, axes)
+            options = {"quote_parts": dict(st.session_state["quote_parts"])} if show_bom else {}
+            job_id = submit_job(
+                "sweep" if kind == "Parameter Sweep" else "reports",
+                project,
+                params,
+                options=options,
+                project=project,
+            )
+        except ValueError as e:
+            st.error(f"Job not submitted: {e}")
+            return
+        st.session_state["job_selected"] = job_id
+        st.toast(f"Job #{job_id} queued ({len(params)} designs)", icon="⏳")
+
+@st.fragment(run_every=JOB_REFRESH_S)
+def render_jobs(show_bom: bool):
+    # 只列出目前專案的工作；Visitor 模式看不到含 BOM（價格）的工作
+    project = st.session_state["in_project_name"].strip()
+    if not project:
+        st.caption("No jobs yet. Enter a Project Name to submit jobs or see this project's jobs.")
+        return
+    jobs = [j for j in list_jobs(project=project) if show_bom or json.loads(j["options"]).get("quote_parts") is None]
+    if not jobs:
+        st.caption("No jobs yet for this project.")
+        return
+    st.dataframe(jobs_table(jobs), hide_index=True, use_container_width=True)
+
+    by_id = {j["id"]: j for j in jobs}
+    if st.session_state["job_selected"] not in by_id:
+        st.session_state["job_selected"] = jobs[0]["id"]
+    job_id = st.selectbox(
+        "Job",
+        options=list(by_id),
+        format_func=lambda i: f'#{i} {by_id[i]["title"]} ({by_id[i]["kind"]}, {by_id[i]["status"]})',
+        key="job_selected",
+    )
+    job = by_id[job_id]
+    finished = job["n_done"] + job["n_failed"]
+    st.progress(finished / job["n_items"], text=f'{job["status"].capitalize()}: {finished} / {job["n_items"]}')
+
+    items = [it for it in job_items(job_id) if it["status"] in ("done", "failed")]
+    table = items_table(items) if items else None
+    if table is not None:
+        st.dataframe(table, hide_index=True, use_container_width=True, height=240)
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        if job["status"] in ACTIVE:
+            if st.button("Cancel Job"):
+                cancel_job(job_id)
+                st.rerun(scope="fragment")
+        elif st.button("Delete Job"):
+            delete_job(job_id)
+            st.rerun(scope="fragment")
+    with c2:
+        if table is not None:
+            st.download_button(
+                "Download Results (CSV)",
+                data=table.to_csv(index=False).encode("utf-8"),
+                file_name=f"job_{job_id}_results.csv",
+                mime="text/csv",
+            )
+    with c3:
+        if job["kind"] == "reports" and job["n_done"]:
+            st.download_button(
+                "Download Quotes (ZIP)",
+                data=job_archive(job_id, job["n_done"]),
+                file_name=f"job_{job_id}_quotes.zip",
+                mime="application/zip",
+            )
+
+
+get_job_runner()
+render_job_submit(param, show_bom)
+render_jobs(show_bom)
@@ -0,0 +1,230 @@
+# atlas.py
+# 預先計算的設計圖譜：在常見 diameter / FOV / 解析度網格上離線跑 calculate，
+# 存成 structured .npy（np.load mmap_mode="r" 直接映射）+ .json（網格軸與建置參數）
+# 網格是規則格點 → 每軸 searchsorted 就是空間索引，查詢不掃描整張表
+# 只給輸入時的快速估算。格點完全命中也照樣跑 calculate，不拿圖譜的列當結果：
+#   每格只存 FIELDS 的摘要（float32），Calculate 之後的 BOM / 報價 / 功耗圖 / 佈線 / PSU 都要
+#   每列 LED / PWM / scan 數、scan 候選等完整欄位；calculate 一次約 0.1 ms，也沒有東西可省
+# 過期判斷：catalog.json 與計算程式（calculator / hardware / catalog）的 sha1，
+# 以及建置參數（ENGINEERING_DEFAULTS、led_count_mode）
+#
+# 建置：python atlas.py [prefix]；app 第一次用到時若不存在 / 過期，ensure_atlas 在背景 process 跑同一個指令
+import hashlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import numpy as np
+from calculator import calculate, ENGINEERING_DEFAULTS
+from catalog import CATALOG_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ATLAS_PREFIX = os.path.join(HERE, "atlas")
+MODEL_FILES = [CATALOG_PATH] + [os.path.join(HERE, f) for f in ("calculator.py", "hardware.py", "catalog.py")]
+BUILD_LUMINANCE = 800.0
+
+AXES = {
+    "diameter": [float(d) for d in range(2000, 20001, 250)],
+    "fov_h": [180.0, 360.0],
+    "fov_v_n": [45.0, 67.5, 90.0],
+    "fov_v_s": [0.0, 33.75, 45.0],
+    "resolution_h": [1920.0, 2048.0, 3840.0, 4096.0, 7680.0, 8192.0],
+    "frame_rate": [60.0, 120.0],
+}
+
+# room_size_h 以 bottom_edge_height = 0 儲存，LED_power_W 以建置時 luminance 儲存（與 luminance 成正比）
+FIELDS = [
+    ("ok", "u1"),
+    ("pitch_mm", "f4"),
+    ("resolution_v_final", "i4"),
+    ("fov_v_n_final", "f4"),
+    ("fov_v_s_final", "f4"),
+    ("n_equator_final", "i4"),
+    ("n_vertical_final", "i4"),
+    ("width_per_module_mm", "f4"),
+    ("height_per_module_mm", "f4"),
+    ("display_area", "f4"),
+    ("total_n_module", "i4"),
+    ("total_n_hub", "f4"),
+    ("total_n_controller", "i4"),
+    ("total_n_led_kpcs", "f4"),
+    ("LED_power_W", "f4"),
+    ("system_power_W", "f4"),
+    ("weight", "f4"),
+    ("room_size_w", "f4"),
+    ("room_size_l", "f4"),
+    ("room_size_h", "f4"),
+]
+
+
+def model_fingerprint():
+    # catalog.json（LED 效率、IC 電流…）或計算程式改了，圖譜就過期
+    h = hashlib.sha1()
+    for path in MODEL_FILES:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def default_base_param():
+    # app 的快速估算與 python atlas.py 用的建置參數
+    return dict(ENGINEERING_DEFAULTS, luminance=BUILD_LUMINANCE, led_count_mode="average")
+
+
+def _base_meta(base_param, axes):
+    # json round trip：與 .json 內的值比較時型別一致
+    return json.loads(json.dumps({k: v for k, v in base_param.items() if k not in axes}))
+
+
+def build_atlas(base_param, prefix=ATLAS_PREFIX, axes=AXES):
+    names = list(axes.keys())
+    shape = tuple(len(axes[n]) for n in names)
+    dtype = np.dtype(FIELDS)
+
+    # 先寫暫存檔再 rename：建置中（或另一個 process 同時建置）讀到的不會是寫一半的檔案
+    tmp = f"{prefix}.{os.getpid()}.tmp"
+    data = np.lib.format.open_memmap(tmp + ".npy", mode="w+", dtype=dtype, shape=(int(np.prod(shape)),))
+
+    p = dict(base_param)
+    p["bottom_edge_height"] = 0.0
+    for i, values in enumerate(itertools.product(*(axes[n] for n in names))):
+        p.update(zip(names, values))
+        try:
+            r = calculate(p)
+        except (ValueError, ZeroDivisionError, OverflowError):
+            continue
+        row = data[i]
+        row["ok"] = 1
+        for field, _ in FIELDS[1:]:
+            row[field] = r[field]
+
+    data.flush()
+    del data
+
+    meta = {
+        "model_sha1": model_fingerprint(),
+        "axes": {n: list(axes[n]) for n in names},
+        "luminance": float(base_param["luminance"]),
+        "base_param": _base_meta(base_param, axes),
+    }
+    with open(tmp + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp + ".npy", prefix + ".npy")
+    os.replace(tmp + ".json", prefix + ".json")
+
+    return prefix
+
+
+def load_atlas(prefix=ATLAS_PREFIX, base_param=None):
+    # 檔案不存在或已過期（計算程式 / catalog 改了，或建置參數與 base_param 不同）→ None
+    if not (os.path.exists(prefix + ".npy") and os.path.exists(prefix + ".json")):
+        return None
+    with open(prefix + ".json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("model_sha1") != model_fingerprint():
+        return None
+    if base_param is not None and meta.get("base_param") != _base_meta(base_param, meta["axes"]):
+        return None
+    names = list(meta["axes"].keys())
+    axes = [np.asarray(meta["axes"][n], dtype=float) for n in names]
+    data = np.load(prefix + ".npy", mmap_mode="r")
+    return {
+        "names": names,
+        "axes": axes,
+        "shape": tuple(len(a) for a in axes),
+        "data": data,
+        "meta": meta,
+    }
+
+
+_LOCK = threading.Lock()
+_LOADED = {}    # prefix → atlas
+_BUILDS = {}    # prefix → subprocess.Popen
+
+
+def ensure_atlas(prefix=ATLAS_PREFIX):
+    # 回傳已載入的圖譜；不存在或過期 → 在背景 process 建置（約 10 秒，不占 app 的 GIL）並回傳 None，
+    # 建好之後的下一次呼叫就載入。每個 process 只啟動一次建置（失敗也不重試）
+    with _LOCK:
+        atlas = _LOADED.get(prefix)
+        if atlas is not None:
+            return atlas
+        build = _BUILDS.get(prefix)
+        if build is not None and build.poll() is None:
+            return None
+        atlas = load_atlas(prefix, default_base_param())
+        if atlas is not None:
+            _LOADED[prefix] = atlas
+        elif build is None:
+            _BUILDS[prefix] = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), prefix],
+                cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        return atlas
+
+
+def atlas_building(prefix=ATLAS_PREFIX):
+    build = _BUILDS.get(prefix)
+    return build is not None and build.poll() is None
+
+
+def _nearest(axis, value):
+    i = int(np.searchsorted(axis, value))
+    if i <= 0:
+        return 0
+    if i >= len(axis):
+        return len(axis) - 1
+    return i if (axis[i] - value) < (value - axis[i - 1]) else i - 1
+
+
+def lookup(atlas, param):
+    # 最近格點；若該格 calculate 失敗，沿 diameter 軸找最近的可用格
+    # param 的工程參數或 led_count_mode 與建置時不同 → None（圖譜的數字不適用）
+    if atlas is None:
+        return None
+    for key, value in atlas["meta"]["base_param"].items():
+        if key != "luminance" and key in param and param[key] != value:
+            return None
+
+    idx = [_nearest(axis, float(param[name])) for name, axis in zip(atlas["names"], atlas["axes"])]
+    exact = all(
+        np.isclose(axis[i], float(param[name]), rtol=0, atol=1e-6)
+        for name, axis, i in zip(atlas["names"], atlas["axes"], idx)
+    )
+
+    data = atlas["data"]
+    flat = int(np.ravel_multi_index(idx, atlas["shape"]))
+    if not data["ok"][flat]:
+        exact = False
+        d_axis = atlas["names"].index("diameter")
+        line = list(idx)
+        line[d_axis] = np.arange(atlas["shape"][d_axis])
+        cand = np.ravel_multi_index(tuple(np.broadcast_arrays(*line)), atlas["shape"])
+        ok = np.flatnonzero(data["ok"][cand])
+        if len(ok) == 0:
+            return None
+        nearest = ok[np.argmin(np.abs(ok - idx[d_axis]))]
+        flat = int(cand[nearest])
+        idx[d_axis] = int(nearest)
+
+    row = data[flat]
+    out = {field: row[field].item() for field, _ in FIELDS[1:]}
+
+    # luminance / bottom_edge_height 不在網格上，依線性關係換算
+    led_power = out["LED_power_W"] * float(param["luminance"]) / atlas["meta"]["luminance"]
+    out["LED_power_W"] = led_power
+    out["total_power_W"] = (led_power + out["system_power_W"]) * 1.2 / 1000
+    out["room_size_h"] += float(param.get("bottom_edge_height", 0.0))
+
+    out["exact"] = exact
+    out["grid_param"] = {name: float(axis[i]) for name, axis, i in zip(atlas["names"], atlas["axes"], idx)}
+    return out
+
+
+if __name__ == "__main__":
+    base = default_base_param()
+    prefix = sys.argv[1] if len(sys.argv) > 1 else ATLAS_PREFIX
+    build_atlas(base, prefix)
+    print(f"Atlas written to {prefix}.npy / {prefix}.json")
@@ -0,0 +1,177 @@
+# cabling.py
+# 佈線規劃：每片模組 → hub（receiver），每個 hub → controller 的 port
+# 做法：以蛇形（serpentine）走訪順序把相鄰模組串在一起，依容量切段；
+# 多種走訪方式一起向量化評估，取球面佈線總長最短者。O(N)，5 萬片以上也只要毫秒級
+import numpy as np
+import pandas as pd
+from catalog import default_part
+from module_power import module_grid_shape
+
+DEFAULT_BAND_WIDTHS = (1, 2, 3, 4, 6, 8)
+
+
+def module_centers(result):
+    # 模組中心經緯度 (deg)，shape (n_v, n_e)；row 0 在最北
+    n_v, n_e = module_grid_shape(result)
+    apm_h = float(result["angle_per_module_h_deg"])
+    apm_v = float(result["angle_per_module_v_deg"])
+    lon = -apm_h * n_e / 2 + (np.arange(n_e) + 0.5) * apm_h
+    lat = float(result["fov_v_n_final"]) - (np.arange(n_v) + 0.5) * apm_v
+    return np.meshgrid(lon, lat)
+
+
+def surface_distance(radius, lon1, lat1, lon2, lat2):
+    # 球面大圓距離 (haversine)，可 broadcast
+    lon1, lat1, lon2, lat2 = (np.deg2rad(np.asarray(v, dtype=float)) for v in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def serpentine_order(n_v, n_e, band, by="column"):
+    # 回傳走訪順序的 module_id（column-major：c * n_v + r）
+    # by="column"：每 band 欄一組，由上往下；組內左右來回，組間上下來回
+    # by="row"：行列對調
+    r, c = np.meshgrid(np.arange(n_v), np.arange(n_e), indexing="ij")
+    if by == "column":
+        band_axis, along_axis, n_band_axis, n_along = c, r, n_e, n_v
+    else:
+        band_axis, along_axis, n_band_axis, n_along = r, c, n_v, n_e
+
+    group = band_axis // band
+    offset = band_axis % band
+    width = np.minimum(band, n_band_axis - group * band)
+
+    along = np.where(group % 2 == 0, along_axis, n_along - 1 - along_axis)
+    across = np.where(along % 2 == 0, offset, width - 1 - offset)
+    key = (group * n_along + along) * band + across
+
+    module_id = c * n_v + r
+    return module_id.ravel()[np.argsort(key.ravel(), kind="stable")]
+
+
+def _chain_length(pos_lon, pos_lat, chain_id, radius):
+    # 同一 chain 中相鄰節點距離總和
+    same = chain_id[1:] == chain_id[:-1]
+    d = surface_distance(radius, pos_lon[:-1], pos_lat[:-1], pos_lon[1:], pos_lat[1:])
+    return float(np.sum(d[same]))
+
+
+def _evaluate_order(order, lon_flat, lat_flat, radius, n_per_rx, hubs_per_port, hubs_per_controller, controller_pos):
+    n = len(order)
+    m_lon = lon_flat[order]
+    m_lat = lat_flat[order]
+    hub = np.arange(n) // n_per_rx
+    module_cable = _chain_length(m_lon, m_lat, hub, radius)
+
+    # hub 位置 = 該組第一片模組
+    first = np.flatnonzero(np.r_[True, hub[1:] != hub[:-1]])
+    h_lon = m_lon[first]
+    h_lat = m_lat[first]
+    n_hub = len(first)
+    controller = np.arange(n_hub) // hubs_per_controller
+    port = (np.arange(n_hub) % hubs_per_controller) // hubs_per_port
+    port_key = controller * (hubs_per_controller // hubs_per_port + 1) + port
+    hub_cable = _chain_length(h_lon, h_lat, port_key, radius)
+
+    # controller → 每個 port 第一個 hub
+    port_first = np.flatnonzero(np.r_[True, port_key[1:] != port_key[:-1]])
+    feed_cable = float(np.sum(surface_distance(radius, controller_pos[0], controller_pos[1],
+                                               h_lon[port_first], h_lat[port_first])))
+
+    return {
+        "hub_of_position": hub,
+        "controller_of_hub": controller,
+        "port_of_hub": port,
+        "module_cable_mm": module_cable,
+        "hub_cable_mm": hub_cable,
+        "feed_cable_mm": feed_cable,
+        "total_cable_mm": module_cable + hub_cable + feed_cable,
+    }
+
+
+def plan_cabling(result, controller_pos=None, band_widths=DEFAULT_BAND_WIDTHS,
+                 port_pixel_capacity=None, controller_pixel_capacity=None, controller_ports=None):
+    n_v, n_e = module_grid_shape(result)
+    n_per_rx = int(result["n_module_per_receiver"])
+    module_px = int(result["px_per_module_h"]) * int(result["px_per_module_v"])
+    hub_px = module_px * n_per_rx
+    radius = float(result["diameter_mm"]) / 2
+
+    controller = default_part("controller", result["pitch_mm"])
+    port_cap = int(port_pixel_capacity or controller["port_pixel_capacity"])
+    ctrl_cap = int(controller_pixel_capacity or controller["pixel_capacity"])
+    ports = int(controller_ports or controller["ports"])
+
+    if module_px > int(result["receiver_capacity"]):
+        raise ValueError(f"One module ({module_px} px) exceeds receiver capacity {result['receiver_capacity']}")
+    if hub_px > port_cap:
+        raise ValueError(f"One hub ({hub_px} px) exceeds controller port capacity {port_cap}")
+
+    hubs_per_port = port_cap // hub_px
+    hubs_per_controller = min(ctrl_cap // hub_px, ports * hubs_per_port)
+
+    if controller_pos is None:
+        # 預設 controller 在球幕底邊中央
+        controller_pos = (0.0, -float(result["fov_v_s_final"]))
+
+    lon, lat = module_centers(result)
+    lon_flat = lon.T.ravel()   # 依 module_id（column-major）
+    lat_flat = lat.T.ravel()
+
+    best = None
+    for by in ("column", "row"):
+        for band in band_widths:
+            if band > (n_e if by == "column" else n_v):
+                continue
+            order = serpentine_order(n_v, n_e, band, by=by)
+            ev = _evaluate_order(order, lon_flat, lat_flat, radius, n_per_rx,
+                                 hubs_per_port, hubs_per_controller, controller_pos)
+            if best is None or ev["total_cable_mm"] < best["total_cable_mm"]:
+                best = dict(ev, order=order, strategy=f"{by}-serpentine x{band}")
+
+    order = best["order"]
+    n = len(order)
+    hub_of_position = best["hub_of_position"]
+    module_hub = np.empty(n, dtype=np.int64)
+    module_hub[order] = hub_of_position
+    module_chain_pos = np.empty(n, dtype=np.int64)
+    module_chain_pos[order] = np.arange(n) % n_per_rx
+
+    n_hub = int(hub_of_position[-1]) + 1
+    n_controller = int(best["controller_of_hub"][-1]) + 1
+
+    return {
+        "strategy": best["strategy"],
+        "module_hub": module_hub,
+        "module_chain_pos": module_chain_pos,
+        "hub_controller": best["controller_of_hub"],
+        "hub_port": best["port_of_hub"],
+        "n_hub": n_hub,
+        "n_controller": n_controller,
+        "hubs_per_port": hubs_per_port,
+        "hubs_per_controller": hubs_per_controller,
+        "module_cable_m": best["module_cable_mm"] / 1000,
+        "hub_cable_m": best["hub_cable_mm"] / 1000,
+        "feed_cable_m": best["feed_cable_mm"] / 1000,
+        "total_cable_m": best["total_cable_mm"] / 1000,
+    }
+
+
+def assignment_table(result, plan):
+    # 一列一片模組，可直接 to_csv / to_excel 給安裝人員
+    n_v, n_e = module_grid_shape(result)
+    lon, lat = module_centers(result)
+    module_id = np.arange(n_v * n_e)
+    hub = plan["module_hub"]
+
+    return pd.DataFrame({
+        "module_id": module_id,
+        "row": module_id % n_v + 1,
+        "column": module_id // n_v + 1,
+        "lon_deg": lon.T.ravel(),
+        "lat_deg": lat.T.ravel(),
+        "hub": hub + 1,
+        "chain_pos": plan["module_chain_pos"] + 1,
+        "controller": plan["hub_controller"][hub] + 1,
+        "port": plan["hub_port"][hub] + 1,
+    }).sort_values(["controller", "port", "hub", "chain_pos"], kind="stable")
@@ -1,8 +1,76 @@
 # calculator.py
+import io
 import math
+import hashlib
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import proj3d
+from catalog import led_package_for_pitch, default_part
+from hardware import receiver_capacity_at, modules_per_receiver, scan_feasibility
+from metrics import timed_render
+
+# app.py 的內部工程預設值（不開放給使用者輸入）
+ENGINEERING_DEFAULTS = {
+    "module_angle_limit": 6,
+    "module_size_limit": 250,
+    "dclk_limit": 10,
+    "waveform_duty": 0.7,
+    "scan_ratio_limit": 45,
+    "channel_threshold_for_double_scan": 64,
+    "calibration_ratio": 0.1,
+    "gray_bits": 16,
+    "psu_derating": 0.8,
+}
+
+
+def min_n_equator(arc_h, module_width_limit):
+    # 最少水平模組數：不超過模組寬度上限，且為 4 的倍數
+    n_equator = math.ceil(arc_h / module_width_limit)
+    if n_equator % 4 != 0:
+        n_equator += (4 - n_equator % 4)
+    return n_equator
+
+
+def solve_n_equator(arc_h, module_width_limit, resolution_h):
+    n_equator = min_n_equator(arc_h, module_width_limit)
+    # n_equator 每次 +4，resolution_h 必須是 4 的倍數且不小於起點，否則迴圈不會結束
+    if n_equator <= 0 or resolution_h % 4 != 0 or n_equator > resolution_h:
+        raise ValueError(
+            f"No module count divides resolution_h={resolution_h} "
+            f"(start={n_equator}, must be a multiple of 4)"
+        )
+    while resolution_h % n_equator != 0:
+        n_equator += 4
+    return n_equator
+
+
+def room_size(diameter, fov_h, fov_v_n_final, fov_v_s_final, bottom_edge_height=0.0):
+    # 向量化：diameter / fov 可為 scalar 或 numpy array（broadcast）
+    diameter = np.asarray(diameter, dtype=float)
+    fov_h = np.asarray(fov_h, dtype=float)
+    fov_v_n_final = np.asarray(fov_v_n_final, dtype=float)
+    fov_v_s_final = np.asarray(fov_v_s_final, dtype=float)
+
+    half_h = (fov_h / 2) / 180 * np.pi
+    over_h = ((fov_h - 180) / 2) / 180 * np.pi
+
+    room_size_w = np.where(fov_h <= 180, diameter * np.sin(half_h), diameter) + 3000
+    room_size_l = np.where(
+        fov_h <= 180,
+        diameter / 2 - (diameter / 2 * np.cos(half_h)),
+        diameter / 2 + (diameter / 2 * np.sin(over_h)),
+    ) + 3000
+    room_size_h = diameter / 2 * (np.sin(fov_v_n_final / 180 * np.pi) + np.sin(fov_v_s_final / 180 * np.pi)) \
+        + 1500 + bottom_edge_height
+
+    return room_size_w, room_size_l, room_size_h
+
+
+def ring_led_counts(diameter, fov_h, n_equator, pitch, latitudes):
+    # 每片模組在指定緯度 (deg) 的水平 LED 數（該圈周長 / 模組數 / pitch，四捨五入），可 broadcast
+    # fov_v_n_final / fov_v_s_final 進位後可能超過 90°：越過極點的列算出負值，實際上沒有 LED → 0
+    circumference = diameter * np.pi * np.cos(np.deg2rad(latitudes))
+    return np.maximum(np.round(circumference * fov_h / 360 / n_equator / pitch), 0)
 
 
 def calculate(param: dict) -> dict:
@@ -20,7 +88,13 @@ def calculate(param: dict) -> dict:
     scan_ratio_limit = int(param["scan_ratio_limit"])
     channel_threshold_for_double_scan = param["channel_threshold_for_double_scan"]
     calibration_ratio = param["calibration_ratio"]
+    gray_bits = param.get("gray_bits", 16)
+    psu_derating = param.get("psu_derating", 0.8)
     bottom_edge_height = float(param.get("bottom_edge_height", 0.0))
+    # "average"：每片模組 LED 數 = 上下兩邊 LED 數平均 × 像素列數；"exact"：逐像素列依緯度計算後加總
+    led_count_mode = param.get("led_count_mode", "average")
+    if led_count_mode not in ("average", "exact"):
+        raise ValueError(f"Unknown led_count_mode: {led_count_mode}")
 
     arc_h = math.pi * diameter * (fov_h / 360)
     pitch = arc_h / resolution_h
@@ -28,24 +102,16 @@ def calculate(param: dict) -> dict:
     fov_v = float(fov_v_n) + float(fov_v_s)
     resolution_v = int(round(float(resolution_h) * (float(fov_v) / float(fov_h))))
 
-    if frame_rate == 60:
-        receiver_capacity = 262144
-    elif frame_rate == 120:
-        receiver_capacity = 131072
-    else:
-        # 先用保守值，避免 UI 直接炸（你也可以改成 raise）
-        receiver_capacity = 262144
+    # receiver 帶載量 = pixel_rate / frame_rate（catalog.json；60 Hz → 262144，120 Hz → 131072）
+    if frame_rate <= 0:
+        raise ValueError(f"frame_rate must be greater than 0 (got {frame_rate})")
+    receiver = default_part("receiver", pitch)
+    receiver_capacity = int(receiver_capacity_at(receiver["pixel_rate"], frame_rate))
 
     arc_length_limit = diameter * math.pi / (360 / module_angle_limit)
     module_width_limit = min(module_size_limit, arc_length_limit)
 
-    n_equator = math.ceil(arc_h / module_width_limit)
-    if n_equator % 4 != 0:
-        n_equator += (4 - n_equator % 4)
-    while resolution_h % n_equator != 0:
-        n_equator += 4
-
-    n_equator_final = n_equator
+    n_equator_final = solve_n_equator(arc_h, module_width_limit, resolution_h)
     angle_per_module = fov_h / n_equator_final
     width_per_module = arc_h / n_equator_final
     px_per_module_h = resolution_h // n_equator_final
@@ -90,26 +156,16 @@ def calculate(param: dict) -> dict:
 
     display_area = abs(2 * math.pi * (diameter/2000) * (diameter/2000) * (math.sin(fov_v_n_final / 180 * math.pi)+math.sin(fov_v_s_final / 180 * math.pi)) * fov_h / 360)
 
-    if px_per_module_h * px_per_module_v * 8 <= receiver_capacity:
-        n_module_per_receiver = 8
-    elif px_per_module_h * px_per_module_v * 4 <= receiver_capacity:
-        n_module_per_receiver = 4
-    elif px_per_module_h * px_per_module_v * 2 <= receiver_capacity:
-        n_module_per_receiver = 2
-    else:
-        n_module_per_receiver = 1
-
-    max_data_groups_per_module = int(32 / n_module_per_receiver)
+    n_module_per_receiver = int(modules_per_receiver(px_per_module_h * px_per_module_v, receiver_capacity))
 
-    scan_candidates = []
-    scan_min = max(8, px_per_module_v // max_data_groups_per_module)
-    for scan in range(int(scan_min), scan_ratio_limit + 1):
-        if px_per_module_v % scan == 0 and (scan * px_per_module_h * frame_rate * 16 / 1_000_000) <= dclk_limit:
-            scan_candidates.append(scan)
+    scans, scan_ok = scan_feasibility(
+        px_per_module_h, px_per_module_v, n_module_per_receiver, frame_rate, gray_bits, dclk_limit, scan_ratio_limit
+    )
+    scan_candidates = scans[scan_ok].tolist()
 
     max_scan = max(scan_candidates) if scan_candidates else scan_ratio_limit
     data_groups_per_module = px_per_module_v / max_scan
-    dclk = max_scan * px_per_module_h * frame_rate * 16 / 1_000_000
+    dclk = max_scan * px_per_module_h * frame_rate * gray_bits / 1_000_000
 
     # ===== 每片燈板水平方向 LED 顆數（你的公式保留）=====
     horizontal_led_counts_lower = []
@@ -133,6 +189,16 @@ def calculate(param: dict) -> dict:
         horizontal_led_counts_lower.append(lower)
         horizontal_led_counts_upper.append(upper)
 
+    # ===== exact：每一像素列中心的緯度（由北往南），整批算出每列 LED 數 =====
+    if led_count_mode == "exact":
+        px_row_step = angle_per_module_v / px_per_module_v
+        px_row_lat = fov_v_n_final - (np.arange(n_vertical_final * px_per_module_v) + 0.5) * px_row_step
+        pixel_row_led_counts = ring_led_counts(
+            diameter, fov_h, n_equator_final, pitch, px_row_lat
+        ).reshape(n_vertical_final, px_per_module_v)
+        exact_module_led = pixel_row_led_counts.sum(axis=1)
+        exact_max_pixel = pixel_row_led_counts.max(axis=1)
+
     # ===== IC / LED count（保留你的算法）=====
     n_module_led_counts = []
     n_module_pwm_counts = []
@@ -140,10 +206,14 @@ def calculate(param: dict) -> dict:
 
     for i in range(1, n_vertical_final + 1):
         board_index = i
-        n_module_led = round((horizontal_led_counts_upper[i - 1] + horizontal_led_counts_lower[i - 1]) * px_per_module_v / 2, 0)
+        if led_count_mode == "exact":
+            n_module_led = float(exact_module_led[i - 1])
+            max_pixel = float(exact_max_pixel[i - 1])
+        else:
+            n_module_led = round((horizontal_led_counts_upper[i - 1] + horizontal_led_counts_lower[i - 1]) * px_per_module_v / 2, 0)
+            max_pixel = max(horizontal_led_counts_upper[board_index - 1], horizontal_led_counts_lower[board_index - 1])
         n_module_led_counts.append(n_module_led)
 
-        max_pixel = max(horizontal_led_counts_upper[board_index - 1], horizontal_led_counts_lower[board_index - 1])
         scan_region = 1 if max_pixel <= channel_threshold_for_double_scan else 2
         n_module_scan = math.ceil(max_scan / 8) * scan_region * data_groups_per_module
         n_module_scan_counts.append(n_module_scan)
@@ -156,26 +226,17 @@ def calculate(param: dict) -> dict:
     total_n_pwm = sum(n_module_pwm_counts) * n_equator_final
     total_n_module = n_equator_final * n_vertical_final
     total_n_hub = total_n_module / n_module_per_receiver
-    total_n_controller = math.ceil(px_per_module_h * px_per_module_v * total_n_module / 3840 / 2160)
-
-    # ===== Power（保留你原本常數與邏輯）=====
-    LED_0606_R, LED_0606_G, LED_0606_B = 12.09, 27.59, 5.09
-    LED_1010_R, LED_1010_G, LED_1010_B = 15, 36, 6
-    LED_1515_R, LED_1515_G, LED_1515_B = 4.2, 22.46, 4.56
-    LED_2020_R, LED_2020_G, LED_2020_B = 7.15, 24.8, 7
-
-    if pitch < 1.2:
-        LED_R, LED_G, LED_B = LED_0606_R, LED_0606_G, LED_0606_B
-        RR_V, GB_V = 2.8, 3.8
-    elif pitch < 1.7:
-        LED_R, LED_G, LED_B = LED_1010_R, LED_1010_G, LED_1010_B
-        RR_V, GB_V = 4.2, 4.2
-    elif pitch < 2.2:
-        LED_R, LED_G, LED_B = LED_1515_R, LED_1515_G, LED_1515_B
-        RR_V, GB_V = 4.2, 4.2
-    else:
-        LED_R, LED_G, LED_B = LED_2020_R, LED_2020_G, LED_2020_B
-        RR_V, GB_V = 4.2, 4.2
+    controller = default_part("controller", pitch)
+    total_n_controller = math.ceil(px_per_module_h * px_per_module_v * total_n_module / controller["pixel_capacity"])
+
+    # ===== Power（LED 效率 / 電壓 / IC 電流由 catalog.json 依 pitch 查表）=====
+    led_package = led_package_for_pitch(pitch)
+    LED_R, LED_G, LED_B = led_package["efficacy_r"], led_package["efficacy_g"], led_package["efficacy_b"]
+    RR_V, GB_V = led_package["vf_r"], led_package["vf_gb"]
+
+    pwm_ic = default_part("pwm_ic", pitch)
+    scan_ic = default_part("scan_ic", pitch)
+    hub = default_part("hub", pitch)
 
     R_nits = luminance / (1 - calibration_ratio) * 0.2715
     G_nits = luminance / (1 - calibration_ratio) * 0.6715
@@ -189,22 +250,20 @@ def calculate(param: dict) -> dict:
     G_LED_power = (G_current / 1000) * waveform_duty / max_scan * GB_V
     B_LED_power = (B_current / 1000) * waveform_duty / max_scan * GB_V
     LED_power = (R_LED_power + G_LED_power + B_LED_power) * total_n_led * 1000
-    system_power = (total_n_pwm + total_n_scan) * 0.006 * GB_V + total_n_hub * 3
+    system_power = (total_n_pwm * pwm_ic["current_A"] + total_n_scan * scan_ic["current_A"]) * GB_V \
+        + total_n_hub * hub["power_W"]
     total_power = (LED_power + system_power) * 1.2
 
     weight = display_area / 10.4576 * 870
 
-    if fov_h <= 180:
-        room_size_w = diameter * math.sin((fov_h/2)/180*math.pi) + 3000
-        room_size_l = diameter / 2  - (diameter / 2 * math.cos((fov_h/2)/180*math.pi)) + 3000
-    else:
-        room_size_w = diameter + 3000
-        room_size_l = diameter / 2  + (diameter / 2 * math.sin(((fov_h-180)/2)/180*math.pi)) + 3000
-
-    room_size_h = diameter / 2 * (math.sin(fov_v_n_final/180*math.pi) + math.sin(fov_v_s_final/180*math.pi)) + 1500 + bottom_edge_height
+    room_size_w, room_size_l, room_size_h = (
+        float(v) for v in room_size(diameter, fov_h, fov_v_n_final, fov_v_s_final, bottom_edge_height)
+    )
 
-    return {
+    result = {
         # basics
+        "diameter_mm": diameter,
+        "fov_h_deg": fov_h,
         "pitch_mm": pitch,
         "fov_v_deg": fov_v,
         "resolution_v_final": resolution_v_final,
@@ -227,6 +286,8 @@ def calculate(param: dict) -> dict:
         "fov_v_s_final": fov_v_s_final,
         "display_area": display_area,
 
+        "led_count_mode": led_count_mode,
+
         # data
         "n_module_per_receiver": n_module_per_receiver,
         "data_groups_per_module": data_groups_per_module,
@@ -250,12 +311,17 @@ def calculate(param: dict) -> dict:
         "total_n_controller": total_n_controller,
 
         # power
+        "led_package": led_package["package"],
         "R_current_mA": R_current,
         "G_current_mA": G_current,
         "B_current_mA": B_current,
+        "R_LED_power_W": R_LED_power,
+        "G_LED_power_W": G_LED_power,
+        "B_LED_power_W": B_LED_power,
         "LED_power_W": LED_power,
         "system_power_W": system_power,
         "total_power_W": total_power/1000,
+        "psu_derating": psu_derating,     # PSU 裝箱不在這裡做，見 psu.with_psu
 
         # mechanical
         "weight": weight,
@@ -263,8 +329,25 @@ def calculate(param: dict) -> dict:
         "room_size_l": room_size_l,
         "room_size_h": room_size_h,
     }
+    return result
 
 
+def result_digest(param, result):
+    # 參數 + 結果的 sha1：app 的 st.cache_data 不 hash _param / _result，改用這個當 key
+    h = hashlib.sha1()
+    for d in (param, result):
+        for k in sorted(d):
+            v = d[k]
+            h.update(k.encode("utf-8"))
+            if isinstance(v, np.ndarray):
+                h.update(f"{v.dtype}{v.shape}".encode("ascii"))
+                h.update(np.ascontiguousarray(v).tobytes())
+            else:
+                h.update(repr(v).encode("utf-8"))
+    return h.hexdigest()
+
+
+@timed_render("build", lambda args, kwargs: kwargs.get("title", args[8] if len(args) > 8 else ""))
 def make_sphere_fig(
     diameter, fov_h, fov_v_n_final, fov_v_s_final,
     n_equator_final, n_vertical_final,
@@ -275,6 +358,9 @@ def make_sphere_fig(
     flip_xy=False,   # ✅ 把球與框在 XY 平面旋轉 180°
     show_room_dims=False,  # ✅ 新增：標出 W/L/H
     show_height_dims=False,
+    face_values=None,       # ✅ (n_vertical_final, n_equator_final) 每片模組的數值 → heatmap
+    face_cmap="inferno",
+    face_label="",
 ):
     R = diameter / 2
     fov_v_n = float(fov_v_n_final)
@@ -285,8 +371,13 @@ def make_sphere_fig(
     phi_min = np.deg2rad(-fov_h / 2)
     phi_max = np.deg2rad(fov_h / 2)
 
-    theta = np.linspace(theta_min, theta_max, n_vertical_final)
-    phi = np.linspace(phi_min, phi_max, n_equator_final)
+    if face_values is None:
+        theta = np.linspace(theta_min, theta_max, n_vertical_final)
+        phi = np.linspace(phi_min, phi_max, n_equator_final)
+    else:
+        # heatmap：格點取模組邊界，一個面 = 一片模組
+        theta = np.linspace(theta_min, theta_max, n_vertical_final + 1)
+        phi = np.linspace(phi_min, phi_max, n_equator_final + 1)
     theta, phi = np.meshgrid(theta, phi)
 
     x = R * np.sin(theta) * np.cos(phi)
@@ -319,13 +410,29 @@ def make_sphere_fig(
     ax = fig.add_subplot(111, projection="3d")
 
     # ===== 球面 =====
-    ax.plot_surface(
-        x, y, z,
-        color="lightblue",
-        edgecolor="gray",
-        linewidth=0.2,
-        alpha=0.85
-    )
+    if face_values is None:
+        ax.plot_surface(
+            x, y, z,
+            color="lightblue",
+            edgecolor="gray",
+            linewidth=0.2,
+            alpha=0.85
+        )
+    else:
+        values = np.asarray(face_values, dtype=float).T
+        norm = plt.Normalize(vmin=float(np.min(values)), vmax=float(np.max(values)))
+        cmap = plt.get_cmap(face_cmap)
+        ax.plot_surface(
+            x, y, z,
+            facecolors=cmap(norm(values)),
+            rstride=1,
+            cstride=1,
+            shade=False,
+            linewidth=0,
+            antialiased=False
+        )
+        mappable = plt.cm.ScalarMappable(norm=norm, cmap=cmap)
+        fig.colorbar(mappable, ax=ax, shrink=0.6, pad=0.02, label=face_label)
     ax.plot(x_eq, y_eq, z_eq, linewidth=2.0)
 
     # ===== 垂直分割線 =====
@@ -588,3 +695,16 @@ def make_sphere_fig(
     return fig
 
 
+
+
+def _figure_title(args, kwargs):
+    return next((t for t in (ax.get_title() for ax in (args[0] if args else kwargs["fig"]).axes) if t), "")
+
+
+@timed_render("rasterize", _figure_title)
+def figure_png(fig, dpi=None):
+    # 圖只 render 一次成 PNG bytes：畫面顯示與報價單匯出共用，不再重畫
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
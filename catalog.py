@@ -0,0 +1,73 @@
+# catalog.py
+# 零件資料庫：catalog.json 只載入一次，依 pitch 區間建索引（bisect，O(log n) 查詢）
+import json
+import math
+import os
+from bisect import bisect_right
+from functools import lru_cache
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+
+
+class PitchIndex:
+    # 區間 [pitch_min, pitch_max)，None = 無界
+    # 把所有端點切成基本區段，預先算好每段涵蓋的項目 → 查詢只需一次 bisect
+    def __init__(self, items):
+        bounds = set()
+        for it in items:
+            for key in ("pitch_min", "pitch_max"):
+                if it.get(key) is not None:
+                    bounds.add(float(it[key]))
+        self.bounds = [-math.inf] + sorted(bounds)
+        self.buckets = [[] for _ in self.bounds]
+
+        for it in items:
+            lo = -math.inf if it.get("pitch_min") is None else float(it["pitch_min"])
+            hi = math.inf if it.get("pitch_max") is None else float(it["pitch_max"])
+            start = bisect_right(self.bounds, lo) - 1
+            stop = len(self.bounds) if hi == math.inf else bisect_right(self.bounds, hi) - 1
+            for seg in range(start, stop):
+                self.buckets[seg].append(it)
+
+    def query(self, pitch):
+        return self.buckets[bisect_right(self.bounds, float(pitch)) - 1]
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def catalog_index(path=CATALOG_PATH):
+    return {category: PitchIndex(items) for category, items in load_catalog(path).items()}
+
+
+def parts_for_pitch(category, pitch_mm, path=CATALOG_PATH):
+    return catalog_index(path)[category].query(pitch_mm)
+
+
+def default_part(category, pitch_mm, path=CATALOG_PATH):
+    parts = parts_for_pitch(category, pitch_mm, path)
+    if not parts:
+        raise ValueError(f"No {category} in catalog for pitch {pitch_mm:.3f} mm")
+    return parts[0]
+
+
+def led_package_for_pitch(pitch_mm, path=CATALOG_PATH):
+    # 功耗模型用的 LED 封裝（效率 / 順向電壓）
+    return default_part("led_package", pitch_mm, path)
+
+
+def led_options_by_pitch(pitch_mm, path=CATALOG_PATH):
+    # 與功耗模型同封裝的 LED 排前面，其餘依 catalog 順序
+    package = led_package_for_pitch(pitch_mm, path)["package"]
+    parts = sorted(parts_for_pitch("led", pitch_mm, path), key=lambda it: it["package"] != package)
+    return {it["part_no"]: it["price_usd"] for it in parts}
+
+
+def part_options(category, pitch_mm, path=CATALOG_PATH):
+    if category == "led":
+        return led_options_by_pitch(pitch_mm, path)
+    return {it["part_no"]: it["price_usd"] for it in parts_for_pitch(category, pitch_mm, path)}
@@ -0,0 +1,365 @@
+# clearance.py
+# 場地點雲（PLY / XYZ 掃描）與球面模組的淨空檢查
+# 座標與 mesh_export / make_sphere_fig 相同：球心在 x = y = 0，地板 z = 0，單位 mm
+#
+# 點雲索引（PointIndex）：均勻 voxel，點依 voxel 編號排序（CSR），與球的設計無關，
+# 同一份掃描換直徑 / 離地高度 / 淨空要求都不必重建
+# 查詢：
+#   1. 每個有點的 voxel 用中心到球面的精確距離判斷，距離 > 淨空 + 半對角線的整格略過
+#   2. 剩下的點只和「角度鄰近」的模組算精確距離
+# 點 p（ρ, θp, φp）到球面矩形（colatitude [t0, t1]、經度 [f0, f1]）的距離：
+#   |p - q|² = (ρ - R)² + 2ρR(1 - g)，g = sinθp sinθ cosΔφ + cosθp cosθ
+#   對任何 θ，最近的經度都是 φp 本身（在範圍內）或角度上最近的那條邊 → cosΔφ 與 θ 無關
+#   g = A sinθ + B cosθ 在 [t0, t1] 的最大值：θ* = atan2(A, B) 在範圍內取 hypot(A, B)，否則取兩端點
+import io
+import math
+import time
+import numpy as np
+import pandas as pd
+from module_power import module_grid_shape
+from sightlines import sphere_center_z
+
+DEFAULT_CLEARANCE = 500.0
+DEFAULT_CELL = 250.0
+DEFAULT_FLOOR_Z = 50.0
+PAIR_CHUNK = 1_000_000
+UNIT_SCALE = {"m": 1000.0, "cm": 10.0, "mm": 1.0, "ft": 304.8, "in": 25.4}
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+# =============================
+# 讀檔
+# =============================
+def _read_ply(data):
+    end = data.find(b"end_header")
+    if not data.startswith(b"ply") or end < 0:
+        raise ValueError("Not a PLY file")
+    body = data.index(b"\n", end) + 1
+    fmt = None
+    elements = []       # [name, count, [(prop, type)], has_list]
+    for line in data[:end].decode("ascii", "replace").splitlines()[1:]:
+        tok = line.split()
+        if not tok:
+            continue
+        if tok[0] == "format":
+            fmt = tok[1]
+        elif tok[0] == "element":
+            elements.append([tok[1], int(tok[2]), [], False])
+        elif tok[0] == "property" and elements:
+            if tok[1] == "list":
+                elements[-1][3] = True
+            else:
+                elements[-1][2].append((tok[2], PLY_TYPES[tok[1]]))
+    if fmt not in ("ascii", "binary_little_endian", "binary_big_endian"):
+        raise ValueError(f"Unsupported PLY format: {fmt}")
+
+    offset = body
+    skip_lines = 0
+    for name, count, props, has_list in elements:
+        names = [p for p, _ in props]
+        if name == "vertex":
+            if has_list or not {"x", "y", "z"} <= set(names):
+                raise ValueError("PLY vertex element must have scalar x, y, z properties")
+            if fmt == "ascii":
+                table = pd.read_csv(io.BytesIO(data[offset:]), sep=r"\s+", header=None, skiprows=skip_lines,
+                                    nrows=count, usecols=[names.index(k) for k in "xyz"], dtype=float, engine="c")
+                return table.to_numpy()
+            order = "<" if fmt == "binary_little_endian" else ">"
+            dtype = np.dtype([(p, order + t) for p, t in props])
+            rec = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            return np.stack([rec[k].astype(float) for k in "xyz"], axis=1)
+        if has_list:
+            raise ValueError(f"PLY element '{name}' with list properties before vertex is not supported")
+        if fmt == "ascii":
+            skip_lines += count
+        else:
+            offset += count * sum(np.dtype(t).itemsize for _, t in props)
+    raise ValueError("PLY file has no vertex element")
+
+
+def _xyz_fields(line):
+    # 前 3 個欄位都是數字 → 回傳分隔符號，否則 None
+    sep = "," if "," in line else r"\s+"
+    tokens = [t for t in (line.split(",") if sep == "," else line.split()) if t.strip()]
+    try:
+        return sep if len(tokens) >= 3 and all(math.isfinite(float(t)) for t in tokens[:3]) else None
+    except ValueError:
+        return None
+
+
+def _read_xyz(data):
+    # 每列 x y z [其他欄位]，空白或逗號分隔；開頭的註解（# / //）、表頭、點數列略過
+    skip, sep = 0, None
+    for line in data[:65536].decode("utf-8", "replace").splitlines():
+        sep = _xyz_fields(line)
+        if sep is not None:
+            break
+        skip += 1
+    if sep is None:
+        raise ValueError("No x y z rows found")
+    table = pd.read_csv(io.BytesIO(data), sep=sep, header=None, skiprows=skip,
+                        usecols=[0, 1, 2], dtype=float, engine="c", skip_blank_lines=False)
+    return table.to_numpy()
+
+
+def load_point_cloud(fh, name="", units="m"):
+    # 回傳 (N, 3) float64（mm）；副檔名 .ply → PLY，其餘當成 XYZ 文字檔
+    data = fh.read() if hasattr(fh, "read") else bytes(fh)
+    if name.lower().endswith(".ply") or data[:3] == b"ply":
+        points = _read_ply(data)
+    else:
+        points = _read_xyz(data)
+    points = points[np.isfinite(points).all(axis=1)] * UNIT_SCALE[units]
+    if not len(points):
+        raise ValueError("Point cloud is empty")
+    return points
+
+
+# =============================
+# 空間索引
+# =============================
+class PointIndex:
+    # 點依 voxel 編號排序；cells = 有點的 voxel（整數座標），starts = 每格在 points 內的起點（CSR）
+    def __init__(self, points, cell=DEFAULT_CELL):
+        points = np.asarray(points, dtype=float)
+        self.cell = float(cell)
+        self.origin = points.min(axis=0)
+        ijk = ((points - self.origin) * (1 / self.cell)).astype(np.int64)     # 非負 → 截斷 = floor
+        dims = ijk.max(axis=0) + 1
+        key = (ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+        self.points = points[order]
+        first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        self.starts = np.append(first, len(key))
+        self.cells = ijk[order[first]]
+        self.n_points = len(points)
+
+    @property
+    def cell_centers(self):
+        return self.origin + (self.cells + 0.5) * self.cell
+
+    @property
+    def half_diagonal(self):
+        return self.cell * math.sqrt(3) / 2
+
+    def gather(self, cell_ids):
+        # 多個 voxel 的點（依 cell_ids 順序串接）
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        lo, hi = self.starts[cell_ids], self.starts[cell_ids + 1]
+        counts = hi - lo
+        idx = np.repeat(lo - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+        return self.points[idx]
+
+
+# =============================
+# 距離
+# =============================
+def dome_frame(result, bottom_edge_height=0.0):
+    # 回傳 (球心, R, 每列 colatitude 邊界 (n_v + 1), 每欄經度邊界 (n_e + 1))，角度為 rad；與 mesh_export 相同
+    n_v, n_e = module_grid_shape(result)
+    R = float(result["diameter_mm"]) / 2
+    fov_h = float(result["fov_h_deg"])
+    theta_edges = np.deg2rad(np.linspace(90 - float(result["fov_v_n_final"]), 90 + float(result["fov_v_s_final"]), n_v + 1))
+    phi_edges = np.deg2rad(np.linspace(-fov_h / 2, fov_h / 2, n_e + 1))
+    center = np.array([0.0, 0.0, sphere_center_z(result, bottom_edge_height)])
+    return center, R, theta_edges, phi_edges
+
+
+def _angle_in(phi, lo, hi):
+    # 經度在 [lo, hi] 內（hi - lo ≤ 2π，可跨 ±π）
+    return np.mod(phi - lo, 2 * np.pi) <= (hi - lo) + 1e-12
+
+
+def spherical(p):
+    # p：(..., 3) 相對球心 → (ρ, sinθ, cosθ, φ)
+    rh = np.hypot(p[..., 0], p[..., 1])
+    rho = np.hypot(rh, p[..., 2])
+    theta = np.arctan2(rh, p[..., 2])
+    return rho, np.sin(theta), np.cos(theta), np.arctan2(p[..., 1], p[..., 0])
+
+
+def patch_distance(p, R, t0, t1, f0, f1, sph=None):
+    # p：(..., 3) 相對球心（或直接給 sph = spherical(p)）；模組邊界可 broadcast
+    rho, st, ct, phi = spherical(p) if sph is None else sph
+    cos_d = np.where(_angle_in(phi, f0, f1), 1.0, np.maximum(np.cos(phi - f0), np.cos(phi - f1)))
+    a = st * cos_d
+    g = np.maximum(a * np.sin(t0) + ct * np.cos(t0), a * np.sin(t1) + ct * np.cos(t1))
+    t_star = np.arctan2(a, ct)
+    g = np.where((t_star >= t0) & (t_star <= t1), np.hypot(a, ct), g)
+    return np.sqrt((rho - R) ** 2 + 2 * rho * R * np.maximum(1 - g, 0.0))
+
+
+def _module_windows(p, R, theta_edges, phi_edges, clearance):
+    # 每點可能在 clearance 內的模組列 / 欄範圍：|p - q|² = (ρ - R)² + 2ρR(1 - cos α) → 角距 α 上界
+    n_v, n_e = len(theta_edges) - 1, len(phi_edges) - 1
+    rh = np.hypot(p[:, 0], p[:, 1])
+    rho = np.hypot(rh, p[:, 2])
+    theta = np.arctan2(rh, p[:, 2])
+    phi = np.arctan2(p[:, 1], p[:, 0])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_a = 1 - np.maximum(clearance ** 2 - (rho - R) ** 2, 0.0) / (2 * rho * R)
+    alpha = np.where(np.isfinite(cos_a), np.arccos(np.clip(cos_a, -1.0, 1.0)), np.pi)
+    dt = theta_edges[1] - theta_edges[0]
+    r0 = np.clip(np.floor((theta - alpha - theta_edges[0]) / dt), 0, n_v - 1).astype(np.int64)
+    r1 = np.clip(np.floor((theta + alpha - theta_edges[0]) / dt), 0, n_v - 1).astype(np.int64)
+
+    # 角距 α 的球冠在經度方向的半寬：asin(sin α / sin θ)，球冠含極點時為全圈
+    pole = (theta - alpha <= 0) | (theta + alpha >= np.pi) | (np.sin(alpha) >= np.sin(theta))
+    with np.errstate(invalid="ignore"):
+        beta = np.where(pole, np.pi, np.arcsin(np.clip(np.sin(alpha) / np.sin(theta), 0.0, 1.0)))
+    full_circle = phi_edges[-1] - phi_edges[0] >= 2 * np.pi - 1e-9
+    dp = phi_edges[1] - phi_edges[0]
+    if full_circle:
+        # 經度可繞一圈：起點取模，欄數最多 n_e
+        c0 = np.floor((phi - beta - phi_edges[0]) / dp).astype(np.int64)
+        c1 = np.floor((phi + beta - phi_edges[0]) / dp).astype(np.int64)
+        n_c = np.minimum(c1 - c0 + 1, n_e)
+        c0 = np.where(n_c == n_e, 0, np.mod(c0, n_e))
+    else:
+        # 範圍跨過 ±π（可能從另一側接近）→ 全部的欄；超出經度範圍的點由 clip 落在邊緣欄
+        full = (phi - beta < -np.pi) | (phi + beta > np.pi)
+        c0 = np.where(full, 0, np.clip(np.floor((phi - beta - phi_edges[0]) / dp), 0, n_e - 1)).astype(np.int64)
+        c1 = np.where(full, n_e - 1, np.clip(np.floor((phi + beta - phi_edges[0]) / dp), 0, n_e - 1)).astype(np.int64)
+        n_c = c1 - c0 + 1
+    return r0, r1 - r0 + 1, c0, n_c, n_e
+
+
+# =============================
+# 淨空分析
+# =============================
+def analyze_clearance(result, index, bottom_edge_height=0.0, clearance=DEFAULT_CLEARANCE, floor_z=DEFAULT_FLOOR_Z):
+    # 回傳：
+    #   模組（(n_v, n_e)）：淨空內最近的點距離（沒有則 NaN）、違規點數、最近點座標、違規點的外框、最近點在球內 / 外
+    #   整體：所有點到球面的最小距離與位置（不限淨空內）、違規模組數、耗時
+    # floor_z：z 低於此值的點視為地板，不列入（None = 全部列入）
+    t_start = time.perf_counter()
+    n_v, n_e = module_grid_shape(result)
+    center, R, theta_edges, phi_edges = dome_frame(result, bottom_edge_height)
+    dome = (theta_edges[0], theta_edges[-1], phi_edges[0], phi_edges[-1])
+    hd = index.half_diagonal
+
+    # 1. voxel 篩選
+    cell_d = patch_distance(index.cell_centers - center, R, *dome)
+    if floor_z is not None:
+        cell_top = index.origin[2] + (index.cells[:, 2] + 1) * index.cell
+        cell_d = np.where(cell_top < floor_z, np.inf, cell_d)
+    near_cells = np.flatnonzero(cell_d <= clearance + hd)
+
+    # 整體最小距離：上界 = 整格都在地板以上的格中最近的（中心距離 + 半對角線），只細算下界不超過上界的格
+    whole = cell_d if floor_z is None else np.where(index.origin[2] + index.cells[:, 2] * index.cell >= floor_z, cell_d, np.inf)
+    upper = whole.min() + hd if np.isfinite(whole).any() else np.inf
+    best_cells = np.flatnonzero(cell_d - hd <= upper)
+    best = {"distance_mm": float("nan"), "point": None}
+    if len(best_cells):
+        pts = index.gather(best_cells)
+        if floor_z is not None:
+            pts = pts[pts[:, 2] >= floor_z]
+        if len(pts):
+            d = patch_distance(pts - center, R, *dome)
+            i = int(np.argmin(d))
+            best = {"distance_mm": float(d[i]), "point": pts[i]}
+
+    candidates = index.gather(near_cells) if len(near_cells) else np.empty((0, 3))
+    if floor_z is not None:
+        candidates = candidates[candidates[:, 2] >= floor_z]
+
+    # 2. 點 × 鄰近模組
+    M = n_v * n_e
+    mod_min = np.full(M, np.inf)
+    mod_count = np.zeros(M, dtype=np.int64)
+    mod_lo = np.full((M, 3), np.inf)
+    mod_hi = np.full((M, 3), -np.inf)
+    mod_best = np.full((M, 3), np.nan)
+
+    if len(candidates):
+        rel = candidates - center
+        sph = spherical(rel)
+        r0, n_r, c0, n_c, _ = _module_windows(rel, R, theta_edges, phi_edges, clearance)
+        per_point = n_r * n_c
+        # 依累計配對數切塊，每塊約 PAIR_CHUNK 組（點 × 模組）
+        cum = np.cumsum(per_point)
+        bounds = np.unique(np.r_[0, np.searchsorted(cum, np.arange(PAIR_CHUNK, cum[-1], PAIR_CHUNK)), len(rel)])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            counts = per_point[start:stop]
+            pid = np.repeat(np.arange(start, stop), counts)
+            k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            row = r0[pid] + k // n_c[pid]
+            col = np.mod(c0[pid] + k % n_c[pid], n_e)
+            d = patch_distance(None, R, theta_edges[row], theta_edges[row + 1], phi_edges[col], phi_edges[col + 1],
+                               sph=tuple(v[pid] for v in sph))
+            hit = np.flatnonzero(d < clearance)
+            if not len(hit):
+                continue
+
+            # 依 (模組, 距離) 排序：每段第一個 = 該模組最近的點；外框 / 點數用 reduceat
+            mid = (col * n_v + row)[hit]                   # module_id：column-major
+            order = hit[np.lexsort((d[hit], mid))]
+            mid = (col * n_v + row)[order]
+            pts = candidates[pid[order]]
+            first = np.flatnonzero(np.r_[True, mid[1:] != mid[:-1]])
+            u = mid[first]
+            mod_count[u] += np.diff(np.r_[first, len(mid)])
+            mod_lo[u] = np.minimum(mod_lo[u], np.minimum.reduceat(pts, first))
+            mod_hi[u] = np.maximum(mod_hi[u], np.maximum.reduceat(pts, first))
+            closer = d[order[first]] < mod_min[u]
+            mod_min[u[closer]] = d[order[first]][closer]
+            mod_best[u[closer]] = pts[first][closer]
+
+    violating = mod_count > 0
+    best_rho = np.linalg.norm(mod_best - center, axis=1)
+
+    def grid(v):
+        # module_id（column-major）→ (n_v, n_e)
+        return v.reshape(n_e, n_v, *v.shape[1:]).swapaxes(0, 1)
+
+    return {
+        "n_points": index.n_points,
+        "n_cells": len(index.cells),
+        "n_cells_checked": int(len(near_cells)),
+        "n_candidates": int(len(candidates)),
+        "clearance_mm": float(clearance),
+        "floor_z_mm": None if floor_z is None else float(floor_z),
+        # 模組
+        "module_min_clearance_mm": grid(np.where(violating, mod_min, np.nan)),
+        "module_points": grid(mod_count),
+        "module_nearest_point": grid(mod_best),
+        "module_bbox_min": grid(np.where(violating[:, None], mod_lo, np.nan)),
+        "module_bbox_max": grid(np.where(violating[:, None], mod_hi, np.nan)),
+        "module_inside": grid(violating & (best_rho < R)),
+        # 摘要
+        "min_clearance_mm": best["distance_mm"],
+        "min_clearance_point": best["point"],
+        "modules_violating": int(violating.sum()),
+        "points_violating": int(mod_count.sum()),
+        "seconds": time.perf_counter() - t_start,
+    }
+
+
+def violation_table(clearance):
+    # 只列違規模組；module_id 與 mesh_export / cabling 相同
+    v = clearance["module_min_clearance_mm"]
+    rows, cols = np.nonzero(np.isfinite(v))
+    n_v = v.shape[0]
+    near = clearance["module_nearest_point"][rows, cols]
+    lo = clearance["module_bbox_min"][rows, cols]
+    hi = clearance["module_bbox_max"][rows, cols]
+    df = pd.DataFrame({
+        "Module": cols * n_v + rows,
+        "Row": rows + 1,
+        "Column": cols + 1,
+        "Min Clearance (mm)": v[rows, cols].round(0),
+        "Side": np.where(clearance["module_inside"][rows, cols], "Inside", "Outside"),
+        "Points": clearance["module_points"][rows, cols],
+        "Nearest X / Y / Z (mm)": [" / ".join(f"{c:.0f}" for c in p) for p in near],
+        "Region Min X / Y / Z (mm)": [" / ".join(f"{c:.0f}" for c in p) for p in lo],
+        "Region Max X / Y / Z (mm)": [" / ".join(f"{c:.0f}" for c in p) for p in hi],
+    })
+    return df.sort_values("Min Clearance (mm)", kind="stable").reset_index(drop=True)
@@ -0,0 +1,52 @@
+# cli.py
+# 命令列工具共用的設計參數（預設值與 app 的輸入欄位相同）
+# 也可用 --param 讀 JSON（calculate 的 param dict），命令列給的欄位覆蓋 JSON
+import json
+from calculator import calculate, ENGINEERING_DEFAULTS
+
+DESIGN_DEFAULTS = {
+    "diameter": 3000.0,
+    "fov_h": 180.0,
+    "fov_v_n": 67.5,
+    "fov_v_s": 33.75,
+    "resolution_h": 3840,
+    "luminance": 800.0,
+    "frame_rate": 60,
+    "bottom_edge_height": 500.0,
+    "led_count_mode": "average",
+}
+
+
+def add_design_arguments(parser):
+    group = parser.add_argument_group("design")
+    group.add_argument("--param", default=None, help="JSON file with the calculate() parameters")
+    group.add_argument("--diameter", type=float, help=f'mm (default {DESIGN_DEFAULTS["diameter"]:g})')
+    group.add_argument("--fov-h", type=float, help=f'deg (default {DESIGN_DEFAULTS["fov_h"]:g})')
+    group.add_argument("--fov-v-n", type=float, help=f'deg (default {DESIGN_DEFAULTS["fov_v_n"]:g})')
+    group.add_argument("--fov-v-s", type=float, help=f'deg (default {DESIGN_DEFAULTS["fov_v_s"]:g})')
+    group.add_argument("--resolution-h", type=int, help=f'px (default {DESIGN_DEFAULTS["resolution_h"]})')
+    group.add_argument("--luminance", type=float, help=f'nits (default {DESIGN_DEFAULTS["luminance"]:g})')
+    group.add_argument("--frame-rate", type=int, help=f'Hz (default {DESIGN_DEFAULTS["frame_rate"]})')
+    group.add_argument("--bottom-edge-height", type=float,
+                       help=f'mm (default {DESIGN_DEFAULTS["bottom_edge_height"]:g})')
+    group.add_argument("--led-count-mode", choices=["average", "exact"],
+                       help=f'(default {DESIGN_DEFAULTS["led_count_mode"]})')
+    return group
+
+
+def design_param(args):
+    param = dict(DESIGN_DEFAULTS, **ENGINEERING_DEFAULTS)
+    if args.param:
+        with open(args.param, encoding="utf-8") as f:
+            param.update(json.load(f))
+    for field in DESIGN_DEFAULTS:
+        value = getattr(args, field, None)
+        if value is not None:
+            param[field] = value
+    return param
+
+
+def design_from_args(args):
+    # 回傳 (param, result)
+    param = design_param(args)
+    return param, calculate(param)
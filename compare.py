@@ -0,0 +1,183 @@
+# compare.py
+# 多方案比較：K 組參數平行送進 calculate（process pool），
+# 縮圖依球面幾何去重共用（只差 frame rate / luminance 的方案共用同一張）
+import io
+import math
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from calculator import calculate, make_sphere_fig
+from metrics import cache_lookup, timed
+from psu import with_psu
+from workers import make_pool, submit, unwrap
+
+VARIANT_FIELDS = [
+    "diameter", "fov_h", "fov_v_n", "fov_v_s", "resolution_h",
+    "luminance", "frame_rate", "bottom_edge_height",
+]
+
+_POOL = None
+_THUMB_CACHE = {}
+_THUMB_CACHE_MAX = 256
+
+
+def get_pool(max_workers=None):
+    # 常駐 pool：避免每次比較都重新啟動 process（worker 啟動方式見 workers.py）
+    global _POOL
+    if _POOL is None:
+        _POOL = make_pool(max_workers)
+    return _POOL
+
+
+def shutdown_pool():
+    # 結束常駐 pool（非 Streamlit 的長時間 process 結束前呼叫，否則離開時會等 worker）
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL = None
+
+
+def submit_all(fn, items, max_workers=None):
+    # 回傳 futures（依 items 順序），呼叫端可邊收邊處理
+    pool = get_pool(max_workers)
+    return [submit(pool, fn, item) for item in items]
+
+
+def iter_results(futures):
+    # 依送出順序 yield 結果；pool 壞掉就丟掉，下次重建
+    global _POOL
+    try:
+        for f in futures:
+            yield unwrap(f)
+    except BrokenProcessPool:
+        _POOL = None
+        raise
+
+
+def parallel_map(fn, items, max_workers=None):
+    return list(iter_results(submit_all(fn, items, max_workers)))
+
+
+def _calculate_safe(param):
+    try:
+        with timed("compare_calculate"):
+            return calculate(param), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def geometry_key(param, result):
+    return (
+        float(param["diameter"]), float(param["fov_h"]),
+        float(result["fov_v_n_final"]), float(result["fov_v_s_final"]),
+        int(result["n_equator_final"]), int(result["n_vertical_final"]),
+        float(param.get("bottom_edge_height", 0.0)),
+    )
+
+
+def render_thumbnail(key, size_in=2.5, dpi=80):
+    import matplotlib.pyplot as plt
+
+    diameter, fov_h, fov_v_n_final, fov_v_s_final, n_e, n_v, bottom = key
+    with timed("compare_thumbnail"):
+        fig = make_sphere_fig(
+            diameter=diameter,
+            fov_h=fov_h,
+            fov_v_n_final=fov_v_n_final,
+            fov_v_s_final=fov_v_s_final,
+            n_equator_final=n_e,
+            n_vertical_final=n_v,
+            bottom_edge_height=bottom,
+            elev=25,
+            azim=-145,
+            title="",
+        )
+        fig.set_size_inches(size_in, size_in)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi)
+        plt.close(fig)
+    return buf.getvalue()
+
+
+def evaluate_variants(base_param, variants, thumbnails=True, max_workers=None):
+    # variants：list of dict（只需 VARIANT_FIELDS 中要改的欄位）
+    params = [dict(base_param, **v) for v in variants]
+
+    outcomes = parallel_map(_calculate_safe, params, max_workers)
+    results = [r for r, _ in outcomes]
+    errors = [e for _, e in outcomes]
+
+    thumbs = [None] * len(params)
+    if thumbnails:
+        keys = [geometry_key(p, r) if r is not None else None for p, r in zip(params, results)]
+        missing = list({k for k in keys if k is not None and k not in _THUMB_CACHE})
+        cache_lookup("compare_thumbnails", hits=sum(k is not None for k in keys) - len(missing), misses=len(missing))
+        if len(_THUMB_CACHE) + len(missing) > _THUMB_CACHE_MAX:
+            _THUMB_CACHE.clear()
+        for k, png in zip(missing, parallel_map(render_thumbnail, missing, max_workers)):
+            _THUMB_CACHE[k] = png
+        thumbs = [_THUMB_CACHE.get(k) if k is not None else None for k in keys]
+
+    return {
+        "params": params,
+        "results": results,
+        "errors": errors,
+        "thumbnails": thumbs,
+    }
+
+
+def comparison_table(comparison):
+    # 列 = 規格項目，欄 = 方案；Arrow-backed（pyarrow dtype）
+    deg = "°"
+    columns = {}
+    for i, (p, r, err) in enumerate(zip(comparison["params"], comparison["results"], comparison["errors"])):
+        name = f"Design {i + 1}"
+        if r is None:
+            columns[name] = [err] + [""] * 13
+            continue
+        columns[name] = [
+            "",
+            f'{round(p["diameter"] / 1000, 2)}',
+            f'{r["pitch_mm"]:.3f}',
+            f'{int(p["resolution_h"])} × {int(r["resolution_v_final"])}',
+            f'{round(p["fov_h"], 2)}{deg} × {round(r["fov_v_n_final"] + r["fov_v_s_final"], 2)}{deg}',
+            f'{int(p["frame_rate"])}',
+            f'{int(r["n_vertical_final"])}',
+            f'{int(r["total_n_module"])}',
+            f'{int(r["total_n_hub"])}',
+            f'{int(with_psu(r)["total_n_psu"])}',
+            f'{int(r["total_n_controller"])}',
+            f'{round(p["luminance"], 1)}',
+            f'{r["total_power_W"]:.2f}',
+            f'{math.ceil(r["room_size_w"])} × {math.ceil(r["room_size_l"])} × {math.ceil(r["room_size_h"])}',
+        ]
+
+    index = [
+        "Error",
+        "Sphere Diameter (m)",
+        "Pixel Pitch (mm)",
+        "Resolution (H*V)",
+        "Sphere FOV (H*V)",
+        "Frame Rate (Hz)",
+        "Module Types",
+        "Module Qty",
+        "Hub Qty (with RX)",
+        "PSU Qty",
+        "4K controller Qty",
+        "Brightness (nits)",
+        "Total Power (kW)",
+        "Room size_W * L * H (mm)",
+    ]
+    df = pd.DataFrame(columns, index=index).astype("string[pyarrow]")
+    if not any(comparison["errors"]):
+        df = df.drop(index="Error")
+    return df
+
+
+def highlight_changes(df):
+    # 與 Design 1 不同的格子上色
+    base = df.iloc[:, 0]
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    for col in df.columns[1:]:
+        changed = (df[col] != base).fillna(False).astype(bool)
+        styles.loc[changed, col] = "background-color: rgba(255, 196, 0, 0.35)"
+    return df.style.apply(lambda _: styles, axis=None)
@@ -0,0 +1,231 @@
+# content_power.py
+# 依實際播放內容估算功耗：逐格讀取 equirectangular 影片 / 圖片序列，對應到模組網格
+# 一次只保留一格畫面與幾個 (n_v, n_e) 累計陣列 → 長片記憶體固定
+# 命令列：python content_power.py SOURCE [--diameter ... 其餘設計參數見 cli.py]
+import argparse
+import glob
+import math
+import os
+import sys
+import numpy as np
+from cli import add_design_arguments, design_from_args
+from module_power import (
+    POWER_MARGIN, module_grid_shape, hub_index, hub_sum,
+    module_channel_power, module_system_power, hub_power_w,
+)
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+# =============================
+# Frame sources
+# =============================
+def _iter_image_files(files, step):
+    from PIL import Image
+
+    for f in files[::step]:
+        with Image.open(f) as im:
+            yield np.asarray(im.convert("RGB"))
+
+
+def _iter_video(path, step):
+    try:
+        import imageio.v3 as iio
+    except ImportError as e:
+        raise ImportError("Reading video files needs imageio: pip install imageio[ffmpeg]") from e
+
+    for i, frame in enumerate(iio.imiter(path)):
+        if i % step == 0:
+            yield frame
+
+
+def iter_frames(source, step=1):
+    # source: 資料夾 / glob / 單張圖 / 影片檔 / 任意可迭代的 ndarray (H, W[, 3])
+    step = max(1, int(step))
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, f) for f in os.listdir(path)
+                if f.lower().endswith(IMAGE_EXTS)
+            )
+            return _iter_image_files(files, step)
+        if any(ch in path for ch in "*?["):
+            return _iter_image_files(sorted(glob.glob(path)), step)
+        if path.lower().endswith(IMAGE_EXTS):
+            return _iter_image_files([path], step)
+        return _iter_video(path, step)
+
+    return (np.asarray(frame) for i, frame in enumerate(source) if i % step == 0)
+
+
+# =============================
+# Frame → module grid
+# =============================
+def module_edges(result, frame_w, frame_h, full_sphere=True):
+    # 每片模組在來源畫面中的像素範圍（左閉右開），至少 1 px
+    n_v, n_e = module_grid_shape(result)
+
+    if full_sphere:
+        # 360° × 180° equirectangular，經度 0 在畫面中央，北極在上
+        fov_h = float(result["angle_per_module_h_deg"]) * n_e
+        lon = -fov_h / 2 + np.arange(n_e + 1) * float(result["angle_per_module_h_deg"])
+        lat = float(result["fov_v_n_final"]) - np.arange(n_v + 1) * float(result["angle_per_module_v_deg"])
+        x = (lon + 180) / 360 * frame_w
+        y = (90 - lat) / 180 * frame_h
+    else:
+        # 畫面剛好涵蓋球幕 FOV
+        x = np.arange(n_e + 1) / n_e * frame_w
+        y = np.arange(n_v + 1) / n_v * frame_h
+
+    x = np.clip(np.rint(x).astype(np.int64), 0, frame_w)
+    y = np.clip(np.rint(y).astype(np.int64), 0, frame_h)
+    x0 = np.minimum(x[:-1], frame_w - 1)
+    y0 = np.minimum(y[:-1], frame_h - 1)
+    x1 = np.maximum(x[1:], x0 + 1)
+    y1 = np.maximum(y[1:], y0 + 1)
+    return x0, x1, y0, y1
+
+
+def _linear_lut(dtype, gamma):
+    levels = np.iinfo(dtype).max
+    return ((np.arange(levels + 1, dtype=np.float64) / levels) ** gamma).astype(np.float32)
+
+
+def module_levels(frame, edges, gamma=2.2, lut=None):
+    # 每片模組 R/G/B 的平均線性亮度 (0–1)，shape (n_v, n_e, 3)
+    frame = np.asarray(frame)
+    if frame.ndim == 2:
+        frame = frame[:, :, None]
+    frame = frame[:, :, :3]
+
+    x0, x1, y0, y1 = edges
+    n_v, n_e = len(y0), len(x0)
+    levels = np.empty((n_v, n_e, 3))
+    width = (x1 - x0)[:, None]
+
+    for r in range(n_v):
+        strip = frame[y0[r]:y1[r]]
+        if lut is not None:
+            strip = lut[strip]
+        elif np.issubdtype(strip.dtype, np.integer):
+            strip = _linear_lut(strip.dtype, gamma)[strip]
+        else:
+            strip = np.clip(strip, 0.0, 1.0) ** gamma
+
+        col = np.zeros((strip.shape[1] + 1, strip.shape[2]))
+        np.cumsum(strip.sum(axis=0, dtype=np.float64), axis=0, out=col[1:])
+        levels[r] = (col[x1] - col[x0]) / width / (y1[r] - y0[r])
+
+    return levels
+
+
+# =============================
+# Streaming simulation
+# =============================
+def iter_frame_power(result, frames, gamma=2.2, full_sphere=True):
+    # 逐格回傳 (module_power_W, hub_power_W, total_power_W)
+    channel = module_channel_power(result)[:, None, :]
+    system = module_system_power(result)[:, None]
+    hub = hub_index(result)
+    hub_w = hub_power_w(result)
+
+    edges = None
+    shape = None
+    luts = {}
+    for frame in frames:
+        frame = np.asarray(frame)
+        if frame.shape[:2] != shape:
+            shape = frame.shape[:2]
+            edges = module_edges(result, shape[1], shape[0], full_sphere=full_sphere)
+        lut = None
+        if np.issubdtype(frame.dtype, np.integer):
+            if frame.dtype not in luts:
+                luts[frame.dtype] = _linear_lut(frame.dtype, gamma)
+            lut = luts[frame.dtype]
+
+        levels = module_levels(frame, edges, gamma=gamma, lut=lut)
+        module_w = np.einsum("vec,vec->ve", levels, np.broadcast_to(channel, levels.shape)) + system
+        hub_w_frame = hub_sum(module_w, hub) + hub_w
+        total_w = float(hub_w_frame.sum()) * POWER_MARGIN
+        yield module_w, hub_w_frame, total_w
+
+
+def simulate_content_power(result, source, gamma=2.2, full_sphere=True, step=1, keep_series=False):
+    n_v, n_e = module_grid_shape(result)
+    n_hub = int(hub_index(result).max()) + 1
+
+    n_frames = 0
+    total_sum = 0.0
+    peak_total = -math.inf
+    peak_frame = -1
+    module_peak = np.zeros((n_v, n_e))
+    module_sum = np.zeros((n_v, n_e))
+    hub_peak = np.zeros(n_hub)
+    hub_total = np.zeros(n_hub)
+    series = [] if keep_series else None
+
+    frames = iter_frames(source, step=step)
+    for module_w, hub_w, total_w in iter_frame_power(result, frames, gamma=gamma, full_sphere=full_sphere):
+        np.maximum(module_peak, module_w, out=module_peak)
+        module_sum += module_w
+        np.maximum(hub_peak, hub_w, out=hub_peak)
+        hub_total += hub_w
+        total_sum += total_w
+        if total_w > peak_total:
+            peak_total = total_w
+            peak_frame = n_frames * max(1, int(step))
+        if keep_series:
+            series.append(total_w)
+        n_frames += 1
+
+    if n_frames == 0:
+        raise ValueError("No frames read from source")
+
+    full_white_W = result["total_power_W"] * 1000
+    return {
+        "n_frames": n_frames,
+        "peak_total_W": peak_total,
+        "peak_frame": peak_frame,
+        "average_total_W": total_sum / n_frames,
+        "full_white_total_W": full_white_W,
+        "peak_to_full_white": peak_total / full_white_W if full_white_W else float("nan"),
+        "module_peak_W": module_peak,
+        "module_average_W": module_sum / n_frames,
+        "hub_peak_W": hub_peak,
+        "hub_average_W": hub_total / n_frames,
+        "total_series_W": np.asarray(series) if keep_series else None,
+    }
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estimate LED sphere power for real content (equirectangular video or image sequence)."
+    )
+    parser.add_argument("source", help="video file, image, folder of images or glob pattern")
+    parser.add_argument("--step", type=int, default=1, help="read every N-th frame")
+    parser.add_argument("--gamma", type=float, default=2.2)
+    parser.add_argument("--fov-only", action="store_true",
+                        help="frames cover only the sphere's FOV instead of the full 360° × 180°")
+    parser.add_argument("--csv", default=None, help="write per-frame total power (W) to this file")
+    add_design_arguments(parser)
+    args = parser.parse_args(argv)
+
+    _, result = design_from_args(args)
+    out = simulate_content_power(result, args.source, gamma=args.gamma, full_sphere=not args.fov_only,
+                                 step=args.step, keep_series=args.csv is not None)
+    print(f'frames: {out["n_frames"]:,} (every {max(1, args.step)})')
+    print(f'peak: {out["peak_total_W"] / 1000:.2f} kW at frame {out["peak_frame"]}')
+    print(f'average: {out["average_total_W"] / 1000:.2f} kW')
+    print(f'full white: {out["full_white_total_W"] / 1000:.2f} kW '
+          f'(peak is {out["peak_to_full_white"] * 100:.1f}%)')
+    print(f'busiest hub: peak {out["hub_peak_W"].max():.1f} W, average {out["hub_average_W"].max():.1f} W')
+    if args.csv:
+        np.savetxt(args.csv, out["total_series_W"], fmt="%.3f", header="total_W", comments="")
+        print(f"Per-frame power written to {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
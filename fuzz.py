@@ -0,0 +1,371 @@
+# fuzz.py
+# calculate 的 fuzzing / 延遲預算測試
+# 大量隨機 + 邊界值參數丟進 process pool，每次呼叫都有時間預算（SIGALRM 中斷卡住的迴圈）；
+# 逾時、丟例外、結果含 NaN / inf 的都記下來，依失敗特徵（signature）去重後做最小化，
+# 存成 corpus（JSON），之後可反覆 replay 確認是否已修好
+#
+# 執行：python fuzz.py run [-n 1000000] [--budget 0.05] [--workers N] [--corpus fuzz_corpus.json]
+#       python fuzz.py replay [--corpus fuzz_corpus.json]
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from calculator import calculate, ENGINEERING_DEFAULTS
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(REPO_DIR, "fuzz_corpus.json")
+
+# app 的預設輸入：最小化時各欄位優先退回這組值
+BASE_PARAM = {
+    "diameter": 3000.0,
+    "fov_h": 180.0,
+    "fov_v_n": 67.5,
+    "fov_v_s": 33.75,
+    "resolution_h": 3840,
+    "luminance": 800.0,
+    "frame_rate": 60,
+    "bottom_edge_height": 500.0,
+    **ENGINEERING_DEFAULTS,
+}
+
+# 每個欄位的邊界值（以 p_edge 機率取代隨機值）
+EDGE_VALUES = {
+    "diameter": [0.0, -1.0, 1e-3, 1.0, 1e7],
+    "fov_h": [0.0, -10.0, 1e-3, 360.0, 720.0],
+    "fov_v_n": [0.0, -5.0, 90.0, 180.0],
+    "fov_v_s": [0.0, -5.0, 90.0, 180.0],
+    "resolution_h": [0, 1, 3, 4, 6, 65536],
+    "luminance": [0.0, -1.0, 1e9],
+    "frame_rate": [0, 1, 30, 240, 1000],
+    "bottom_edge_height": [-1.0, 0.0, 1e6],
+    "module_angle_limit": [0, 1, 360],
+    "module_size_limit": [0, 1, 1e6],
+    "dclk_limit": [0, 1e-3, 1e3],
+    "waveform_duty": [0.0, 1.0],
+    "scan_ratio_limit": [0, 1, 8, 1000],
+    "channel_threshold_for_double_scan": [0, 1e6],
+    "calibration_ratio": [0.0, 1.0, -1.0],
+    "gray_bits": [0, 1, 24],
+    "psu_derating": [0.0, 1.0, -0.5],
+}
+
+INT_FIELDS = ("resolution_h", "frame_rate", "scan_ratio_limit")
+
+LATENCY_BINS = np.geomspace(1e-5, 10.0, 61)  # 10 µs – 10 s
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise BudgetExceeded()
+
+
+_HAS_ALARM = hasattr(signal, "setitimer")
+
+
+def _init_worker():
+    # 沒有 SIGALRM 的平台（Windows）只量時間，無法中斷卡住的呼叫
+    if _HAS_ALARM:
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def random_params(rng, n, p_edge=0.05, p_engineering=0.1):
+    # 一次產生 n 組參數（每欄整批向量化抽樣），回傳 list of dict
+    cols = {
+        "diameter": np.exp(rng.uniform(np.log(100), np.log(50000), n)),
+        "fov_h": rng.uniform(1, 360, n),
+        "fov_v_n": rng.uniform(0, 90, n),
+        "fov_v_s": rng.uniform(0, 90, n),
+        # 大多數是 4 的倍數（實際會用的解析度），其餘任意整數
+        "resolution_h": np.where(rng.random(n) < 0.8, 4 * rng.integers(1, 4097, n), rng.integers(1, 16385, n)),
+        "luminance": np.exp(rng.uniform(np.log(1), np.log(5000), n)),
+        "frame_rate": rng.choice([60, 60, 120, 120, 30, 240], n),
+        "bottom_edge_height": rng.uniform(0, 5000, n),
+    }
+    for field, default in ENGINEERING_DEFAULTS.items():
+        scale = np.exp(rng.uniform(np.log(0.25), np.log(4), n))
+        cols[field] = np.where(rng.random(n) < p_engineering, default * scale, default)
+
+    for field, edges in EDGE_VALUES.items():
+        hit = rng.random(n) < p_edge
+        if hit.any():
+            cols[field] = np.where(hit, rng.choice(np.asarray(edges, dtype=float), n), cols[field])
+
+    fields = list(cols.keys())
+    columns = [
+        cols[f].astype(np.int64).tolist() if f in INT_FIELDS else cols[f].astype(float).tolist()
+        for f in fields
+    ]
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+def _nonfinite_keys(result):
+    bad = []
+    for key, value in result.items():
+        if isinstance(value, str):
+            continue
+        arr = np.asarray(value, dtype=float)
+        if arr.size and not np.all(np.isfinite(arr)):
+            bad.append(key)
+    return bad
+
+
+def _origin(tb):
+    # 例外發生處：repo 內最深的一層 frame（file:function）
+    # 不含行號：calculator 改了無關的程式碼，同一個失敗的 signature 仍不變，corpus 可以繼續比對
+    where = "?"
+    for frame in traceback.extract_tb(tb):
+        if frame.filename.startswith(REPO_DIR) and os.path.basename(frame.filename) != "fuzz.py":
+            where = f"{os.path.basename(frame.filename)}:{frame.name}"
+    return where
+
+
+def _is_rejection(e):
+    # calculator 主動 raise 的 ValueError = 輸入檢查（預期行為），不算失敗；
+    # math.ceil(nan) 之類間接丟出的 ValueError 仍算失敗
+    frames = traceback.extract_tb(e.__traceback__)
+    return isinstance(e, ValueError) and bool(frames) and (frames[-1].line or "").startswith("raise ")
+
+
+def check(param, budget_s):
+    # 回傳 (signature, detail, elapsed_s)；signature：None = 通過，"rejected" = 輸入被拒
+    t0 = time.perf_counter()
+    try:
+        try:
+            if _HAS_ALARM:
+                signal.setitimer(signal.ITIMER_REAL, budget_s)
+            result = calculate(param)
+        finally:
+            if _HAS_ALARM:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except BudgetExceeded as e:
+        # 中斷點落在哪裡不固定 → 所有逾時同一類，中斷位置只記在 detail
+        detail = f"exceeded {budget_s:g} s budget (interrupted at {_origin(e.__traceback__)})"
+        return "timeout", detail, time.perf_counter() - t0
+    except Exception as e:
+        elapsed = time.perf_counter() - t0
+        if _is_rejection(e):
+            return "rejected", f"{type(e).__name__}: {e}", elapsed
+        return f"{type(e).__name__}@{_origin(e.__traceback__)}: {e}", f"{type(e).__name__}: {e}", elapsed
+    elapsed = time.perf_counter() - t0
+
+    if elapsed > budget_s:
+        return "slow", f"took {elapsed:.3f} s (budget {budget_s:g} s)", elapsed
+    bad = _nonfinite_keys(result)
+    if bad:
+        return "nonfinite:" + ",".join(sorted(bad)), f"non-finite: {', '.join(sorted(bad))}", elapsed
+    return None, "", elapsed
+
+
+def _fuzz_chunk(seed, n, budget_s, p_edge):
+    rng = np.random.default_rng(seed)
+    counts = {}
+    first = {}
+    rejected = 0
+    latencies = np.empty(n)
+    for i, param in enumerate(random_params(rng, n, p_edge=p_edge)):
+        sig, detail, latencies[i] = check(param, budget_s)
+        if sig is None:
+            continue
+        if sig == "rejected":
+            rejected += 1
+            continue
+        counts[sig] = counts.get(sig, 0) + 1
+        if sig not in first:
+            first[sig] = {"param": param, "detail": detail}
+    hist, _ = np.histogram(latencies, bins=LATENCY_BINS)
+    return {"n": n, "rejected": rejected, "hist": hist, "max": float(latencies.max()), "counts": counts, "first": first}
+
+
+def _complexity(field, value):
+    # 0 = 與 BASE_PARAM 相同；否則 1 + 有效位數
+    if value == BASE_PARAM[field]:
+        return 0
+    if isinstance(value, float) and not math.isfinite(value):
+        return 1
+    return 1 + len(f"{abs(value):.15g}".replace(".", "").strip("0"))
+
+
+def _simpler_values(field, value):
+    # 由「最像正常輸入」到「只是位數變少」的候選值；只收嚴格更簡單的，最小化一定會結束
+    cands = [BASE_PARAM[field]]
+    if isinstance(value, float) and math.isfinite(value):
+        cands.append(float(round(value)))
+        if value != 0:
+            digits = 1 - int(math.floor(math.log10(abs(value))))
+            cands.append(float(round(value, digits)))
+    out = []
+    for c in cands:
+        if field in INT_FIELDS:
+            c = int(c)
+        if _complexity(field, c) < _complexity(field, value) and c not in out:
+            out.append(c)
+    return out
+
+
+def minimize(param, signature, budget_s, detail=""):
+    # 貪婪逐欄簡化：改了之後失敗特徵不變就保留，直到沒有欄位可再簡化
+    best = dict(param)
+    changed = True
+    while changed:
+        changed = False
+        for field in BASE_PARAM:
+            for cand in _simpler_values(field, best[field]):
+                trial = dict(best, **{field: cand})
+                sig, trial_detail, _ = check(trial, budget_s)
+                if sig == signature:
+                    best, detail = trial, trial_detail
+                    changed = True
+                    break
+    return best, detail
+
+
+def _minimize_entry(signature, param, budget_s, detail):
+    reduced, detail = minimize(param, signature, budget_s, detail)
+    return {
+        "signature": signature,
+        "detail": detail,
+        "changed": sorted(k for k in BASE_PARAM if reduced[k] != BASE_PARAM[k]),
+        "param": reduced,
+    }
+
+
+def _pool(max_workers):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def fuzz(n=1_000_000, budget_s=0.05, seed=0, chunk=5000, p_edge=0.05, max_workers=None, progress=None):
+    # 回傳 {"n", "rejected", "counts", "corpus", "latency": {...}, "elapsed_s"}
+    t0 = time.perf_counter()
+    sizes = [min(chunk, n - start) for start in range(0, n, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    counts = {}
+    first = {}
+    hist = np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64)
+    max_latency = 0.0
+    rejected = 0
+    done = 0
+
+    with _pool(max_workers) as pool:
+        futures = [pool.submit(_fuzz_chunk, s, size, budget_s, p_edge) for s, size in zip(seeds, sizes)]
+        for fut in as_completed(futures):
+            out = fut.result()
+            done += out["n"]
+            rejected += out["rejected"]
+            hist += out["hist"]
+            max_latency = max(max_latency, out["max"])
+            for sig, c in out["counts"].items():
+                counts[sig] = counts.get(sig, 0) + c
+                first.setdefault(sig, out["first"][sig])
+            if progress is not None:
+                progress(done, n, counts)
+
+        futures = [pool.submit(_minimize_entry, sig, f["param"], budget_s, f["detail"]) for sig, f in first.items()]
+        corpus = [fut.result() for fut in futures]
+
+    for entry in corpus:
+        entry["count"] = counts[entry["signature"]]
+    corpus.sort(key=lambda e: -e["count"])
+
+    # 直方圖取 bin 上緣當百分位數（保守估計）
+    cum = np.cumsum(hist) / max(int(hist.sum()), 1)
+    latency = {f"p{q}": float(LATENCY_BINS[1:][np.searchsorted(cum, q / 100)]) for q in (50, 90, 99)}
+    latency["p99.9"] = float(LATENCY_BINS[1:][np.searchsorted(cum, 0.999)])
+    latency["max"] = max_latency
+
+    return {
+        "n": n,
+        "rejected": rejected,
+        "counts": counts,
+        "corpus": corpus,
+        "latency": latency,
+        "elapsed_s": time.perf_counter() - t0,
+    }
+
+
+def save_corpus(corpus, path=CORPUS_PATH, budget_s=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"budget_s": budget_s, "entries": corpus}, f, indent=1)
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def replay(path=CORPUS_PATH, budget_s=None):
+    # 每筆重跑一次，回傳仍失敗的（signature 可能改變，例如修了一半；改成主動拒絕輸入也算修好）
+    corpus = load_corpus(path)
+    # 舊 corpus 少了後來新增的欄位時，calculate 會默默套預設值，重跑的已經不是當初的輸入 → 直接報錯
+    for entry in corpus["entries"]:
+        missing = sorted(set(BASE_PARAM) - set(entry["param"]))
+        if missing:
+            raise ValueError(
+                f'Corpus entry {entry["signature"]!r} has no {", ".join(missing)}; '
+                f"regenerate it with: python fuzz.py run --corpus {path}"
+            )
+    budget_s = budget_s or corpus.get("budget_s") or 0.05
+    _init_worker()
+    still = []
+    for entry in corpus["entries"]:
+        sig, detail, _ = check(entry["param"], budget_s)
+        if sig not in (None, "rejected"):
+            still.append(dict(entry, now=sig, now_detail=detail))
+    return still
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz calculate() and keep a minimized reproducer corpus.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("-n", type=int, default=1_000_000)
+    run.add_argument("--budget", type=float, default=0.05, help="per-call time budget (s)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--chunk", type=int, default=5000)
+    run.add_argument("--p-edge", type=float, default=0.05)
+    run.add_argument("--workers", type=int, default=None)
+    run.add_argument("--corpus", default=CORPUS_PATH)
+    rep = sub.add_parser("replay")
+    rep.add_argument("--budget", type=float, default=None)
+    rep.add_argument("--corpus", default=CORPUS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "run":
+        def progress(done, total, counts):
+            print(f"\r{done:,}/{total:,}  failures: {sum(counts.values()):,} ({len(counts)} kinds)",
+                  end="", file=sys.stderr, flush=True)
+
+        out = fuzz(args.n, args.budget, args.seed, args.chunk, args.p_edge, args.workers, progress)
+        print(file=sys.stderr)
+        save_corpus(out["corpus"], args.corpus, args.budget)
+        print(f'{out["n"]:,} calls in {out["elapsed_s"]:.1f} s ({out["n"] / out["elapsed_s"]:,.0f}/s)')
+        print(f'rejected by input checks: {out["rejected"]:,}')
+        print("latency: " + "  ".join(f"{k} {v * 1000:.3f} ms" for k, v in out["latency"].items()))
+        for entry in out["corpus"]:
+            print(f'{entry["count"]:>9,}  {entry["signature"]}  [{", ".join(entry["changed"])}]  {entry["detail"]}')
+        print(f'Corpus ({len(out["corpus"])} entries) written to {args.corpus}')
+        return 0
+
+    still = replay(args.corpus, args.budget)
+    for entry in still:
+        print(f'{entry["now"]}  [{", ".join(entry["changed"])}]  {entry["now_detail"]}')
+    print(f"{len(still)} of {len(load_corpus(args.corpus)['entries'])} corpus entries still fail")
+    return 1 if still else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
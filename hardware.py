@@ -0,0 +1,104 @@
+# hardware.py
+# 硬體時序：receiver 帶載量依 refresh rate 換算，scan / DCLK 可行性
+# receiver 的 pixel_rate = 帶載像素 × 更新率（catalog.json），帶載量 = pixel_rate / frame_rate
+# 可行性檢查全部以陣列 broadcast 計算：receiver × refresh rate × 灰階位元 × scan 一次算完
+import numpy as np
+import pandas as pd
+from catalog import parts_for_pitch, default_part
+
+MODULES_PER_RECEIVER_OPTIONS = (8, 4, 2, 1)
+
+
+def receiver_capacity_at(pixel_rate, frame_rate):
+    return np.floor_divide(np.asarray(pixel_rate, dtype=np.int64), np.asarray(frame_rate, dtype=np.int64))
+
+
+def modules_per_receiver(module_px, capacity):
+    # 每張 receiver 帶幾片模組：8 / 4 / 2 / 1 中最大可行者（一片都帶不動時仍回傳 1，由呼叫端判斷）
+    capacity = np.asarray(capacity)
+    conds = [module_px * n <= capacity for n in MODULES_PER_RECEIVER_OPTIONS[:-1]]
+    return np.select(conds, MODULES_PER_RECEIVER_OPTIONS[:-1], default=1)
+
+
+def scan_feasibility(px_per_module_h, px_per_module_v, n_module_per_receiver, frame_rate, gray_bits,
+                     dclk_limit, scan_ratio_limit):
+    # 回傳 (scans, ok)：scans = 8..scan_ratio_limit；ok 的形狀 = 輸入 broadcast 後 + (len(scans),)
+    # 條件：scan ≥ 資料組數下限、整除模組垂直像素、DCLK ≤ dclk_limit
+    scans = np.arange(8, int(scan_ratio_limit) + 1)
+    n_module_per_receiver = np.asarray(n_module_per_receiver)
+    max_data_groups = (32 / n_module_per_receiver).astype(np.int64)
+    scan_min = np.maximum(8, px_per_module_v // max_data_groups)[..., None]
+    dclk = scans * px_per_module_h * np.asarray(frame_rate)[..., None] * np.asarray(gray_bits)[..., None] / 1_000_000
+    ok = (scans >= scan_min) & (px_per_module_v % scans == 0) & (dclk <= dclk_limit)
+    return scans, ok
+
+
+def refresh_profiles(pitch_mm):
+    # catalog 的 refresh_profile 展開成 (frame_rate, gray_bits) 陣列
+    pairs = [
+        (int(it["frame_rate"]), int(bits))
+        for it in parts_for_pitch("refresh_profile", pitch_mm)
+        for bits in it["gray_bits"]
+    ]
+    frame_rate, gray_bits = (np.array(v, dtype=np.int64) for v in zip(*pairs))
+    return frame_rate, gray_bits
+
+
+def timing_support(result, param, receivers=None):
+    # 一次評估所有 receiver × refresh profile；回傳各欄為陣列的 dict（長度 = receiver 數 × profile 數）
+    pitch = float(result["pitch_mm"])
+    pxh = int(result["px_per_module_h"])
+    pxv = int(result["px_per_module_v"])
+    module_px = pxh * pxv
+
+    if receivers is None:
+        receivers = parts_for_pitch("receiver", pitch)
+    controller = default_part("controller", pitch)
+
+    fr, bits = refresh_profiles(pitch)
+    rate = np.array([float(rx["pixel_rate"]) for rx in receivers])
+
+    # (R, P)
+    fr2, bits2 = np.broadcast_arrays(fr[None, :], bits[None, :])
+    fr2 = np.broadcast_to(fr2, (len(receivers), len(fr)))
+    bits2 = np.broadcast_to(bits2, fr2.shape)
+    capacity = receiver_capacity_at(rate[:, None], fr2)
+    n_per_rx = modules_per_receiver(module_px, capacity)
+
+    scans, ok = scan_feasibility(pxh, pxv, n_per_rx, fr2, bits2, float(param["dclk_limit"]), int(param["scan_ratio_limit"]))
+    any_scan = ok.any(axis=-1)
+    max_scan = np.where(any_scan, scans[::-1][np.argmax(ok[..., ::-1], axis=-1)], 0)
+    dclk = max_scan * pxh * fr2 * bits2 / 1_000_000
+
+    receiver_ok = module_px <= capacity
+    controller_ok = fr2 <= float(controller.get("max_frame_rate") or np.inf)
+
+    return {
+        "receiver": np.repeat([rx["part_no"] for rx in receivers], len(fr)),
+        "frame_rate": fr2.ravel(),
+        "gray_bits": bits2.ravel(),
+        "receiver_capacity": capacity.ravel(),
+        "n_module_per_receiver": n_per_rx.ravel(),
+        "max_scan": max_scan.ravel(),
+        "dclk_mhz": dclk.ravel(),
+        "receiver_ok": receiver_ok.ravel(),
+        "controller_ok": controller_ok.ravel(),
+        "supported": (any_scan & receiver_ok & controller_ok).ravel(),
+    }
+
+
+def support_matrix(support, receiver=None):
+    # refresh rate（列）× 灰階位元（欄）；可行的格子顯示 scan 與 DCLK
+    df = pd.DataFrame(support)
+    if receiver is not None:
+        df = df[df["receiver"] == receiver]
+    cell = np.where(
+        df["supported"],
+        "✓ 1/" + df["max_scan"].astype(str) + " scan, " + df["dclk_mhz"].round(1).astype(str) + " MHz",
+        "✗",
+    )
+    df = df.assign(cell=cell)
+    out = df.pivot(index="frame_rate", columns="gray_bits", values="cell")
+    out.index = [f"{v} Hz" for v in out.index]
+    out.columns = [f"{v}-bit" for v in out.columns]
+    return out
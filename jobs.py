@@ -0,0 +1,470 @@
+# jobs.py
+# 背景工作佇列：參數掃描（sweep）/ 批次報價單（reports）
+# 工作與每一項的結果存在 SQLite（預設 jobs.sqlite3，LED_SPHERE_JOBS_DB 可改）：
+#   Streamlit 重啟後仍可回來看結果；重啟前還沒跑完的工作自動續跑（已完成的項目不重算）
+# 每個 process 一個 dispatcher thread（JobRunner）：依序取出 queued 的工作，把各項目送進獨立的 spawn process pool，
+# 完成一項寫一項（部分結果即時可見）；取消 = 標記 cancel_requested，dispatcher 取消還沒開始的項目
+# Streamlit 的 script thread 只讀寫 SQLite，不等工作完成，互動不受影響
+# 每個工作屬於一個專案（project）；app 只列出目前專案的工作
+import io
+import itertools
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+import pandas as pd
+from compare import VARIANT_FIELDS
+from metrics import timed
+from psu import with_psu
+from workers import make_pool, submit, unwrap
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DB = os.environ.get("LED_SPHERE_JOBS_DB", os.path.join(REPO_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("LED_SPHERE_JOB_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+MAX_ITEMS = 500
+POLL_S = 0.5
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    project TEXT,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    n_items INTEGER NOT NULL,
+    n_done INTEGER NOT NULL DEFAULT 0,
+    n_failed INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    param TEXT NOT NULL,
+    status TEXT NOT NULL,
+    summary TEXT,
+    error TEXT,
+    seconds REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS files (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, name)
+);
+"""
+
+
+def _connect(path=JOBS_DB):
+    # 每個 thread 各自連線；WAL：dispatcher 寫入時 UI 仍可讀
+    con = sqlite3.connect(path, timeout=30)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA foreign_keys=ON")
+    return con
+
+
+def init_db(path=JOBS_DB):
+    with closing(_connect(path)) as con, con:
+        con.executescript(SCHEMA)
+        # 舊的 DB 沒有 project 欄位：補上，舊工作的標題就是專案名稱
+        if "project" not in {r["name"] for r in con.execute("PRAGMA table_info(jobs)")}:
+            con.execute("ALTER TABLE jobs ADD COLUMN project TEXT")
+            con.execute("UPDATE jobs SET project = title")
+
+
+# =============================
+# 工作內容（在 worker process 執行，必須是 module 層級函式）
+# =============================
+def _summary(r):
+    r = with_psu(r)
+    return {
+        "pitch_mm": float(r["pitch_mm"]),
+        "resolution_v": int(r["resolution_v_final"]),
+        "module_types": int(r["n_vertical_final"]),
+        "modules": int(r["total_n_module"]),
+        "hubs": int(r["total_n_hub"]),
+        "controllers": int(r["total_n_controller"]),
+        "psus": int(r["total_n_psu"]),
+        "power_kW": float(r["total_power_W"]),
+        "psu_max_utilization": float(r["psu_max_utilization"]),
+        "room_mm": [math.ceil(r["room_size_w"]), math.ceil(r["room_size_l"]), math.ceil(r["room_size_h"])],
+    }
+
+
+def _sweep_item(param, options):
+    from calculator import calculate
+
+    return _summary(calculate(param)), []
+
+
+def _report_item(param, options):
+    # 與 app 的報價單相同：正視 / 等角 / 房間（< 10 m）/ 功耗圖；quote_parts 為 None → 不含 BOM
+    from calculator import calculate, make_sphere_fig, figure_png
+    from module_power import module_power_map
+    from quote import build_quote, write_quote_pdf, write_quote_xlsx
+
+    r = with_psu(calculate(param))
+    geometry = dict(
+        diameter=param["diameter"],
+        fov_h=param["fov_h"],
+        fov_v_n_final=r["fov_v_n_final"],
+        fov_v_s_final=r["fov_v_s_final"],
+        n_equator_final=r["n_equator_final"],
+        n_vertical_final=r["n_vertical_final"],
+        bottom_edge_height=param.get("bottom_edge_height", 0.0),
+    )
+    figures = [
+        make_sphere_fig(**geometry, elev=0, azim=180, title="View 1 (Front)"),
+        make_sphere_fig(**geometry, elev=25, azim=-145, title="View 2 (Iso)"),
+    ]
+    if param["diameter"] < 10000:
+        figures.append(make_sphere_fig(
+            **geometry, room_w=r["room_size_w"], room_l=r["room_size_l"], room_h=r["room_size_h"],
+            show_room_box=True, show_room_dims=True, elev=25, azim=-145, title="Recommended Room Dimensions",
+        ))
+    figures.append(make_sphere_fig(
+        **geometry, face_values=module_power_map(r)["module_power_W"], face_label="Module power (W)",
+        elev=25, azim=-145, title="Module Power Map (Full White)",
+    ))
+
+    document_no = param["document_no"]
+    quote = build_quote(document_no, param, r, quote_parts=options.get("quote_parts"),
+                        figures=[figure_png(f) for f in figures])
+    pdf, xlsx = io.BytesIO(), io.BytesIO()
+    write_quote_pdf(quote, pdf)
+    write_quote_xlsx(quote, xlsx)
+    return _summary(r), [(f"{document_no}.pdf", pdf.getvalue()), (f"{document_no}.xlsx", xlsx.getvalue())]
+
+
+JOB_KINDS = {
+    "sweep": _sweep_item,
+    "reports": _report_item,
+}
+
+
+def run_item(kind, param, options):
+    # worker 端：回傳 (summary, files, error, seconds)；例外不往外丟，記在該項目
+    # 計時（job_<kind>、出圖）經 workers.submit 傳回主 process 記錄
+    t0 = time.perf_counter()
+    try:
+        with timed(f"job_{kind}"):
+            summary, files = JOB_KINDS[kind](param, options)
+        return summary, files, None, time.perf_counter() - t0
+    except Exception as e:
+        return None, [], f"{type(e).__name__}: {e}", time.perf_counter() - t0
+
+
+# =============================
+# 建立工作
+# =============================
+def parse_values(text):
+    # "2000, 3000, 5000" 或 "start:stop:step"（含 stop）
+    text = text.strip()
+    if re.fullmatch(r"[^,]+:[^,]+:[^,]+", text):
+        start, stop, step = (float(v) for v in text.split(":"))
+        if step <= 0 or stop < start:
+            raise ValueError(f"Invalid range: {text}")
+        n = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [start + i * step for i in range(n)]
+    values = [float(v) for v in text.split(",") if v.strip()]
+    if not values:
+        raise ValueError("No values given")
+    return values
+
+
+def sweep_params(base_param, axes):
+    # axes：{欄位: [值, ...]}（VARIANT_FIELDS），全部組合
+    for field in axes:
+        if field not in VARIANT_FIELDS:
+            raise ValueError(f"Cannot sweep {field}")
+    # 整數欄位（解析度、更新率）維持整數
+    axes = {f: [int(round(v)) if isinstance(base_param.get(f), int) else v for v in values] for f, values in axes.items()}
+    fields = list(axes)
+    params = [dict(base_param, **dict(zip(fields, combo))) for combo in itertools.product(*axes.values())]
+    if len(params) > MAX_ITEMS:
+        raise ValueError(f"Sweep has {len(params)} designs; the limit is {MAX_ITEMS}")
+    return params
+
+
+def submit_job(kind, title, params, options=None, project=None, path=JOBS_DB):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if not params:
+        raise ValueError("Job has no items")
+    if len(params) > MAX_ITEMS:
+        raise ValueError(f"Job has {len(params)} items; the limit is {MAX_ITEMS}")
+    if kind == "reports":
+        stem = re.sub(r"[^A-Za-z0-9_-]", "_", title)
+        width = len(str(len(params)))
+        params = [dict(p, document_no=p.get("document_no") or f"{stem}_{i + 1:0{width}d}") for i, p in enumerate(params)]
+
+    with closing(_connect(path)) as con, con:
+        job_id = con.execute(
+            "INSERT INTO jobs (kind, title, project, status, options, n_items, created) "
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (kind, title, project, json.dumps(options or {}), len(params), time.time()),
+        ).lastrowid
+        con.executemany(
+            "INSERT INTO items (job_id, idx, param, status) VALUES (?, ?, ?, 'queued')",
+            [(job_id, i, json.dumps(p)) for i, p in enumerate(params)],
+        )
+    _wake(path)
+    return job_id
+
+
+def cancel_job(job_id, path=JOBS_DB):
+    # 還沒開始的工作直接取消；執行中的由 dispatcher 處理（已完成的項目保留）
+    with closing(_connect(path)) as con, con:
+        con.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,))
+        if con.execute(
+            "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id),
+        ).rowcount:
+            con.execute("UPDATE items SET status = 'cancelled' WHERE job_id = ? AND status = 'queued'", (job_id,))
+    _wake(path)
+
+
+def delete_job(job_id, path=JOBS_DB):
+    # 只刪已結束的工作
+    with closing(_connect(path)) as con, con:
+        return con.execute(
+            "DELETE FROM jobs WHERE id = ? AND status NOT IN ('queued', 'running')", (job_id,)
+        ).rowcount > 0
+
+
+# =============================
+# 查詢
+# =============================
+def list_jobs(limit=20, project=None, path=JOBS_DB):
+    # project 為 None → 所有專案（CLI / 管理用）
+    with closing(_connect(path)) as con:
+        if project is None:
+            rows = con.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = con.execute(
+                "SELECT * FROM jobs WHERE project = ? ORDER BY id DESC LIMIT ?", (project, limit)
+            ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_job(job_id, path=JOBS_DB):
+    with closing(_connect(path)) as con:
+        row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def job_items(job_id, path=JOBS_DB):
+    with closing(_connect(path)) as con:
+        rows = con.execute("SELECT * FROM items WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+    items = []
+    for r in rows:
+        item = dict(r)
+        item["param"] = json.loads(item["param"])
+        item["summary"] = json.loads(item["summary"]) if item["summary"] else None
+        items.append(item)
+    return items
+
+
+def job_zip(job_id, path=JOBS_DB):
+    # 目前已完成的檔案（部分結果也可下載）；沒有檔案回傳 None
+    with closing(_connect(path)) as con:
+        rows = con.execute("SELECT name, data FROM files WHERE job_id = ? ORDER BY idx, name", (job_id,)).fetchall()
+    if not rows:
+        return None
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in rows:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def jobs_table(jobs):
+    return pd.DataFrame({
+        "Job": [j["id"] for j in jobs],
+        "Type": [j["kind"] for j in jobs],
+        "Title": [j["title"] for j in jobs],
+        "Status": [j["status"] for j in jobs],
+        "Progress": [f'{j["n_done"] + j["n_failed"]} / {j["n_items"]}' for j in jobs],
+        "Failed": [j["n_failed"] for j in jobs],
+        "Submitted": [time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(j["created"])) for j in jobs],
+    })
+
+
+def items_table(items):
+    # 掃描的欄位 + 結果摘要；失敗的項目顯示錯誤
+    swept = [f for f in VARIANT_FIELDS if len({it["param"].get(f) for it in items}) > 1]
+    rows = []
+    for it in items:
+        s = it["summary"] or {}
+        row = {"#": it["idx"] + 1, "Status": it["status"]}
+        row.update({f: it["param"].get(f) for f in swept})
+        row.update({
+            "Pitch (mm)": round(s["pitch_mm"], 3) if s else None,
+            "Resolution V": s.get("resolution_v"),
+            "Module Types": s.get("module_types"),
+            "Module Qty": s.get("modules"),
+            "Hub Qty": s.get("hubs"),
+            "PSU Qty": s.get("psus"),
+            "Total Power (kW)": round(s["power_kW"], 2) if s else None,
+            "Max PSU Utilization (%)": round(s["psu_max_utilization"] * 100, 1) if s else None,
+            "Room W × L × H (mm)": " × ".join(str(v) for v in s["room_mm"]) if s else None,
+            "Error": it["error"] or "",
+        })
+        rows.append(row)
+    return pd.DataFrame(rows).convert_dtypes()
+
+
+# =============================
+# Dispatcher
+# =============================
+class JobRunner:
+    def __init__(self, path=JOBS_DB, max_workers=JOB_WORKERS):
+        self.path = path
+        self.max_workers = max_workers
+        self.wake = threading.Event()
+        self._pool = None
+        init_db(path)
+        self._recover()
+        self.thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+        self.thread.start()
+
+    def _recover(self):
+        # 上次 process 結束時還在跑的工作（owner 已不存在）→ 重新排隊，已完成的項目保留
+        with closing(_connect(self.path)) as con, con:
+            for row in con.execute("SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall():
+                if row["owner_pid"] != os.getpid() and not _pid_alive(row["owner_pid"]):
+                    con.execute("UPDATE jobs SET status = 'queued', owner_pid = NULL WHERE id = ?", (row["id"],))
+
+    def _get_pool(self):
+        # 與 compare 分開的 pool：背景工作不佔互動用的 worker
+        if self._pool is None:
+            self._pool = make_pool(self.max_workers)
+        return self._pool
+
+    def _claim(self):
+        # 多個 app process 共用同一個 DB 時，用條件式 UPDATE 搶工作
+        with closing(_connect(self.path)) as con, con:
+            for row in con.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id").fetchall():
+                if con.execute(
+                    "UPDATE jobs SET status = 'running', owner_pid = ?, started = COALESCE(started, ?) "
+                    "WHERE id = ? AND status = 'queued'",
+                    (os.getpid(), time.time(), row["id"]),
+                ).rowcount:
+                    return dict(con.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        return None
+
+    def _loop(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                self.wake.wait(POLL_S * 4)
+                self.wake.clear()
+                continue
+            try:
+                self._run(job)
+            except BrokenProcessPool as e:
+                self._pool = None
+                self._finish(job["id"], "failed", f"Worker pool crashed: {e}")
+            except Exception as e:
+                self._finish(job["id"], "failed", f"{type(e).__name__}: {e}")
+
+    def _run(self, job):
+        job_id, kind = job["id"], job["kind"]
+        options = json.loads(job["options"])
+        with closing(_connect(self.path)) as con:
+            pending = con.execute(
+                "SELECT idx, param FROM items WHERE job_id = ? AND status = 'queued' ORDER BY idx", (job_id,)
+            ).fetchall()
+
+        pool = self._get_pool()
+        futures = {submit(pool, run_item, kind, json.loads(p), options): idx for idx, p in pending}
+
+        with closing(_connect(self.path)) as con:
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, timeout=POLL_S, return_when=FIRST_COMPLETED)
+                with con:
+                    for f in done:
+                        if not f.cancelled():
+                            self._store(con, job_id, futures[f], *unwrap(f))
+                    cancel = con.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if cancel is None or cancel[0]:
+                    # 已在執行的項目跑完後丟棄（cancel() 對執行中的 future 無效）
+                    for f in not_done:
+                        f.cancel()
+                    break
+
+        status = "cancelled" if not_done else "done"
+        self._finish(job_id, status)
+
+    def _store(self, con, job_id, idx, summary, files, error, seconds):
+        con.execute(
+            "UPDATE items SET status = ?, summary = ?, error = ?, seconds = ? WHERE job_id = ? AND idx = ?",
+            ("failed" if error else "done", json.dumps(summary) if summary is not None else None,
+             error, seconds, job_id, idx),
+        )
+        con.executemany(
+            "INSERT OR REPLACE INTO files (job_id, idx, name, data) VALUES (?, ?, ?, ?)",
+            [(job_id, idx, name, data) for name, data in files],
+        )
+        con.execute(
+            f"UPDATE jobs SET {'n_failed = n_failed' if error else 'n_done = n_done'} + 1 WHERE id = ?", (job_id,)
+        )
+
+    def _finish(self, job_id, status, error=None):
+        with closing(_connect(self.path)) as con, con:
+            con.execute(
+                "UPDATE items SET status = 'cancelled', error = COALESCE(?, error) "
+                "WHERE job_id = ? AND status = 'queued'",
+                (error, job_id),
+            )
+            con.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ?",
+                (status, time.time(), job_id),
+            )
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_RUNNERS = {}
+_RUNNERS_LOCK = threading.Lock()
+
+
+def get_runner(path=JOBS_DB, max_workers=JOB_WORKERS):
+    # 每個 process、每個 DB 一個 dispatcher
+    with _RUNNERS_LOCK:
+        if path not in _RUNNERS:
+            _RUNNERS[path] = JobRunner(path, max_workers)
+        return _RUNNERS[path]
+
+
+def _wake(path):
+    runner = _RUNNERS.get(path)
+    if runner is not None:
+        runner.wake.set()
@@ -0,0 +1,241 @@
+# led_map.py
+# 每顆實體 LED 對應 equirectangular 來源畫面的哪個像素（nearest / bilinear）
+# 每一像素列的 LED 數依該列緯度的 cos 變化（與 calculate 的 exact 模式同公式）
+# 輸出為固定 64-byte header + 連續陣列的二進位檔，播放端可直接 mmap、零複製讀取
+# 命令列：python led_map.py OUT [--mode nearest|bilinear --diameter ... 其餘設計參數見 cli.py]
+import argparse
+import sys
+import numpy as np
+from calculator import ring_led_counts
+from cli import add_design_arguments, design_from_args
+from module_power import module_grid_shape
+
+MAGIC = b"LEDMAP01"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("mode", "<u4"),          # 0 = nearest, 1 = bilinear
+    ("n_leds", "<u8"),
+    ("n_rows", "<u8"),        # 像素列數 = resolution_v_final
+    ("n_modules_h", "<u4"),   # n_equator_final
+    ("src_w", "<u4"),
+    ("src_h", "<u4"),
+    ("full_sphere", "<u4"),
+    ("reserved", "<u8", 2),
+])  # 64 bytes
+
+MODES = {"nearest": 0, "bilinear": 1}
+
+# 每顆 LED 的欄位，依序存成獨立的連續陣列（struct-of-arrays，每段 8-byte 對齊）
+# x, y：來源像素（bilinear 時為左上角）；fx, fy：bilinear 小數部分
+FIELDS = {
+    0: (("x", "<u2"), ("y", "<u2")),
+    1: (("x", "<u2"), ("y", "<u2"), ("fx", "<f4"), ("fy", "<f4")),
+}
+
+
+def _layout(n_rows, n_leds, mode_id):
+    # header | row_offsets (n_rows + 1) | row_led_per_module (n_rows) | fields...
+    at = HEADER_DTYPE.itemsize
+    sections = {"row_offsets": (at, "<u8", n_rows + 1)}
+    at += (n_rows + 1) * 8
+    sections["row_led_per_module"] = (at, "<u4", n_rows)
+    at += n_rows * 4
+    for name, dtype in FIELDS[mode_id]:
+        at += (-at) % 8
+        sections[name] = (at, dtype, n_leds)
+        at += n_leds * np.dtype(dtype).itemsize
+    return sections, at
+
+
+def _section(mm, spec):
+    at, dtype, count = spec
+    return mm[at:at + count * np.dtype(dtype).itemsize].view(dtype)
+
+
+def pixel_row_latitudes(result):
+    # 每一像素列中心的緯度 (deg)，由北往南，長度 = n_vertical_final * px_per_module_v
+    n_v, _ = module_grid_shape(result)
+    n_rows = n_v * int(result["px_per_module_v"])
+    step = float(result["angle_per_module_v_deg"]) / int(result["px_per_module_v"])
+    return float(result["fov_v_n_final"]) - (np.arange(n_rows) + 0.5) * step
+
+
+def pixel_row_led_counts(result, latitudes=None):
+    # 每片模組在各像素列的水平 LED 數；與 calculate 的 exact 模式相同（極區 / 越過極點的列為 0 顆）
+    _, n_e = module_grid_shape(result)
+    if latitudes is None:
+        latitudes = pixel_row_latitudes(result)
+    counts = ring_led_counts(
+        float(result["diameter_mm"]), float(result["fov_h_deg"]), n_e, float(result["pitch_mm"]), latitudes
+    )
+    return counts.astype(np.int64)
+
+
+def default_source_size(result, full_sphere=True):
+    _, n_e = module_grid_shape(result)
+    resolution_h = int(result["px_per_module_h"]) * n_e
+    if full_sphere:
+        src_w = int(round(resolution_h * 360 / float(result["fov_h_deg"])))
+        return src_w, src_w // 2
+    return resolution_h, int(result["resolution_v_final"])
+
+
+def _source_coords(lon, lat, result, src_w, src_h, full_sphere):
+    # 連續像素座標（像素中心 = 整數）
+    if full_sphere:
+        x = (lon + 180) / 360 * src_w - 0.5
+        y = (90 - lat) / 180 * src_h - 0.5
+    else:
+        fov_v = float(result["fov_v_n_final"]) + float(result["fov_v_s_final"])
+        x = (lon + float(result["fov_h_deg"]) / 2) / float(result["fov_h_deg"]) * src_w - 0.5
+        y = (float(result["fov_v_n_final"]) - lat) / fov_v * src_h - 0.5
+    return x, y
+
+
+def write_led_map(result, path, mode="bilinear", src_w=None, src_h=None, full_sphere=True, chunk_leds=1 << 22):
+    mode_id = MODES[mode]
+    if src_w is None or src_h is None:
+        src_w, src_h = default_source_size(result, full_sphere=full_sphere)
+    if max(src_w, src_h) > 0xFFFF:
+        raise ValueError("Source frame larger than 65535 px is not supported by the uint16 pixel index")
+
+    _, n_e = module_grid_shape(result)
+    apm_h = float(result["angle_per_module_h_deg"])
+    lon0 = -float(result["fov_h_deg"]) / 2
+
+    lat_rows = pixel_row_latitudes(result)
+    per_module = pixel_row_led_counts(result, lat_rows)
+    per_row = per_module * n_e
+    row_offsets = np.zeros(len(per_row) + 1, dtype=np.int64)
+    np.cumsum(per_row, out=row_offsets[1:])
+    n_leds = int(row_offsets[-1])
+    n_rows = len(per_row)
+
+    sections, total_bytes = _layout(n_rows, n_leds, mode_id)
+    mm = np.memmap(path, dtype=np.uint8, mode="w+", shape=(total_bytes,))
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = 1
+    header["mode"] = mode_id
+    header["n_leds"] = n_leds
+    header["n_rows"] = n_rows
+    header["n_modules_h"] = n_e
+    header["src_w"] = src_w
+    header["src_h"] = src_h
+    header["full_sphere"] = int(bool(full_sphere))
+    mm[:HEADER_DTYPE.itemsize] = header.view(np.uint8)
+    _section(mm, sections["row_offsets"])[:] = row_offsets
+    _section(mm, sections["row_led_per_module"])[:] = per_module
+    out = {name: _section(mm, sections[name]) for name, _ in FIELDS[mode_id]}
+
+    # 同一像素列的 y 相同 → 逐列計算；x 由列內序號 k 直接得出：
+    # col + (led + 0.5) / n_j = (k + 0.5) / n_j，不需要整數除法
+    _, row_y = _source_coords(0.0, lat_rows, result, src_w, src_h, full_sphere)
+    row_y = np.clip(row_y, 0, src_h - 1)
+    if mode_id == 0:
+        row_y0 = np.rint(row_y)
+    else:
+        row_y0 = np.minimum(np.floor(row_y), max(src_h - 2, 0))
+    row_fy = row_y - row_y0
+    row_step = np.divide(apm_h, per_module, out=np.zeros(n_rows), where=per_module > 0)
+
+    # =============================
+    # 以像素列為單位分批（每批約 chunk_leds 顆），整批向量化
+    # =============================
+    row = 0
+    while row < n_rows:
+        stop = int(np.searchsorted(row_offsets, row_offsets[row] + chunk_leds, side="right")) - 1
+        stop = min(max(stop, row + 1), n_rows)
+        start_led = int(row_offsets[row])
+        end_led = int(row_offsets[stop])
+        counts = per_row[row:stop]
+
+        k = np.arange(start_led, end_led, dtype=np.float64)
+        k -= np.repeat(row_offsets[row:stop].astype(np.float64) - 0.5, counts)
+        lon = lon0 + k * np.repeat(row_step[row:stop], counts)
+        x, _ = _source_coords(lon, 0.0, result, src_w, src_h, full_sphere)
+        np.clip(x, 0, src_w - 1, out=x)
+
+        sl = slice(start_led, end_led)
+        out["y"][sl] = np.repeat(row_y0[row:stop], counts)
+        if mode_id == 0:
+            out["x"][sl] = np.rint(x)
+        else:
+            x0 = np.minimum(np.floor(x), max(src_w - 2, 0))
+            out["x"][sl] = x0
+            out["fx"][sl] = x - x0
+            out["fy"][sl] = np.repeat(row_fy[row:stop], counts)
+
+        row = stop
+
+    mm.flush()
+    del mm
+
+    return {
+        "path": path,
+        "mode": mode,
+        "n_leds": n_leds,
+        "n_rows": n_rows,
+        "src_w": src_w,
+        "src_h": src_h,
+        "bytes": total_bytes,
+    }
+
+
+def load_led_map(path):
+    # 全部以 np.memmap 的 view 回傳，不複製資料
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    header = mm[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    if bytes(header["magic"]) != MAGIC:
+        raise ValueError(f"{path} is not an LED map file")
+
+    mode_id = int(header["mode"])
+    sections, _ = _layout(int(header["n_rows"]), int(header["n_leds"]), mode_id)
+    led_map = {"header": header}
+    for name, spec in sections.items():
+        led_map[name] = _section(mm, spec)
+    return led_map
+
+
+def sample_frame(led_map, frame):
+    # 參考實作：依對應表從一格 equirectangular 畫面取出每顆 LED 的顏色
+    frame = np.asarray(frame, dtype=np.float32)
+    x = led_map["x"].astype(np.intp)
+    y = led_map["y"].astype(np.intp)
+    if "fx" not in led_map:
+        return frame[y, x]
+
+    fx = led_map["fx"][:, None]
+    fy = led_map["fy"][:, None]
+    x1 = np.minimum(x + 1, frame.shape[1] - 1)
+    y1 = np.minimum(y + 1, frame.shape[0] - 1)
+    top = frame[y, x] * (1 - fx) + frame[y, x1] * fx
+    bottom = frame[y1, x] * (1 - fx) + frame[y1, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the LED-to-source-pixel map for a sphere design.")
+    parser.add_argument("out", help="output map file")
+    parser.add_argument("--mode", choices=list(MODES), default="bilinear")
+    parser.add_argument("--src-w", type=int, default=None, help="source frame width (default: native)")
+    parser.add_argument("--src-h", type=int, default=None, help="source frame height (default: native)")
+    parser.add_argument("--fov-only", action="store_true",
+                        help="source frames cover only the sphere's FOV instead of the full 360° × 180°")
+    add_design_arguments(parser)
+    args = parser.parse_args(argv)
+
+    _, result = design_from_args(args)
+    out = write_led_map(result, args.out, mode=args.mode, src_w=args.src_w, src_h=args.src_h,
+                        full_sphere=not args.fov_only)
+    print(f'{out["n_leds"]:,} LEDs in {out["n_rows"]:,} pixel rows, {out["mode"]}, '
+          f'source {out["src_w"]} × {out["src_h"]}')
+    print(f'{out["bytes"] / 2**20:.1f} MB written to {out["path"]}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
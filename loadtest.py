@@ -0,0 +1,322 @@
+# loadtest.py
+# app.py 的多 session 併發壓力測試（Streamlit AppTest，headless）
+# 每個 session：登入 Yenrich → 反覆「改參數 + Calculate」、改 BOM 選料（fragment rerun）、切換 Visitor / Yenrich
+# 記錄各動作延遲百分位數、吞吐量（Calculate / 秒）、每個 session 的記憶體
+# 記憶體：ru_maxrss 是整個 worker process 的峰值（含 interpreter 與 import 的套件），
+#   另開一個只 import app 相依套件的閒置 process 當基準，session 記憶體 = 峰值 - 基準
+#
+# 註：AppTest 每次 run 都會換掉全域的 Runtime 單例，同一個 process 內無法同時跑多個 AppTest，
+#     所以每個 session 各開一個 process（spawn），暖機後用 barrier 同時開始。
+#     實際部署是一個 Streamlit server process 服務所有 session：script thread 共用一個 GIL，
+#     這裡各 session 各有自己的 interpreter、可同時用多顆 CPU，所以延遲偏低、吞吐量偏高（容量高估）；
+#     CPU 核心數少於 session 數時才接近真實的 CPU 競爭。st.cache_data 不跨 session 共用則讓結果略偏慢，
+#     但抵不過 GIL 的差距 —— 報告的數字要當成上限看
+#
+# 執行：python loadtest.py [-n 1,2,4,8] [--iterations 5] [--seed 0] [--json report.json]
+import argparse
+import ast
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import time
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+PASSCODE = "25087030"
+
+STEPS = ("startup", "login", "calculate", "bom", "bom_toggle")
+PERCENTILES = (50, 90, 95, 99)
+
+# 業務實際會輸入的參數組合（抽樣用）
+PARAM_MIX = {
+    "in_diameter": [2000.0, 3000.0, 5000.0, 8000.0, 12000.0, 15000.0, 20000.0],
+    "in_fov_h": [180.0, 210.0, 240.0, 360.0],
+    "in_fov_v_n": [45.0, 67.5, 90.0],
+    "in_fov_v_s": [0.0, 22.5, 33.75, 45.0],
+    "in_resolution_h": [1920, 3840, 4096, 7680],
+    "in_luminance": [600.0, 800.0, 1000.0, 1200.0],
+    "in_frame_rate": [50, 60, 120],
+    "in_bottom_edge_height": [0.0, 500.0, 1000.0, 1500.0],
+}
+P_EXACT_LED_COUNT = 0.2
+
+
+def session_params(rng, n):
+    # 回傳 n 組 {widget key: value}
+    cols = {k: rng.choice(len(v), size=n) for k, v in PARAM_MIX.items()}
+    exact = rng.random(n) < P_EXACT_LED_COUNT
+    return [
+        dict({k: PARAM_MIX[k][int(cols[k][i])] for k in PARAM_MIX}, in_exact_led_count=bool(exact[i]))
+        for i in range(n)
+    ]
+
+
+def _rss_mb():
+    # 整個 process 的峰值 RSS；Linux ru_maxrss 單位 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _app_imports():
+    # app.py 最上層 import 的模組
+    with open(APP_PATH, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return names
+
+
+def _idle_baseline(queue):
+    # 沒有 session 的 worker：只 import AppTest 與 app 的相依套件
+    os.chdir(REPO_DIR)
+    sys.path.insert(0, REPO_DIR)
+    import streamlit.testing.v1  # noqa: F401
+
+    for name in _app_imports():
+        importlib.import_module(name)
+    queue.put(_rss_mb())
+
+
+def idle_baseline_mb():
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    p = ctx.Process(target=_idle_baseline, args=(queue,))
+    p.start()
+    baseline = queue.get()
+    p.join()
+    return baseline
+
+
+def _state_bytes(at):
+    total = 0
+    for value in at.session_state.values():
+        try:
+            total += len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            total += sys.getsizeof(value)
+    return total
+
+
+class _Session:
+    # 一個 AppTest = 一個瀏覽器 session
+    def __init__(self, name, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.name = name
+        self.latency = {step: [] for step in STEPS}
+        self.errors = []
+        self.rejected = 0
+
+    def _timed(self, step, action):
+        t0 = time.perf_counter()
+        action()
+        self.latency[step].append(time.perf_counter() - t0)
+        if self.at.exception:
+            self.errors.append(f"{step}: {self.at.exception[0].message}")
+
+    def _text(self, label, value):
+        for t in self.at.text_input:
+            if t.label == label:
+                t.set_value(value)
+
+    def _button(self, label):
+        return next(b for b in self.at.button if b.label == label)
+
+    def _yenrich(self):
+        self.at.radio(key="mode").set_value("Yenrich").run()
+        self._text("Yenrich Passcode", PASSCODE)
+        self._text("Project Name", self.name)
+        self.at.run()
+
+    def startup(self):
+        self._timed("startup", self.at.run)
+
+    def login(self):
+        self._timed("login", self._yenrich)
+
+    def calculate(self, widgets):
+        for key, value in widgets.items():
+            widget = self.at.checkbox(key) if key == "in_exact_led_count" else (
+                self.at.selectbox(key) if key == "in_frame_rate" else self.at.number_input(key))
+            widget.set_value(value)
+        self._timed("calculate", lambda: self._button("Calculate").click().run())
+        if any(e.value.startswith(("Calculation failed", "⚠️")) for e in self.at.error):
+            self.rejected += 1
+
+    def bom(self, rng):
+        # BOM fragment：隨機換一個料號（只有 fragment rerun）
+        boxes = [s for s in self.at.selectbox if str(s.key or "").startswith("quote_parts_") and len(s.options) > 1]
+        if not boxes:
+            return
+        box = boxes[int(rng.integers(len(boxes)))]
+        choice = box.options[int(rng.integers(len(box.options)))]
+        self._timed("bom", lambda: box.set_value(choice).run())
+
+    def bom_toggle(self):
+        # 切到 Visitor（BOM 隱藏）再切回 Yenrich（BOM 重新顯示）
+        def toggle():
+            self.at.radio(key="mode").set_value("Visitor").run()
+            self._yenrich()
+        self._timed("bom_toggle", toggle)
+
+
+def _run_session(index, widgets, seed, timeout, barrier, queue):
+    os.chdir(REPO_DIR)
+    rng = np.random.default_rng(seed)
+    out = {"session": index}
+    try:
+        s = _Session(f"load{index:03d}", timeout)
+        s.startup()
+        s.login()
+        rss_ready = _rss_mb()
+        barrier.wait()
+
+        t_start = time.time()
+        for w in widgets:
+            s.calculate(w)
+            s.bom(rng)
+            s.bom_toggle()
+        t_end = time.time()
+
+        out.update(
+            latency=s.latency,
+            errors=s.errors,
+            rejected=s.rejected,
+            calculations=len(widgets),
+            t_start=t_start,
+            t_end=t_end,
+            process_rss_ready_mb=rss_ready,
+            process_rss_peak_mb=_rss_mb(),
+            session_state_kb=_state_bytes(s.at) / 1024,
+        )
+    except Exception as e:
+        barrier.abort()
+        out["errors"] = [f"{type(e).__name__}: {e}"]
+    finally:
+        from compare import shutdown_pool
+
+        shutdown_pool()
+    queue.put(out)
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    out = {f"p{q}": float(np.percentile(arr, q)) for q in PERCENTILES}
+    out["max"] = float(arr.max())
+    out["n"] = int(arr.size)
+    return out
+
+
+def load_test(n_sessions, iterations=5, seed=0, timeout=300, baseline_mb=None):
+    # n_sessions 個 session 同時跑 iterations 輪；回傳彙總 report（各 session 原始資料在 "sessions"）
+    # baseline_mb：閒置 process 的 RSS（None → 先量一次）
+    if baseline_mb is None:
+        baseline_mb = idle_baseline_mb()
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(n_sessions)
+    queue = ctx.Queue()
+    seeds = np.random.SeedSequence(seed).spawn(n_sessions)
+    rng = np.random.default_rng(seed)
+    widgets = session_params(rng, n_sessions * iterations)
+
+    procs = [
+        ctx.Process(
+            target=_run_session,
+            args=(i, widgets[i * iterations:(i + 1) * iterations], seeds[i], timeout, barrier, queue),
+        )
+        for i in range(n_sessions)
+    ]
+    for p in procs:
+        p.start()
+    sessions = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return summarize_sessions(sessions, n_sessions, iterations, baseline_mb)
+
+
+def summarize_sessions(sessions, n_sessions, iterations, baseline_mb):
+    # 各 session 回傳的原始資料 → report；失敗的 session（沒有 "latency"）只計入 errors / rejected
+    sessions = sorted(sessions, key=lambda s: s["session"])
+    ok = [s for s in sessions if "latency" in s]
+    latency = {step: _percentiles([v for s in ok for v in s["latency"][step]]) for step in STEPS}
+    wall = (max(s["t_end"] for s in ok) - min(s["t_start"] for s in ok)) if ok else 0.0
+    calculations = sum(s["calculations"] for s in ok)
+    actions = sum(len(s["latency"][step]) for s in ok for step in ("calculate", "bom", "bom_toggle"))
+
+    return {
+        "n_sessions": n_sessions,
+        "iterations": iterations,
+        "wall_s": wall,
+        "calculations": calculations,
+        "throughput_calc_per_s": calculations / wall if wall > 0 else 0.0,
+        "throughput_actions_per_s": actions / wall if wall > 0 else 0.0,
+        "latency": latency,
+        "memory": {
+            "idle_baseline_mb": baseline_mb,
+            "process_rss_peak_mb": _percentiles([s["process_rss_peak_mb"] for s in ok]),
+            "session_rss_mb": _percentiles([s["process_rss_peak_mb"] - baseline_mb for s in ok]),
+            "session_rss_growth_mb": _percentiles([s["process_rss_peak_mb"] - s["process_rss_ready_mb"] for s in ok]),
+            "session_state_kb": _percentiles([s["session_state_kb"] for s in ok]),
+        },
+        "rejected": sum(s.get("rejected", 0) for s in sessions),
+        "errors": [f'session {s["session"]}: {e}' for s in sessions for e in s.get("errors", [])],
+        "sessions": sessions,
+    }
+
+
+def _print_report(report):
+    print(f'\n=== {report["n_sessions"]} concurrent session(s), {report["iterations"]} iteration(s) each ===')
+    print(f'wall {report["wall_s"]:.1f} s   calculations {report["calculations"]}   '
+          f'throughput {report["throughput_calc_per_s"]:.2f} calc/s, {report["throughput_actions_per_s"]:.2f} actions/s')
+    print(f'{"step":<12}' + "".join(f"{'p%d' % q:>10}" for q in PERCENTILES) + f'{"max":>10}{"n":>6}')
+    for step, pct in report["latency"].items():
+        if pct:
+            print(f"{step:<12}" + "".join(f'{pct["p%d" % q] * 1000:>8.0f}ms' for q in PERCENTILES)
+                  + f'{pct["max"] * 1000:>8.0f}ms{pct["n"]:>6}')
+    mem = report["memory"]
+    if mem["session_rss_mb"]:
+        print(f'memory per session (worker peak RSS - idle {mem["idle_baseline_mb"]:.0f} MB): '
+              f'p50 {mem["session_rss_mb"]["p50"]:.0f} MB (max {mem["session_rss_mb"]["max"]:.0f}), '
+              f'growth during test p50 {mem["session_rss_growth_mb"]["p50"]:.0f} MB, '
+              f'session_state p50 {mem["session_state_kb"]["p50"]:.0f} KB')
+    print(f'rejected inputs: {report["rejected"]}   errors: {len(report["errors"])}')
+    for e in report["errors"][:10]:
+        print("  " + e)
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py (Streamlit AppTest).")
+    parser.add_argument("-n", "--sessions", default="1,2,4", help="comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=5, help="calculate rounds per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="per-run AppTest timeout (s)")
+    parser.add_argument("--json", default=None, help="write all reports to this file")
+    args = parser.parse_args(argv)
+
+    reports = []
+    baseline = idle_baseline_mb()
+    for n in (int(v) for v in args.sessions.split(",")):
+        report = load_test(n, args.iterations, args.seed, args.timeout, baseline)
+        _print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=1, default=float)
+        print(f"Report written to {args.json}")
+    return 1 if any(r["errors"] for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,206 @@
+# mesh_export.py
+# 球幕模組面板的 3D mesh（給機構 CAD）：每片模組細分成 subdiv × subdiv 個四邊形（各 2 個三角形）
+# 每片模組有自己的頂點（不與鄰片共用），三角形帶 panel_id / row_type
+# 座標與 make_sphere_fig 相同：球心在 (0, 0)，z 軸朝上，最低點 = bottom_edge_height，單位 mm
+# 全部以 NumPy 陣列一次產生，寫檔（STL / OBJ / glTF）也直接從陣列 buffer 輸出
+import io
+import json
+import struct
+import numpy as np
+from module_power import module_grid_shape
+
+STL_DTYPE = np.dtype([
+    ("normal", "<f4", 3),
+    ("v", "<f4", (3, 3)),
+    ("attr", "<u2"),      # row_type
+])  # 50 bytes
+
+
+def panel_mesh(result, subdiv=2, bottom_edge_height=0.0):
+    # panel_id = module_id（column-major：c * n_v + r，與 module_power / cabling 相同），row 0 在最北
+    # row_type = 模組種類（由北往南第幾列）
+    n_v, n_e = module_grid_shape(result)
+    R = float(result["diameter_mm"]) / 2
+    fov_h = float(result["fov_h_deg"])
+    fov_v_n = float(result["fov_v_n_final"])
+    fov_v_s = float(result["fov_v_s_final"])
+    s = int(subdiv)
+
+    # 每片模組內 (s + 1) × (s + 1) 個頂點的角度
+    theta_edges = np.deg2rad(np.linspace(90 - fov_v_n, 90 + fov_v_s, n_v + 1))
+    phi_edges = np.deg2rad(np.linspace(-fov_h / 2, fov_h / 2, n_e + 1))
+    t = np.linspace(0.0, 1.0, s + 1)
+    theta = theta_edges[:-1, None] + np.diff(theta_edges)[:, None] * t     # (n_v, s + 1)
+    phi = phi_edges[:-1, None] + np.diff(phi_edges)[:, None] * t           # (n_e, s + 1)
+
+    # 頂點陣列形狀 (n_e, n_v, s + 1, s + 1)：panel 依 module_id 排序
+    th = theta[None, :, :, None]
+    ph = phi[:, None, None, :]
+    nx = np.sin(th) * np.cos(ph)
+    ny = np.sin(th) * np.sin(ph)
+    nz = np.broadcast_to(np.cos(th), nx.shape)
+    normals = np.stack([nx, ny, nz], axis=-1).reshape(-1, 3)
+
+    vertices = normals * R
+    z_shift = float(bottom_edge_height) - R * np.cos(theta_edges[-1])
+    vertices[:, 2] += z_shift
+
+    # 每片模組的三角形（局部頂點編號），外法線方向為逆時針
+    vpp = (s + 1) * (s + 1)
+    i, j = np.meshgrid(np.arange(s), np.arange(s), indexing="ij")   # i：theta，j：phi
+    a = (i * (s + 1) + j).ravel()
+    b = a + 1
+    c = a + (s + 1)
+    d = c + 1
+    local = np.concatenate([np.stack([a, d, b], 1), np.stack([a, c, d], 1)])
+    tpp = len(local)
+
+    n_panels = n_v * n_e
+    panel_id = np.arange(n_panels)
+    triangles = (local[None, :, :] + (panel_id * vpp)[:, None, None]).reshape(-1, 3)
+    tri_panel = np.repeat(panel_id, tpp)
+
+    return {
+        "vertices": vertices,
+        "normals": normals,
+        "triangles": triangles,
+        "panel_id": tri_panel,
+        "row_type": tri_panel % n_v,
+        "n_rows": n_v,
+        "n_columns": n_e,
+        "n_panels": n_panels,
+        "verts_per_panel": vpp,
+        "tris_per_panel": tpp,
+    }
+
+
+def _triangle_normals(vertices, triangles):
+    v = vertices[triangles]
+    n = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    length = np.linalg.norm(n, axis=1, keepdims=True)
+    return n / np.where(length > 0, length, 1.0)
+
+
+def write_stl(mesh, fh):
+    # binary STL；attribute byte count 欄位放 row_type
+    tris = mesh["triangles"]
+    rec = np.zeros(len(tris), dtype=STL_DTYPE)
+    rec["normal"] = _triangle_normals(mesh["vertices"], tris)
+    rec["v"] = mesh["vertices"][tris]
+    rec["attr"] = mesh["row_type"]
+
+    header = f'LED sphere {mesh["n_panels"]} panels, {mesh["n_rows"]} row types, mm'.encode("ascii")
+    fh.write(header[:80].ljust(80, b" "))
+    fh.write(struct.pack("<I", len(tris)))
+    fh.write(rec.tobytes())
+
+
+def write_obj(mesh, fh, chunk_panels=4096):
+    # 每片模組一個 object：o M<panel_id>_R<row_type>；格式化整批做，不逐三角形迴圈
+    vertices = mesh["vertices"]
+    normals = mesh["normals"]
+    n_v = mesh["n_rows"]
+    tpp = mesh["tris_per_panel"]
+
+    fh.write(f'# LED sphere: {mesh["n_panels"]} panels, {n_v} row types, units mm\n'.encode("ascii"))
+    fh.write((("v %.3f %.3f %.3f\n" * len(vertices)) % tuple(vertices.ravel())).encode("ascii"))
+    fh.write((("vn %.6f %.6f %.6f\n" * len(normals)) % tuple(normals.ravel())).encode("ascii"))
+
+    face = "f %d//%d %d//%d %d//%d\n"
+    template = "o M%06d_R%02d\n" + face * tpp
+    tris = mesh["triangles"].reshape(mesh["n_panels"], tpp, 3) + 1   # OBJ 從 1 起算
+    for start in range(0, mesh["n_panels"], chunk_panels):
+        block = tris[start:start + chunk_panels]
+        n = len(block)
+        ids = np.arange(start, start + n)
+        # 每個頂點編號寫兩次（v//vn 同編號）
+        idx = np.repeat(block.reshape(n, -1), 2, axis=1)
+        args = np.concatenate([ids[:, None], (ids % n_v)[:, None], idx], axis=1)
+        fh.write(((template * n) % tuple(args.ravel().tolist())).encode("ascii"))
+
+
+def write_glb(mesh, fh):
+    # glTF 2.0 binary（.glb）：glTF 規定 Y 軸朝上、單位公尺 → (x, y, z)mm 轉成 (x, z, -y)m
+    # 自訂頂點屬性 _PANEL_ID / _ROW_TYPE（float，整數值）
+    to_gltf = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=float)
+    positions = (mesh["vertices"] @ to_gltf.T / 1000).astype("<f4")
+    normals = (mesh["normals"] @ to_gltf.T).astype("<f4")
+    indices = mesh["triangles"].astype("<u4").ravel()
+
+    vertex_panel = np.repeat(np.arange(mesh["n_panels"]), mesh["verts_per_panel"])
+    panel_ids = vertex_panel.astype("<f4")
+    row_types = (vertex_panel % mesh["n_rows"]).astype("<f4")
+
+    blobs = []
+    views = []
+    accessors = []
+    offset = 0
+
+    def add(data, target, acc):
+        nonlocal offset
+        raw = data.tobytes()
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(raw), "target": target})
+        accessors.append(dict(acc, bufferView=len(views) - 1))
+        blobs.append(raw)
+        blobs.append(b"\x00" * ((-len(raw)) % 4))
+        offset += len(raw) + (-len(raw)) % 4
+        return len(accessors) - 1
+
+    n_vert = len(positions)
+    pos = add(positions, 34962, {
+        "componentType": 5126, "count": n_vert, "type": "VEC3",
+        "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist(),
+    })
+    nrm = add(normals, 34962, {"componentType": 5126, "count": n_vert, "type": "VEC3"})
+    pid = add(panel_ids, 34962, {"componentType": 5126, "count": n_vert, "type": "SCALAR"})
+    rty = add(row_types, 34962, {"componentType": 5126, "count": n_vert, "type": "SCALAR"})
+    idx = add(indices, 34963, {"componentType": 5125, "count": len(indices), "type": "SCALAR"})
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "led-sphere-calculator"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": "LED sphere"}],
+        "meshes": [{
+            "name": "modules",
+            "primitives": [{
+                "attributes": {"POSITION": pos, "NORMAL": nrm, "_PANEL_ID": pid, "_ROW_TYPE": rty},
+                "indices": idx,
+                "mode": 4,
+            }],
+            "extras": {
+                "n_panels": int(mesh["n_panels"]),
+                "n_row_types": int(mesh["n_rows"]),
+                "n_columns": int(mesh["n_columns"]),
+                "panel_id": "column-major: column * n_row_types + row, row 0 = northmost",
+            },
+        }],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": views,
+        "accessors": accessors,
+    }
+
+    js = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    js += b" " * ((-len(js)) % 4)
+    total = 12 + 8 + len(js) + 8 + offset
+    fh.write(struct.pack("<4sII", b"glTF", 2, total))
+    fh.write(struct.pack("<I4s", len(js), b"JSON"))
+    fh.write(js)
+    fh.write(struct.pack("<I4s", offset, b"BIN\x00"))
+    for blob in blobs:
+        fh.write(blob)
+
+
+MESH_WRITERS = {
+    "stl": write_stl,
+    "obj": write_obj,
+    "glb": write_glb,
+}
+
+
+def export_mesh(result, fmt, subdiv=2, bottom_edge_height=0.0):
+    # 回傳檔案 bytes
+    mesh = panel_mesh(result, subdiv=subdiv, bottom_edge_height=bottom_edge_height)
+    buf = io.BytesIO()
+    MESH_WRITERS[fmt](mesh, buf)
+    return buf.getvalue()
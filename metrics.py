@@ -0,0 +1,288 @@
+# metrics.py
+# 營運指標（Prometheus text exposition format 0.0.4），不依賴 prometheus_client
+# 每個 process 一份 registry（Streamlit 的所有 session 共用）；hot path 只做一次 bisect + 加法（有鎖）
+# 由 start_metrics_server() 在背景 thread 開一個本機 HTTP endpoint：GET /metrics
+#
+# 指標：
+#   led_sphere_stage_seconds{stage}            各階段延遲 histogram（calculate、power map、cabling …）
+#   led_sphere_render_seconds{view,phase}      球面圖 build（make_sphere_fig）/ rasterize（figure_png）
+#   led_sphere_calculations_total{outcome}     ok / rejected（輸入檢查）/ failed（例外）/ timeout（超過預算）
+#   led_sphere_cache_requests_total{cache,result}   hit / miss
+#   led_sphere_cache_hit_ratio{cache}          由上面算出（scrape 時）
+#   lru_cache（catalog）不另外計數，scrape 時直接讀 cache_info()
+# process pool 的 worker 各有一份 registry，不會被 scrape：
+#   worker 端以 capture_observations 執行工作，histogram 的觀測值隨結果傳回，主 process 用 record_observations 記錄
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "led_sphere_"
+_LOCAL = threading.local()
+DEFAULT_PORT = 9464
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# app 內 Calculate 超過這個時間記為 timeout（script thread 無法中斷，只能事後計數）
+CALCULATE_BUDGET_S = float(os.environ.get("LED_SPHERE_CALC_BUDGET_S", "10"))
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for k, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{k}="{v}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _fmt(v):
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    # collect：scrape 時額外呼叫 collect() → [(label values, value), ...]（外部已在計數的來源，例如 lru_cache）
+    def __init__(self, name, doc, labels=(), collect=None):
+        self.name, self.doc, self.labels = PREFIX + name, doc, tuple(labels)
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(k, "") for k in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if self.collect is not None:
+            items.extend(self.collect())
+        return items
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self.samples()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {_fmt(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.labels = PREFIX + name, doc, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}     # key → [counts (len(buckets) + 1), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        captured = getattr(_LOCAL, "captured", None)
+        if captured is not None:
+            captured.append((self.name, value, labels))
+            return
+        key = tuple(labels.get(k, "") for k in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(s[0]), s[1]) for k, s in self._series.items()]
+        names = self.labels + ("le",)
+        for key, counts, total in sorted(items):
+            cum = 0
+            for le, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                lines.append(f"{self.name}_bucket{_label_str(names, key + (_fmt(le),))} {cum}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {cum}")
+        return lines
+
+
+class Gauge:
+    # scrape 時呼叫 fn() → [(label values, value), ...]
+    def __init__(self, name, doc, labels, fn):
+        self.name, self.doc, self.labels, self.fn = PREFIX + name, doc, tuple(labels), fn
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        for key, v in self.fn():
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {_fmt(v)}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Latency of each calculation stage.", ("stage",))
+RENDER_SECONDS = Histogram("render_seconds", "Sphere figure build / rasterize time per view.", ("view", "phase"))
+CALCULATIONS = Counter("calculations_total", "Calculate clicks by outcome.", ("outcome",))
+_LRU_CACHES = {}
+
+
+def register_lru_cache(name, fn):
+    # functools.lru_cache 包裝的函式：scrape 時直接讀 cache_info()
+    _LRU_CACHES[name] = fn
+
+
+def _lru_requests():
+    rows = []
+    for name, fn in list(_LRU_CACHES.items()):
+        info = fn.cache_info()
+        rows.append(((name, "hit"), float(info.hits)))
+        rows.append(((name, "miss"), float(info.misses)))
+    return rows
+
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result.", ("cache", "result"), _lru_requests)
+
+
+def _cache_ratios():
+    out = {}
+    for (cache, result), v in CACHE_REQUESTS.samples():
+        hit, total = out.get(cache, (0.0, 0.0))
+        out[cache] = (hit + (v if result == "hit" else 0.0), total + v)
+    return [((cache,), hit / total) for cache, (hit, total) in sorted(out.items()) if total > 0]
+
+
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Cache hit ratio since process start.", ("cache",), _cache_ratios)
+
+REGISTRY = [STAGE_SECONDS, RENDER_SECONDS, CALCULATIONS, CACHE_REQUESTS, CACHE_HIT_RATIO]
+_HISTOGRAMS = {m.name: m for m in REGISTRY if isinstance(m, Histogram)}
+
+
+def capture_observations(fn, *args):
+    # worker 端：執行 fn，這段期間的 histogram 觀測值不記在 worker，改隨結果回傳 → (result, observations)
+    _LOCAL.captured = []
+    try:
+        return fn(*args), _LOCAL.captured
+    finally:
+        _LOCAL.captured = None
+
+
+def record_observations(observations):
+    # 主 process 端：記錄 worker 傳回的觀測值
+    for name, value, labels in observations:
+        _HISTOGRAMS[name].observe(value, **labels)
+
+
+class timed:
+    # with timed("calculate"): ...   —— 例外也記錄（延遲照算）
+    __slots__ = ("labels", "hist", "t0")
+
+    def __init__(self, stage, hist=STAGE_SECONDS, **labels):
+        self.hist = hist
+        self.labels = dict(labels, stage=stage) if hist is STAGE_SECONDS else labels
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+def timed_render(phase, view_of):
+    # 裝飾 make_sphere_fig / figure_png；view_of(args, kwargs) → view 名稱
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                RENDER_SECONDS.observe(time.perf_counter() - t0, view=view_of(args, kwargs), phase=phase)
+        return wrapper
+    return deco
+
+
+def record_calculation(outcome, seconds=None):
+    # seconds：整個 Calculate（含出圖）的時間；script thread 無法中斷，
+    # 超過 CALCULATE_BUDGET_S 的計算照常完成，但記為 timeout
+    if seconds is not None:
+        STAGE_SECONDS.observe(seconds, stage="calculate_total")
+        if outcome == "ok" and seconds > CALCULATE_BUDGET_S:
+            outcome = "timeout"
+    CALCULATIONS.inc(outcome=outcome)
+
+
+def cache_lookup(cache, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result="miss")
+
+
+# st.cache_data 的命中：外層計次，內層（只有 miss 才會執行）做記號
+#   @cache_lookups("quote_export")
+#   @st.cache_data(...)
+#   @cache_fill
+#   def f(...): ...
+def cache_fill(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _LOCAL.missed = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def cache_lookups(cache):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _LOCAL.missed = False
+            out = fn(*args, **kwargs)
+            cache_lookup(cache, misses=1) if _LOCAL.missed else cache_lookup(cache, hits=1)
+            return out
+        return wrapper
+    return deco
+
+
+def render_text():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None, addr="127.0.0.1"):
+    # 回傳 server（背景 daemon thread）；port 被占用（例如同機多個 app process）回傳 None
+    # port 預設讀 LED_SPHERE_METRICS_PORT，設為 0 / off 則不啟動
+    if port is None:
+        env = os.environ.get("LED_SPHERE_METRICS_PORT", str(DEFAULT_PORT)).strip().lower()
+        if env in ("", "0", "off", "false"):
+            return None
+        port = int(env)
+    try:
+        server = ThreadingHTTPServer((addr, port), _Handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,65 @@
+# module_power.py
+# 每片模組的功耗：calculate 只給整體總和，這裡展開成 (n_vertical_final, n_equator_final) 網格
+# 模組編號：column-major，同一直列由上（北）往下（南），連續 n_module_per_receiver 片接同一 hub
+import numpy as np
+from catalog import led_package_for_pitch, default_part
+
+# 與 calculate 的 total_power = (LED_power + system_power) * 1.2 相同
+POWER_MARGIN = 1.2
+
+
+def module_grid_shape(result):
+    return int(result["n_vertical_final"]), int(result["n_equator_final"])
+
+
+def hub_index(result):
+    # (n_v, n_e) → 每片模組所屬 hub 編號
+    n_v, n_e = module_grid_shape(result)
+    n_per_rx = int(result["n_module_per_receiver"])
+    module_id = np.arange(n_v * n_e).reshape(n_e, n_v).T
+    return module_id // n_per_rx
+
+
+def hub_sum(values, hub):
+    # values / hub 同形狀 → 每個 hub 的加總
+    return np.bincount(hub.ravel(), weights=np.asarray(values, dtype=float).ravel())
+
+
+def module_channel_power(result):
+    # 全白時每片模組 R/G/B 的 LED 功耗 (W)，shape (n_v, 3)；同一列模組相同
+    led = np.asarray(result["n_module_led_counts"], dtype=float)
+    per_led = np.array([result["R_LED_power_W"], result["G_LED_power_W"], result["B_LED_power_W"]])
+    return led[:, None] * per_led[None, :]
+
+
+def module_system_power(result):
+    # 與畫面內容無關的 IC 功耗 (W)，shape (n_v,)；hub 功耗另外以 hub 計
+    pitch = result["pitch_mm"]
+    gb_v = led_package_for_pitch(pitch)["vf_gb"]
+    pwm_ic = default_part("pwm_ic", pitch)
+    scan_ic = default_part("scan_ic", pitch)
+    pwm = np.asarray(result["n_module_pwm_counts"], dtype=float)
+    scan = np.asarray(result["n_module_scan_counts"], dtype=float)
+    return (pwm * pwm_ic["current_A"] + scan * scan_ic["current_A"]) * gb_v
+
+
+def hub_power_w(result):
+    return default_part("hub", result["pitch_mm"])["power_W"]
+
+
+def module_power_map(result):
+    # 全白時每片模組功耗 (W)，shape (n_v, n_e)；hub 功耗加在 hub 加總
+    n_v, n_e = module_grid_shape(result)
+    row_power = module_channel_power(result).sum(axis=1) + module_system_power(result)
+    module_power = np.broadcast_to(row_power[:, None], (n_v, n_e)).copy()
+
+    hub = hub_index(result)
+    hub_power = hub_sum(module_power, hub) + hub_power_w(result)
+
+    return {
+        "row_power_W": row_power,
+        "module_power_W": module_power,
+        "hub_index": hub,
+        "hub_power_W": hub_power,
+        "total_W": float(hub_power.sum()) * POWER_MARGIN,
+    }
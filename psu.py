@@ -0,0 +1,180 @@
+# psu.py
+# PSU 負載分配：每片模組的滿載功耗（LED 數 × 各色電流 × Vf + IC）裝箱到 PSU 上
+# 規則：一台 PSU 只供同一個 hub（PSU 裝在 hub 箱內），hub 本身的功耗也由該 hub 的 PSU 之一供應；
+#       可用功率 = 額定功率 × derating；hub 內以 first-fit decreasing 裝箱
+#
+# 同一列模組功耗相同，hub 依 column-major 連續 n_module_per_receiver 片，
+# 所以 hub 的組成只由 (hub × n) mod n_v 決定，最多 n_v 種 → 只對這些「hub 樣式」裝箱再乘上數量，
+# 模組數再多也是 O(n_v × n)；需要逐片 / 逐台的分配時才展開（psu_assignment）
+# calculate 不做裝箱（fuzz / atlas / room solver / compare 的熱迴圈不必付這個成本），
+# 要用 PSU 數量的地方（app、報價單、工作摘要、比較表）以 with_psu 補上
+import math
+import numpy as np
+import pandas as pd
+from catalog import default_part
+from module_power import module_grid_shape, module_channel_power, module_system_power, hub_power_w
+
+DEFAULT_DERATING = 0.8
+
+
+def hub_patterns(result):
+    # 回傳 (rows, counts, hub_pattern_of)
+    # rows：(P, n) 每種 hub 樣式各位置的模組列號，-1 = 空位（最後一個不滿的 hub）
+    # counts：(P,) 每種樣式的 hub 數；hub_pattern_of(hub_ids) → 樣式編號
+    n_v, n_e = module_grid_shape(result)
+    n = int(result["n_module_per_receiver"])
+    total = n_v * n_e
+    n_full, rest = divmod(total, n)
+    period = n_v // math.gcd(n_v, n)
+
+    n_pat = min(period, n_full)
+    offsets = (np.arange(n_pat) * n) % n_v
+    rows = (offsets[:, None] + np.arange(n)[None, :]) % n_v
+    counts = np.full(n_pat, n_full // period if n_pat == period else 1, dtype=np.int64)
+    if n_pat == period:
+        counts[:n_full % period] += 1
+
+    if rest:
+        last = (n_full * n + np.arange(n)) % n_v
+        rows = np.vstack([rows, np.where(np.arange(n) < rest, last, -1)])
+        counts = np.append(counts, 1)
+
+    def hub_pattern_of(hub_ids):
+        hub_ids = np.asarray(hub_ids)
+        pat = hub_ids % period
+        if rest:
+            pat = np.where(hub_ids == n_full, len(counts) - 1, pat)
+        return pat
+
+    return rows, counts, hub_pattern_of
+
+
+def _pack_ffd(loads, capacity):
+    # loads：(P, m)（0 = 空位），每列獨立做 first-fit decreasing
+    # 回傳 (bin_of (P, m)，-1 = 空位；bin_loads (P, m)；n_bins (P,))
+    # 單件超過容量時自己佔一台（由呼叫端標記超載）
+    P, m = loads.shape
+    order = np.argsort(-loads, axis=1, kind="stable")
+    bins = np.zeros((P, m))
+    used = np.zeros(P, dtype=np.int64)
+    bin_of = np.full((P, m), -1, dtype=np.int64)
+    idx = np.arange(P)
+    slots = np.arange(m)[None, :]
+
+    for k in range(m):
+        col = order[:, k]
+        w = loads[idx, col]
+        fits = (bins + w[:, None] <= capacity) & (slots < used[:, None])
+        has = fits.any(axis=1)
+        target = np.where(has, np.argmax(fits, axis=1), used)
+        real = w > 0
+        bins[idx[real], target[real]] += w[real]
+        bin_of[idx[real], col[real]] = target[real]
+        used = np.where(real & ~has, used + 1, used)
+
+    return bin_of, bins, used
+
+
+def allocate_psus(result, derating=None, psu=None):
+    # 只算 hub 樣式，回傳摘要 + 樣式層級的分配（逐片展開見 psu_assignment）
+    if derating is None:
+        derating = DEFAULT_DERATING
+    if not 0 < derating <= 1:
+        raise ValueError("psu_derating must be in (0, 1]")
+    if psu is None:
+        psu = default_part("psu", result["pitch_mm"])
+    rated = float(psu["rated_power_W"])
+    usable = rated * derating
+
+    row_power = module_channel_power(result).sum(axis=1) + module_system_power(result)
+    rows, counts, hub_pattern_of = hub_patterns(result)
+    loads = np.where(rows >= 0, row_power[np.maximum(rows, 0)], 0.0)
+
+    # hub 本身也當一件（最小，最後放，放進第一台塞得下的）
+    items = np.hstack([loads, np.full((len(loads), 1), hub_power_w(result))])
+    bin_of, bins, n_bins = _pack_ffd(items, usable)
+    bin_of = bin_of[:, :-1]
+    live = np.arange(bins.shape[1])[None, :] < n_bins[:, None]
+
+    total_psu = int((counts * n_bins).sum())
+    total_load = float((counts * bins.sum(axis=1)).sum())
+    max_load = float(bins[live].max())
+    overloaded = int((counts[:, None] * (loads > usable)).sum())
+
+    return {
+        "psu_part_no": psu["part_no"],
+        "rated_W": rated,
+        "derating": float(derating),
+        "usable_W": usable,
+        "total_n_psu": total_psu,
+        "total_load_W": total_load,
+        "mean_utilization": total_load / (total_psu * rated),
+        "max_utilization": max_load / rated,
+        "psu_per_hub_max": int(n_bins.max()),
+        "overloaded_modules": overloaded,
+        # 樣式層級
+        "pattern_rows": rows,
+        "pattern_counts": counts,
+        "pattern_bin_of": bin_of,
+        "pattern_bin_loads": bins,
+        "pattern_n_psu": n_bins,
+        "hub_pattern_of": hub_pattern_of,
+    }
+
+
+def psu_fields(alloc):
+    # allocate_psus 的摘要，欄位名稱與 calculate 的結果相同
+    return {
+        "psu_part_no": alloc["psu_part_no"],
+        "total_n_psu": alloc["total_n_psu"],
+        "psu_mean_utilization": alloc["mean_utilization"],
+        "psu_max_utilization": alloc["max_utilization"],
+        "psu_overloaded_modules": alloc["overloaded_modules"],
+    }
+
+
+def with_psu(result, alloc=None):
+    # 回傳帶 PSU 欄位的結果（新 dict；已有則原樣回傳）；derating 取 calculate 記錄的 psu_derating
+    if "total_n_psu" in result:
+        return result
+    if alloc is None:
+        alloc = allocate_psus(result, derating=result.get("psu_derating"))
+    return dict(result, **psu_fields(alloc))
+
+
+def psu_assignment(result, alloc):
+    # 逐片 / 逐台展開：module_psu (n_v, n_e) 全域 PSU 編號；每台 PSU 的 hub、模組數、負載、使用率
+    n_v, n_e = module_grid_shape(result)
+    n = int(result["n_module_per_receiver"])
+    total = n_v * n_e
+    n_hub = -(-total // n)
+
+    hub_pat = alloc["hub_pattern_of"](np.arange(n_hub))
+    n_psu = alloc["pattern_n_psu"][hub_pat]
+    first_psu = np.concatenate([[0], np.cumsum(n_psu)[:-1]])
+
+    module_id = np.arange(total)
+    hub = module_id // n
+    module_psu = first_psu[hub] + alloc["pattern_bin_of"][hub_pat[hub], module_id % n]
+
+    psu_hub = np.repeat(np.arange(n_hub), n_psu)
+    slot = np.arange(len(psu_hub)) - first_psu[psu_hub]
+    psu_load = alloc["pattern_bin_loads"][hub_pat[psu_hub], slot]
+
+    return {
+        "module_psu": module_psu.reshape(n_e, n_v).T,
+        "psu_hub": psu_hub,
+        "psu_modules": np.bincount(module_psu, minlength=len(psu_hub)),
+        "psu_load_W": psu_load,
+        "psu_utilization": psu_load / alloc["rated_W"],
+    }
+
+
+def psu_table(assignment):
+    return pd.DataFrame({
+        "PSU": np.arange(len(assignment["psu_hub"])),
+        "Hub": assignment["psu_hub"],
+        "Modules": assignment["psu_modules"],
+        "Load (W)": assignment["psu_load_W"].round(1),
+        "Utilization (%)": (assignment["psu_utilization"] * 100).round(1),
+    })
@@ -0,0 +1,373 @@
+# quote.py
+# 報價單匯出（PDF / XLSX）
+# 規格表與 BOM 與 app 畫面共用同一份資料；圖直接用 Calculate 時 render 好的 PNG bytes，不重畫
+# 兩種格式都邊產生邊寫入 file object（PDF 逐 object 寫出、XLSX 用 openpyxl write-only），
+# 批次匯出時一次只有一份報價單在記憶體中
+import io
+import math
+import os
+from catalog import part_options
+from psu import with_psu
+
+# BOM item → catalog.json category
+BOM_CATEGORIES = {
+    "LED": "led",
+    "PWM IC": "pwm_ic",
+    "SCAN IC": "scan_ic",
+    "Module (PCB)": "pcb",
+    "Hub": "hub",
+    "RX": "receiver",
+    "Controller": "controller",
+    "PSU": "psu",
+}
+
+SUPERSTRUCTURE_MSG = "Need external superstructure evaluation"
+
+
+def get_mechanical(diameter: float) -> dict:
+    if diameter < 10000:
+        return {
+            "Mechanical": 600,
+        }
+    else:
+        return {
+            "Mechanical": 0,
+        }
+
+
+def get_part_catalog(pitch_mm: float, diameter: float) -> dict:
+    part_catalog = {
+        item: part_options(category, pitch_mm)
+        for item, category in BOM_CATEGORIES.items()
+    }
+    part_catalog["Mechanical"] = get_mechanical(diameter)
+    return part_catalog
+
+
+def bom_quantities(result: dict) -> dict:
+    return {
+        "LED": int(result["total_n_led_kpcs"]),
+        "PWM IC": int(result["total_n_pwm"]),
+        "SCAN IC": int(result["total_n_scan"]),
+        "Module (PCB)": round(result["display_area"], 1),
+        "Hub": int(result["total_n_hub"]),
+        "RX": int(result["total_n_hub"]),
+        "Controller": int(result["total_n_controller"]),
+        "PSU": int(with_psu(result)["total_n_psu"]),
+        "Mechanical": round(result["display_area"], 1),
+    }
+
+
+def bom_unit(item: str) -> str:
+    # Qty unit rule
+    if item == "LED":
+        return "kpcs"
+    elif item in ("Module (PCB)", "Mechanical"):
+        return "m²"
+    return "pcs"
+
+
+def bom_lines(result: dict, quote_parts: dict, diameter: float) -> list:
+    # 選定料號不在目前 pitch 的選項內 → 用第一個選項
+    part_catalog = get_part_catalog(result["pitch_mm"], diameter)
+    qty_map = bom_quantities(result)
+    lines = []
+    for item, options in part_catalog.items():
+        part_no = quote_parts.get(item)
+        if part_no not in options:
+            part_no = next(iter(options))
+        unit_price = float(options[part_no])
+        lines.append({
+            "item": item,
+            "part_no": part_no,
+            "qty": qty_map[item],
+            "unit": bom_unit(item),
+            "unit_price": unit_price,
+            "total_price": unit_price * qty_map[item],
+        })
+    return lines
+
+
+def spec_rows(param: dict, result: dict) -> list:
+    # (項目, 顯示值) — 與 app 的 Product Specification 表相同
+    if param["diameter"] >= 10000:
+        weight_display = SUPERSTRUCTURE_MSG
+        room_size = SUPERSTRUCTURE_MSG
+    else:
+        weight_display = math.ceil(result["weight"])
+        room_size = (
+            f'{math.ceil(result["room_size_w"])} × {math.ceil(result["room_size_l"])} × '
+            f'{math.ceil(result["room_size_h"])}'
+        )
+
+    deg = "°"
+    rows = [
+        ("Sphere Diameter (m)", round(param["diameter"] / 1000, 2)),
+        ("Display area (m2)", round(result["display_area"], 2)),
+        ("Pixel Pitch (mm)", round(result["pitch_mm"], 3)),
+        ("Resolution (H*V)", f'{int(param["resolution_h"])} × {int(result["resolution_v_final"])}'),
+        ("Sphere FOV (H*V)",
+         f'{round(param["fov_h"], 2)}{deg} × {round(result["fov_v_n_final"], 2) + round(result["fov_v_s_final"], 2)}{deg}'),
+        ("Module Types", int(result["n_vertical_final"])),
+        ("Maximum Module Size (mm)", f'{result["width_per_module_mm"]:.2f} x {result["height_per_module_mm"]:.2f}'),
+        ("Module Qty", int(result["total_n_module"])),
+        ("Hub Qty (with RX)", int(result["total_n_hub"])),
+        ("PSU Qty", int(with_psu(result)["total_n_psu"])),
+        ("4K controller Qty", int(result["total_n_controller"])),
+        ("Brightness (nits)", round(param["luminance"], 1)),
+        ("Total Power (kW)", round(result["total_power_W"], 2)),
+        ("Weight (kg)", weight_display),
+        ("Room size_W * L * H (mm)", room_size),
+    ]
+    return [(label, str(value)) for label, value in rows]
+
+
+def build_quote(document_no, param, result, quote_parts=None, figures=(), title="LED Sphere Quotation"):
+    # quote_parts 為 None → 不含 BOM（Visitor 模式）
+    # figures：PNG bytes 的 list（Calculate 時 render 好的）
+    bom = bom_lines(result, quote_parts, param["diameter"]) if quote_parts is not None else []
+    return {
+        "title": title,
+        "document_no": document_no,
+        "spec": spec_rows(param, result),
+        "bom": bom,
+        "bom_total": sum(line["total_price"] for line in bom),
+        "figures": [png for png in figures if png is not None],
+    }
+
+
+# =============================
+# PDF（手寫最小 PDF 1.4：Helvetica + JPEG 圖，不需額外套件）
+# =============================
+PAGE_W, PAGE_H = 595, 842  # A4 (pt)
+MARGIN = 50
+
+
+class PdfStreamWriter:
+    # 每個 object 寫完就落地，只記錄 byte offset；page tree / xref 最後寫
+    def __init__(self, fh):
+        self.fh = fh
+        self.pos = 0
+        self.offsets = {}
+        self.next_id = 3  # 1 = Catalog, 2 = Pages（close 時寫）
+        self.page_ids = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.fonts = {
+            "F1": self._obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"),
+            "F2": self._obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"),
+        }
+
+    def _write(self, data):
+        self.fh.write(data)
+        self.pos += len(data)
+
+    def _obj(self, body, obj_id=None, stream=None):
+        if obj_id is None:
+            obj_id = self.next_id
+            self.next_id += 1
+        self.offsets[obj_id] = self.pos
+        self._write(f"{obj_id} 0 obj\n".encode("ascii") + body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+        return obj_id
+
+    def add_jpeg(self, jpeg, width_px, height_px):
+        head = (
+            f"<< /Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+        ).encode("ascii")
+        return self._obj(head, stream=jpeg)
+
+    def add_page(self, content, images=None):
+        content_id = self._obj(f"<< /Length {len(content)} >>".encode("ascii"), stream=content)
+        fonts = " ".join(f"/{name} {oid} 0 R" for name, oid in self.fonts.items())
+        xobjects = ""
+        if images:
+            xobjects = " /XObject << " + " ".join(f"/{name} {oid} 0 R" for name, oid in images.items()) + " >>"
+        page = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W} {PAGE_H}] "
+            f"/Resources << /Font << {fonts} >>{xobjects} >> /Contents {content_id} 0 R >>"
+        ).encode("ascii")
+        self.page_ids.append(self._obj(page))
+
+    def close(self):
+        kids = " ".join(f"{oid} 0 R" for oid in self.page_ids)
+        self._obj(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode("ascii"), obj_id=2)
+        self._obj(b"<< /Type /Catalog /Pages 2 0 R >>", obj_id=1)
+
+        xref_pos = self.pos
+        size = max(self.offsets) + 1
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for oid in range(1, size):
+            if oid in self.offsets:
+                lines.append(f"{self.offsets[oid]:010d} 00000 n \n")
+            else:
+                lines.append("0000000000 65535 f \n")
+        lines.append(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n")
+        self._write("".join(lines).encode("ascii"))
+
+
+def _pdf_text(x, y, text, size=10, bold=False):
+    raw = str(text).encode("cp1252", errors="replace")
+    raw = raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    font = b"F2" if bold else b"F1"
+    return b"BT /" + font + f" {size} Tf {x:.1f} {y:.1f} Td (".encode("ascii") + raw + b") Tj ET\n"
+
+
+class _PdfPages:
+    # 文字版面：由上往下排，超出頁面自動換頁
+    def __init__(self, writer, header):
+        self.writer = writer
+        self.header = header
+        self.ops = []
+        self.y = None
+
+    def _start(self):
+        self.ops = [_pdf_text(MARGIN, PAGE_H - MARGIN, self.header, size=9)]
+        self.y = PAGE_H - MARGIN - 24
+
+    def flush(self):
+        if self.ops:
+            self.writer.add_page(b"".join(self.ops))
+        self.ops = []
+        self.y = None
+
+    def line(self, cells, size=10, bold=False, height=16):
+        # cells：[(x, text), ...]
+        if self.y is None or self.y - height < MARGIN:
+            self.flush()
+            self._start()
+        for x, text in cells:
+            self.ops.append(_pdf_text(x, self.y, text, size=size, bold=bold))
+        self.y -= height
+
+    def gap(self, height=10):
+        if self.y is not None:
+            self.y -= height
+
+
+def _png_to_jpeg(png, quality=90):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as im:
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        else:
+            im = im.convert("RGB")
+        buf = io.BytesIO()
+        im.save(buf, format="JPEG", quality=quality)
+        return buf.getvalue(), im.size
+
+
+def write_quote_pdf(quote, fh):
+    writer = PdfStreamWriter(fh)
+    pages = _PdfPages(writer, f'{quote["title"]}    Document No. {quote["document_no"]}')
+
+    pages.line([(MARGIN, quote["title"])], size=18, bold=True, height=28)
+    pages.line([(MARGIN, "Product Specification")], size=13, bold=True, height=22)
+    for label, value in quote["spec"]:
+        pages.line([(MARGIN, label), (MARGIN + 210, value)])
+
+    if quote["bom"]:
+        pages.gap(14)
+        pages.line([(MARGIN, "Key Component List")], size=13, bold=True, height=22)
+        cols = (MARGIN, MARGIN + 95, MARGIN + 230, MARGIN + 330, MARGIN + 410)
+        pages.line(list(zip(cols, ("Item", "Part No.", "Qty", "Unit price (USD)", "Total price (USD)"))), size=9, bold=True)
+        for line in quote["bom"]:
+            pages.line(list(zip(cols, (
+                line["item"],
+                line["part_no"],
+                f'{line["qty"]:,} {line["unit"]}',
+                f'{line["unit_price"]:,.2f}',
+                f'{line["total_price"]:,.2f}',
+            ))), size=9)
+        pages.gap(6)
+        pages.line([(MARGIN, "Reference Key Component Cost (USD)"), (cols[4], f'{quote["bom_total"]:,.2f}')], bold=True)
+    pages.flush()
+
+    # 圖：每頁兩張，依比例縮進半頁框內
+    box_w = PAGE_W - 2 * MARGIN
+    box_h = (PAGE_H - 2 * MARGIN - 20) / 2
+    figures = quote["figures"]
+    for start in range(0, len(figures), 2):
+        ops = [_pdf_text(MARGIN, PAGE_H - MARGIN, pages.header, size=9)]
+        images = {}
+        for slot, png in enumerate(figures[start:start + 2]):
+            jpeg, (w_px, h_px) = _png_to_jpeg(png)
+            name = f"Im{slot}"
+            images[name] = writer.add_jpeg(jpeg, w_px, h_px)
+            scale = min(box_w / w_px, box_h / h_px)
+            w, h = w_px * scale, h_px * scale
+            x = MARGIN + (box_w - w) / 2
+            y = PAGE_H - MARGIN - 20 - (slot + 1) * box_h + (box_h - h) / 2
+            ops.append(f"q {w:.2f} 0 0 {h:.2f} {x:.2f} {y:.2f} cm /{name} Do Q\n".encode("ascii"))
+        writer.add_page(b"".join(ops), images)
+
+    writer.close()
+
+
+# =============================
+# XLSX（openpyxl write-only：逐列寫出，不在記憶體保留整張表）
+# =============================
+def write_quote_xlsx(quote, fh, figure_width_px=640):
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image
+
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Specification")
+    ws.column_dimensions["A"].width = 30
+    ws.column_dimensions["B"].width = 40
+    ws.append([quote["title"]])
+    ws.append(["Document No.", quote["document_no"]])
+    ws.append([])
+    ws.append(["Product", "Dome Display"])
+    for label, value in quote["spec"]:
+        ws.append([label, value])
+
+    if quote["bom"]:
+        ws = wb.create_sheet("BOM")
+        for col, width in zip("ABCDEF", (16, 22, 12, 8, 18, 18)):
+            ws.column_dimensions[col].width = width
+        ws.append(["Item", "Part No.", "Qty", "Unit", "Unit price (USD)", "Total price (USD)"])
+        for line in quote["bom"]:
+            ws.append([line["item"], line["part_no"], line["qty"], line["unit"], line["unit_price"], line["total_price"]])
+        ws.append([])
+        ws.append(["Reference Key Component Cost (USD)", None, None, None, None, quote["bom_total"]])
+
+    if quote["figures"]:
+        ws = wb.create_sheet("Figures")
+        row = 1
+        for png in quote["figures"]:
+            img = Image(io.BytesIO(png))
+            scale = figure_width_px / img.width
+            img.width = figure_width_px
+            img.height = int(img.height * scale)
+            img.anchor = f"A{row}"
+            ws.add_image(img)
+            row += math.ceil(img.height / 20) + 2
+
+    wb.save(fh)
+
+
+EXPORTERS = {
+    "pdf": write_quote_pdf,
+    "xlsx": write_quote_xlsx,
+}
+
+
+def export_quotes(quotes, out_dir, formats=("pdf", "xlsx")):
+    # quotes 可為 generator：逐份產生、寫檔、釋放；yield 寫出的檔案路徑
+    os.makedirs(out_dir, exist_ok=True)
+    for quote in quotes:
+        for fmt in formats:
+            path = os.path.join(out_dir, f'{quote["document_no"]}.{fmt}')
+            with open(path, "wb") as f:
+                EXPORTERS[fmt](quote, f)
+            yield path
@@ -0,0 +1,184 @@
+# room_solver.py
+# 反向求解：給定房間 W/L/H，找出放得下的最大球幕（diameter × FOV 的 Pareto 集合）
+import math
+import numpy as np
+from calculator import calculate, room_size, min_n_equator
+
+
+DEFAULT_FOV_H_OPTIONS = (180.0, 210.0, 240.0, 270.0, 300.0, 330.0, 360.0)
+DEFAULT_FOV_V_OPTIONS = (60.0, 75.0, 90.0, 101.25, 120.0, 135.0, 150.0, 165.0, 180.0)
+
+
+def resolution_for_pitch(diameter, fov_h, pitch, param):
+    # 由目標 pitch 反推 resolution_h：取 calculate 會用的 n_equator，使每片模組像素數為整數
+    arc_h = math.pi * diameter * (fov_h / 360)
+    arc_length_limit = diameter * math.pi / (360 / param["module_angle_limit"])
+    module_width_limit = min(param["module_size_limit"], arc_length_limit)
+    n_equator = min_n_equator(arc_h, module_width_limit)
+    px_per_module_h = max(1, round(arc_h / n_equator / pitch))
+    return n_equator * px_per_module_h
+
+
+def _evaluate(diameter, fov_h, fov_v_n, fov_v_s, base_param, resolution_h, pitch):
+    p = dict(base_param)
+    p["diameter"] = float(diameter)
+    p["fov_h"] = float(fov_h)
+    p["fov_v_n"] = float(fov_v_n)
+    p["fov_v_s"] = float(fov_v_s)
+    if pitch is not None:
+        p["resolution_h"] = resolution_for_pitch(p["diameter"], p["fov_h"], pitch, p)
+    else:
+        p["resolution_h"] = int(resolution_h)
+
+    try:
+        return p, calculate(p)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return p, None
+
+
+def _probe(d, lo, hi, fov_h, fov_v_n, fov_v_s, base_param, resolution_h, pitch, steps=8):
+    # calculate 失敗（例如這個直徑沒有整除 resolution_h 的 n_equator）與房間大小無關，不能當成「放不下」：
+    # 改試 (lo, hi) 內鄰近的直徑（間隔 (hi - lo) / 16，由近到遠、兩側交替），回傳第一個可計算的 (d, result)
+    _, r = _evaluate(d, fov_h, fov_v_n, fov_v_s, base_param, resolution_h, pitch)
+    if r is not None:
+        return d, r
+    step = (hi - lo) / (2 * steps)
+    for k in range(1, steps + 1):
+        for cand in (d - k * step, d + k * step):
+            if lo < cand < hi:
+                _, r = _evaluate(cand, fov_h, fov_v_n, fov_v_s, base_param, resolution_h, pitch)
+                if r is not None:
+                    return cand, r
+    return d, None
+
+
+def _fits(result, room_w, room_l, room_h):
+    return (
+        result is not None
+        and result["room_size_w"] <= room_w
+        and result["room_size_l"] <= room_l
+        and result["room_size_h"] <= room_h
+    )
+
+
+def pareto_mask(objectives):
+    # objectives: (N, K)，全部越大越好；回傳非被支配點的 mask
+    m = np.asarray(objectives, dtype=float)
+    if len(m) == 0:
+        return np.zeros(0, dtype=bool)
+    ge = np.all(m[:, None, :] >= m[None, :, :], axis=2)
+    gt = np.any(m[:, None, :] > m[None, :, :], axis=2)
+    dominated = np.any(ge & gt, axis=0)
+    return ~dominated
+
+
+def solve_room(
+    room_w, room_l, room_h, bottom_edge_height, base_param,
+    resolution_h=None, pitch=None,
+    fov_h_options=DEFAULT_FOV_H_OPTIONS,
+    fov_v_options=DEFAULT_FOV_V_OPTIONS,
+    tol_mm=1.0,
+    max_iter=40,
+):
+    if (resolution_h is None) == (pitch is None):
+        raise ValueError("Give exactly one of resolution_h or pitch")
+
+    base_param = dict(base_param)
+    base_param["bottom_edge_height"] = float(bottom_edge_height)
+
+    # 南北 FOV 比例沿用 base_param
+    fov_v_n0 = float(base_param["fov_v_n"])
+    fov_v_s0 = float(base_param["fov_v_s"])
+    ratio_n = fov_v_n0 / (fov_v_n0 + fov_v_s0) if (fov_v_n0 + fov_v_s0) > 0 else 0.5
+
+    # =============================
+    # 候選 (fov_h, fov_v) 網格
+    # =============================
+    fh, fv = np.meshgrid(
+        np.asarray(fov_h_options, dtype=float),
+        np.asarray(fov_v_options, dtype=float),
+        indexing="ij",
+    )
+    fh = fh.ravel()
+    fv = fv.ravel()
+    fvn = fv * ratio_n
+    fvs = fv - fvn
+    valid = (fh > 0) & (fh <= 360) & (fvn <= 90) & (fvs <= 90)
+    fh, fvn, fvs = fh[valid], fvn[valid], fvs[valid]
+
+    # =============================
+    # 向量化上界：room_size 對 diameter 為線性 → 一次算出所有候選的解析最大直徑
+    # =============================
+    room = np.array([room_w, room_l, room_h], dtype=float)[:, None]
+    base = np.array(room_size(0.0, fh, fvn, fvs, bottom_edge_height))
+    slope = np.array(room_size(1.0, fh, fvn, fvs, bottom_edge_height)) - base
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bound = np.where(slope > 0, (room - base) / slope, np.inf)
+    d_upper = np.min(bound, axis=0)
+
+    keep = np.isfinite(d_upper) & (d_upper > tol_mm)
+    fh, fvn, fvs, d_upper = fh[keep], fvn[keep], fvs[keep], d_upper[keep]
+
+    # =============================
+    # 逐一候選二分法：calculate 的量化（fov_v_final、解析度）會讓真實房間尺寸偏離解析值
+    # 上界放寬 10%，以真實 calculate 結果判斷是否放得下；calculate 是純量函式，每步每個候選各呼叫一次
+    # （只有上面的上界是向量化的）
+    # =============================
+    lo = np.zeros_like(d_upper)
+    hi = d_upper * 1.1
+    stuck = np.zeros(len(lo), dtype=bool)
+    for _ in range(max_iter):
+        active = ((hi - lo) > tol_mm) & ~stuck
+        if not np.any(active):
+            break
+        mid = (lo + hi) / 2
+        for i in np.flatnonzero(active):
+            d, r = _probe(mid[i], lo[i], hi[i], fh[i], fvn[i], fvs[i], base_param, resolution_h, pitch)
+            if r is None:
+                # 區間內找不到可計算的直徑：無法再判斷，保留目前的 lo（已確認放得下）
+                stuck[i] = True
+            elif _fits(r, room_w, room_l, room_h):
+                lo[i] = d
+            else:
+                hi[i] = d
+
+    # =============================
+    # 收集可行解 + Pareto（diameter / fov_h / fov_v 越大越好）
+    # =============================
+    candidates = []
+    for i in range(len(lo)):
+        d = math.floor(lo[i] / tol_mm) * tol_mm
+        if d <= 0:
+            continue
+        p, r = _evaluate(d, fh[i], fvn[i], fvs[i], base_param, resolution_h, pitch)
+        if not _fits(r, room_w, room_l, room_h):
+            # 取整後的直徑可能剛好無法計算；lo 本身一定放得下
+            d = float(lo[i])
+            p, r = _evaluate(d, fh[i], fvn[i], fvs[i], base_param, resolution_h, pitch)
+            if not _fits(r, room_w, room_l, room_h):
+                continue
+        candidates.append({
+            "diameter": d,
+            "fov_h": float(fh[i]),
+            "fov_v_n": float(fvn[i]),
+            "fov_v_s": float(fvs[i]),
+            "fov_v_final": r["fov_v_n_final"] + r["fov_v_s_final"],
+            "resolution_h": int(p["resolution_h"]),
+            "resolution_v_final": r["resolution_v_final"],
+            "pitch_mm": r["pitch_mm"],
+            "room_size_w": r["room_size_w"],
+            "room_size_l": r["room_size_l"],
+            "room_size_h": r["room_size_h"],
+            "total_power_W": r["total_power_W"],
+            "param": p,
+        })
+
+    objectives = [[c["diameter"], c["fov_h"], c["fov_v_final"]] for c in candidates]
+    mask = pareto_mask(objectives)
+    pareto = [c for c, m in zip(candidates, mask) if m]
+    pareto.sort(key=lambda c: (-c["diameter"], -c["fov_h"], -c["fov_v_final"]))
+
+    return {
+        "candidates": candidates,
+        "pareto": pareto,
+    }
@@ -0,0 +1,175 @@
+# sightlines.py
+# 觀眾視線分析：每個座位（眼睛位置）× 每片模組的視角與距離
+# 視角 = 模組法線與「模組 → 眼睛」的夾角；超過 LED 半視角（catalog 的 viewing_angle_deg / 2）亮度與色偏明顯
+# 座標與 mesh_export 相同：球心在 x = y = 0，地板 z = 0，最低點 = bottom_edge_height，單位 mm
+#
+# 模組中心 m = c + R·n（n 為單位法線），所以
+#   (s - m)·n = s·n - (c·n + R)，|s - m|² = |s|² + |m|² - 2 s·m
+# 兩項都是「座位 × 模組」的矩陣乘法（BLAS），不必展開 (座位, 模組, 3) 的差向量；
+# 座位分塊計算，每塊的暫存陣列不超過 chunk_bytes
+# 球面是凸 / 凹的單一曲面，面向眼睛的模組不會被球面本身擋住，所以只判斷是否面向
+import numpy as np
+import pandas as pd
+from catalog import led_package_for_pitch
+from cabling import module_centers
+
+DEFAULT_EYE_HEIGHT = 1200.0
+DEFAULT_SEAT_SPACING = 1000.0
+DEFAULT_CLEARANCE = 500.0
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def sphere_center_z(result, bottom_edge_height=0.0):
+    R = float(result["diameter_mm"]) / 2
+    return float(bottom_edge_height) + R * np.sin(np.deg2rad(float(result["fov_v_s_final"])))
+
+
+def module_frame(result, bottom_edge_height=0.0, inward=True):
+    # 回傳 (centers (M, 3), normals (M, 3), center (3,), R)；M = n_v × n_e（row-major，row 0 在最北）
+    # inward=True：觀眾在球內（dome），法線朝球心
+    R = float(result["diameter_mm"]) / 2
+    lon, lat = (np.deg2rad(v).ravel() for v in module_centers(result))
+    n = np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+    center = np.array([0.0, 0.0, sphere_center_z(result, bottom_edge_height)])
+    centers = center + R * n
+    return centers, (-n if inward else n), center, R
+
+
+def seat_grid(result, bottom_edge_height=0.0, spacing=DEFAULT_SEAT_SPACING, eye_height=DEFAULT_EYE_HEIGHT,
+              clearance=DEFAULT_CLEARANCE, inward=True):
+    # 房間地板上的方格座位（眼睛高度 eye_height），格點對齊球的中心軸
+    # inward：只留球內、離球面至少 clearance 的位置；否則只留球外、離球面至少 clearance 的位置
+    w, l = float(result["room_size_w"]), float(result["room_size_l"])
+    xs = np.arange(-(l / 2 // spacing), l / 2 // spacing + 1) * spacing
+    ys = np.arange(-(w / 2 // spacing), w / 2 // spacing + 1) * spacing
+    x, y = (v.ravel() for v in np.meshgrid(xs, ys, indexing="ij"))
+    seats = np.stack([x, y, np.full_like(x, float(eye_height))], axis=1)
+
+    R = float(result["diameter_mm"]) / 2
+    r = np.linalg.norm(seats - [0.0, 0.0, sphere_center_z(result, bottom_edge_height)], axis=1)
+    keep = r <= R - clearance if inward else r >= R + clearance
+    return seats[keep]
+
+
+def load_seats(fh):
+    # CSV：x, y, z（mm，可有表頭），每列一個眼睛位置
+    df = pd.read_csv(fh)
+    if not {"x", "y", "z"} <= set(df.columns.str.lower()):
+        fh.seek(0)
+        df = pd.read_csv(fh, header=None, names=["x", "y", "z"])
+    df.columns = df.columns.str.lower()
+    seats = df[["x", "y", "z"]].to_numpy(dtype=float)
+    if not np.isfinite(seats).all():
+        raise ValueError("Seat file contains non-numeric or missing coordinates")
+    return seats
+
+
+def analyze_sightlines(result, seats, bottom_edge_height=0.0, inward=True, max_angle_deg=None,
+                       chunk_bytes=CHUNK_BYTES):
+    # 回傳：
+    #   模組（(n_v, n_e)）：最差（最大）視角、最近 / 最遠距離、看得到的座位數、視角在上限內的座位數
+    #     —— 沒有任何座位看得到的模組為 NaN
+    #   座位（(S,)）：面向的模組比例、視角在上限內的模組比例（coverage）、平均視角、最近距離
+    seats = np.asarray(seats, dtype=float).reshape(-1, 3)
+    n_v, n_e = int(result["n_vertical_final"]), int(result["n_equator_final"])
+    if max_angle_deg is None:
+        max_angle_deg = led_package_for_pitch(result["pitch_mm"]).get("viewing_angle_deg", 140) / 2
+    cos_limit = np.cos(np.deg2rad(max_angle_deg))
+
+    centers, normals, center, R = module_frame(result, bottom_edge_height, inward)
+    M = len(centers)
+    offset = np.einsum("ij,ij->i", centers, normals)
+    m2 = np.einsum("ij,ij->i", centers, centers)
+
+    # 每塊最多同時 3 個 (C, M) float64（cos、dist、angle）+ 幾個 bool 遮罩 → 以 4 個估算
+    # 運算盡量 in-place / reduction 用 where=，不另外產生 np.where 暫存
+    chunk = int(max(1, chunk_bytes // (M * 8 * 4)))
+    S = len(seats)
+
+    mod_min_cos = np.full(M, np.inf)    # 最差視角 = 最小 cos（只算面向的座位）
+    mod_min_dist = np.full(M, np.inf)
+    mod_max_dist = np.full(M, -np.inf)
+    mod_seen = np.zeros(M, dtype=np.int64)
+    mod_ok = np.zeros(M, dtype=np.int64)
+    seat_facing = np.empty(S)
+    seat_cover = np.empty(S)
+    seat_mean_angle = np.full(S, np.nan)
+    seat_min_dist = np.full(S, np.nan)
+
+    for start in range(0, S, chunk):
+        s = seats[start:start + chunk]
+        cos = s @ normals.T
+        cos -= offset
+        dist = s @ centers.T
+        dist *= -2.0
+        dist += np.einsum("ij,ij->i", s, s)[:, None]
+        dist += m2
+        np.maximum(dist, 0.0, out=dist)
+        np.sqrt(dist, out=dist)
+        # 座位剛好在模組中心（dist = 0）→ cos = 0（不算面向）
+        np.divide(cos, dist, out=cos, where=dist > 0)
+        cos[dist <= 0] = 0.0
+        facing = cos > 0
+        ok = cos >= cos_limit
+
+        np.minimum(mod_min_cos, cos.min(axis=0, where=facing, initial=np.inf), out=mod_min_cos)
+        np.minimum(mod_min_dist, dist.min(axis=0, where=facing, initial=np.inf), out=mod_min_dist)
+        np.maximum(mod_max_dist, dist.max(axis=0, where=facing, initial=-np.inf), out=mod_max_dist)
+        mod_seen += facing.sum(axis=0)
+        mod_ok += ok.sum(axis=0)
+
+        n_facing = facing.sum(axis=1)
+        sl = slice(start, start + len(s))
+        seat_facing[sl] = n_facing / M
+        seat_cover[sl] = ok.sum(axis=1) / M
+        angle = np.clip(cos, -1.0, 1.0)
+        np.arccos(angle, out=angle)
+        np.degrees(angle, out=angle)
+        with np.errstate(invalid="ignore"):
+            seat_mean_angle[sl] = angle.sum(axis=1, where=facing) / np.where(n_facing > 0, n_facing, np.nan)
+        seat_min_dist[sl] = np.where(n_facing > 0, dist.min(axis=1, where=facing, initial=np.inf), np.nan)
+
+    seen = mod_seen > 0
+    worst = np.where(seen, np.degrees(np.arccos(np.clip(np.where(seen, mod_min_cos, 1.0), -1.0, 1.0))), np.nan)
+
+    def grid(v):
+        return v.reshape(n_v, n_e)
+
+    return {
+        "n_seats": S,
+        "n_modules": M,
+        "inward": bool(inward),
+        "max_angle_deg": float(max_angle_deg),
+        "chunk_seats": chunk,
+        # 模組
+        "module_worst_angle_deg": grid(worst),
+        "module_min_distance_mm": grid(np.where(seen, mod_min_dist, np.nan)),
+        "module_max_distance_mm": grid(np.where(seen, mod_max_dist, np.nan)),
+        "module_seats_facing": grid(mod_seen),
+        "module_seats_within_limit": grid(mod_ok),
+        # 座位
+        "seats": seats,
+        "seat_facing_ratio": seat_facing,
+        "seat_coverage": seat_cover,
+        "seat_mean_angle_deg": seat_mean_angle,
+        "seat_min_distance_mm": seat_min_dist,
+        # 摘要
+        "worst_angle_deg": float(np.nanmax(worst)) if seen.any() else float("nan"),
+        "modules_unseen": int((~seen).sum()),
+        "modules_over_limit": int((seen & (mod_ok < mod_seen)).sum()),
+        "mean_coverage": float(seat_cover.mean()) if S else float("nan"),
+    }
+
+
+def seat_table(sightlines):
+    seats = sightlines["seats"]
+    return pd.DataFrame({
+        "Seat": np.arange(len(seats)),
+        "X (mm)": seats[:, 0].round(0),
+        "Y (mm)": seats[:, 1].round(0),
+        "Z (mm)": seats[:, 2].round(0),
+        "Facing Modules (%)": (sightlines["seat_facing_ratio"] * 100).round(1),
+        "Coverage (%)": (sightlines["seat_coverage"] * 100).round(1),
+        "Mean Angle (deg)": sightlines["seat_mean_angle_deg"].round(1),
+        "Nearest Module (mm)": sightlines["seat_min_distance_mm"].round(0),
+    })
@@ -0,0 +1,45 @@
+# tests/conftest.py
+# 模組都在 repo 根目錄（沒有 package）→ 讓 tests 可直接 import
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from calculator import ENGINEERING_DEFAULTS  # noqa: E402
+
+
+@pytest.fixture
+def param():
+    # 與 app 預設輸入相同的設計
+    return dict(
+        ENGINEERING_DEFAULTS,
+        diameter=3000.0, fov_h=180.0, fov_v_n=67.5, fov_v_s=33.75, resolution_h=3840,
+        luminance=800.0, frame_rate=60, bottom_edge_height=500.0, led_count_mode="average",
+    )
+
+
+@pytest.fixture
+def result(param):
+    from calculator import calculate
+
+    return calculate(param)
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", help="also run tests marked slow (multi-process AppTest runs)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes tens of seconds; skipped unless --runslow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    skip = pytest.mark.skip(reason="slow; run with --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,67 @@
+import io
+import os
+import numpy as np
+import pytest
+import animation
+import compare
+from PIL import Image
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    yield compare.get_pool(2)
+    compare.shutdown_pool()
+
+
+def test_orbit_views():
+    views = animation.orbit_views(8, elev=20.0, azim_start=0.0, turns=0.5, elev_swing=10.0, zoom=(1.0, 2.0))
+    assert len(views) == 8
+    elevs, azims, zooms = np.array(views).T
+    assert np.allclose(azims, np.arange(8) * 180.0 / 8)
+    assert elevs[0] == pytest.approx(20.0) and elevs[2] == pytest.approx(30.0)
+    assert zooms[0] == 1.0 and zooms[-1] == 2.0
+    # 整圈轉台最後一格不重複第一格
+    assert animation.orbit_views(4)[-1][1] == pytest.approx(-145.0 + 270.0)
+
+
+def test_sphere_fig_kwargs(param, result):
+    kwargs = animation.sphere_fig_kwargs(param, result)
+    assert kwargs["n_vertical_final"] == result["n_vertical_final"]
+    assert kwargs["room_w"] == result["room_size_w"]
+    bare = animation.sphere_fig_kwargs(param, result, show_room_box=False, show_room_dims=True)
+    assert "room_w" not in bare and bare["show_room_dims"] is False
+
+
+def test_output_format():
+    assert animation._output_format("out/frames", None) == "png"
+    assert animation._output_format("spin.GIF", None) == "gif"
+    assert animation._output_format(io.BytesIO(), ".MP4") == "mp4"
+    with pytest.raises(ValueError):
+        animation._output_format(io.BytesIO(), None)
+
+
+def test_render_chunk_follows_the_camera(param, result):
+    kwargs = animation.sphere_fig_kwargs(param, result, show_room_box=False)
+    views = [(25.0, -145.0, 1.0), (25.0, -55.0, 1.0), (25.0, -145.0, 1.0)]
+    frames = animation._render_chunk((kwargs, "", views, 96, 48, "rgb"))
+    assert [f.shape for f in frames] == [(96, 96, 3)] * 3
+    assert np.array_equal(frames[0], frames[2])
+    assert not np.array_equal(frames[0], frames[1])
+
+
+def test_render_gif(param, result):
+    buf = io.BytesIO()
+    done = []
+    animation.render_orbit(param, result, buf, n_frames=5, fps=10, fmt="gif", size_px=80, dpi=40,
+                           chunk_frames=2, progress=lambda d, n: done.append((d, n)))
+    im = Image.open(io.BytesIO(buf.getvalue()))
+    assert im.format == "GIF" and im.size == (80, 80)
+    assert im.n_frames == 5
+    assert im.info["duration"] == 100 and im.info["loop"] == 0
+    assert done == [(2, 5), (4, 5), (5, 5)]
+
+
+def test_render_png_sequence(param, result, tmp_path):
+    paths = animation.render_orbit(param, result, str(tmp_path / "frames"), n_frames=3, size_px=64, dpi=32)
+    assert [os.path.basename(p) for p in paths] == ["frame_00000.png", "frame_00001.png", "frame_00002.png"]
+    assert all(Image.open(p).size == (64, 64) for p in paths)
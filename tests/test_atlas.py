@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import atlas
+from calculator import calculate
+
+AXES = {
+    "diameter": [2000.0, 3000.0, 4000.0],
+    "fov_h": [180.0],
+    "fov_v_n": [67.5],
+    "fov_v_s": [33.75],
+    "resolution_h": [3840.0],
+    "frame_rate": [60.0],
+}
+
+
+@pytest.fixture
+def prefix(tmp_path):
+    prefix = str(tmp_path / "atlas")
+    atlas.build_atlas(atlas.default_base_param(), prefix=prefix, axes=AXES)
+    return prefix
+
+
+def _design(**changes):
+    param = dict(atlas.default_base_param(), diameter=3000.0, fov_h=180.0, fov_v_n=67.5, fov_v_s=33.75,
+                 resolution_h=3840, frame_rate=60, bottom_edge_height=500.0)
+    return dict(param, **changes)
+
+
+def test_grid_point_matches_calculate(prefix):
+    a = atlas.load_atlas(prefix, atlas.default_base_param())
+    param = _design(luminance=1200.0)
+    est = atlas.lookup(a, param)
+    r = calculate(param)
+    assert est["exact"]
+    for field in ("pitch_mm", "total_n_module", "room_size_w", "room_size_h", "total_power_W"):
+        assert est[field] == pytest.approx(r[field], rel=1e-5), field
+
+
+def test_off_grid_uses_nearest_point(prefix):
+    est = atlas.lookup(atlas.load_atlas(prefix), _design(diameter=3100.0))
+    assert not est["exact"] and est["grid_param"]["diameter"] == 3000.0
+
+
+def test_stale_atlas_is_not_loaded(prefix, monkeypatch):
+    assert atlas.load_atlas(prefix) is not None
+    # 建置參數不同
+    assert atlas.load_atlas(prefix, dict(atlas.default_base_param(), gray_bits=14)) is None
+    # 計算程式 / catalog 改了
+    monkeypatch.setattr(atlas, "model_fingerprint", lambda: "0" * 40)
+    assert atlas.load_atlas(prefix) is None
+
+
+def test_lookup_refuses_other_engineering_settings(prefix):
+    a = atlas.load_atlas(prefix)
+    assert atlas.lookup(a, _design(gray_bits=14)) is None
+    assert atlas.lookup(a, _design(led_count_mode="exact")) is None
+    assert atlas.lookup(None, _design()) is None
+
+
+def test_build_leaves_no_temporary_files(prefix, tmp_path):
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["atlas.json", "atlas.npy"]
+    assert np.load(prefix + ".npy")["ok"].all()
+
+
+def test_exact_hit_is_only_a_summary(prefix):
+    # 完全命中也只有摘要欄位：Calculate 之後的各區塊要 calculate 的完整結果
+    est = atlas.lookup(atlas.load_atlas(prefix), _design())
+    r = calculate(_design())
+    assert est["exact"]
+    assert set(est) - {"exact", "grid_param"} < set(r)
+    assert {"n_module_led_counts", "n_module_scan_counts", "scan_candidates"}.isdisjoint(est)
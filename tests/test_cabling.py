@@ -0,0 +1,54 @@
+import math
+import numpy as np
+import pytest
+import cabling
+from catalog import default_part
+from module_power import module_grid_shape
+
+
+@pytest.mark.parametrize("by", ["column", "row"])
+@pytest.mark.parametrize("band", [1, 2, 3, 4])
+def test_serpentine_visits_every_module_through_neighbours(by, band):
+    # 沿 band 方向的模組數為奇數時整條路徑相鄰；偶數時換 band 會跳一次（總長由 plan_cabling 實際量測）
+    n_v, n_e = 7, 9
+    order = cabling.serpentine_order(n_v, n_e, band, by=by)
+    assert sorted(order) == list(range(n_v * n_e))
+    r, c = order % n_v, order // n_v
+    assert np.all(np.abs(np.diff(r)) + np.abs(np.diff(c)) == 1)
+    assert sorted(cabling.serpentine_order(8, 10, band, by=by)) == list(range(80))
+
+
+def test_surface_distance():
+    assert cabling.surface_distance(1000.0, 0, 0, 90, 0) == pytest.approx(1000 * math.pi / 2)
+    assert cabling.surface_distance(1000.0, 10, 20, 10, 20) == pytest.approx(0.0)
+
+
+def test_plan_respects_capacities(result):
+    plan = cabling.plan_cabling(result)
+    n_v, n_e = module_grid_shape(result)
+    per_rx = int(result["n_module_per_receiver"])
+    hub_px = int(result["px_per_module_h"]) * int(result["px_per_module_v"]) * per_rx
+
+    assert np.bincount(plan["module_hub"]).max() <= per_rx
+    assert plan["n_hub"] == math.ceil(n_v * n_e / per_rx)
+    # 每個 hub 上的串接位置 0..k-1 各一次
+    for h in range(0, plan["n_hub"], 11):
+        assert sorted(plan["module_chain_pos"][plan["module_hub"] == h]) == list(range(per_rx))
+    ports = plan["hub_controller"] * 1000 + plan["hub_port"]
+    assert np.unique(ports, return_counts=True)[1].max() <= plan["hubs_per_port"]
+    assert np.bincount(plan["hub_controller"]).max() <= plan["hubs_per_controller"]
+    controller = default_part("controller", result["pitch_mm"])
+    assert plan["hubs_per_controller"] * hub_px <= controller["pixel_capacity"]
+    assert plan["hubs_per_port"] * hub_px <= controller["port_pixel_capacity"]
+    assert plan["n_controller"] == math.ceil(plan["n_hub"] / plan["hubs_per_controller"])
+
+    table = cabling.assignment_table(result, plan)
+    assert len(table) == n_v * n_e and table["module_id"].is_unique
+
+
+def test_capacity_errors(result):
+    hub_px = int(result["px_per_module_h"]) * int(result["px_per_module_v"]) * int(result["n_module_per_receiver"])
+    with pytest.raises(ValueError, match="port capacity"):
+        cabling.plan_cabling(result, port_pixel_capacity=hub_px - 1)
+    with pytest.raises(ValueError, match="receiver capacity"):
+        cabling.plan_cabling(dict(result, receiver_capacity=1))
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+import pytest
+import led_map
+from calculator import calculate, ring_led_counts, result_digest
+
+
+def _exact(param):
+    return calculate(dict(param, led_count_mode="exact"))
+
+
+def _scalar_ring(diameter, fov_h, n_equator, pitch, lat):
+    return round(diameter * math.pi * math.cos(lat / 180 * math.pi) * fov_h / 360 / n_equator / pitch, 0)
+
+
+def test_ring_led_counts_matches_scalar_formula(result):
+    args = (result["diameter_mm"], result["fov_h_deg"], result["n_equator_final"], result["pitch_mm"])
+    lats = np.array([[67.5, 45.0, 12.3], [0.0, -20.0, -33.75]])
+    counts = ring_led_counts(*args, lats)
+    assert counts.shape == lats.shape
+    assert counts.tolist() == [[_scalar_ring(*args, lat) for lat in row] for row in lats.tolist()]
+    # 與 average 模式的模組上下邊 LED 數同公式
+    assert ring_led_counts(*args, result["fov_v_n_final"]) == result["horizontal_led_counts_upper"][0]
+
+
+def test_unknown_mode(param):
+    with pytest.raises(ValueError, match="led_count_mode"):
+        calculate(dict(param, led_count_mode="nearest"))
+
+
+@pytest.mark.parametrize("changes", [{}, {"diameter": 5000.0, "resolution_h": 7680}, {"fov_v_s": 0.0}])
+def test_exact_sums_every_pixel_row(param, changes):
+    param = dict(param, **changes)
+    res = _exact(param)
+    n_v = res["n_vertical_final"]
+    px_v = res["px_per_module_v"]
+    step = res["angle_per_module_v_deg"] / px_v
+    args = (res["diameter_mm"], res["fov_h_deg"], res["n_equator_final"], res["pitch_mm"])
+
+    # 逐列純量計算：每片模組的 LED 數 = 該片各像素列中心緯度的 LED 數總和
+    expected = []
+    for r in range(n_v):
+        rows = [_scalar_ring(*args, res["fov_v_n_final"] - (r * px_v + k + 0.5) * step) for k in range(px_v)]
+        expected.append(sum(rows))
+    assert res["n_module_led_counts"] == expected
+    assert res["total_n_led_kpcs"] == pytest.approx(sum(expected) * res["n_equator_final"] / 1000)
+
+
+@pytest.mark.parametrize("changes", [{}, {"diameter": 5000.0, "resolution_h": 7680}])
+def test_exact_is_close_to_average(param, changes):
+    average = calculate(dict(param, **changes))
+    exact = _exact(dict(param, **changes))
+    assert exact["led_count_mode"] == "exact" and average["led_count_mode"] == "average"
+    # 幾何與模組切分相同，只有 LED 數（與其衍生的 IC / 功耗）不同
+    for key in ("pitch_mm", "n_equator_final", "n_vertical_final", "px_per_module_v", "max_scan", "room_size_h"):
+        assert exact[key] == average[key]
+    assert exact["total_n_led_kpcs"] == pytest.approx(average["total_n_led_kpcs"], rel=0.01)
+    assert exact["total_power_W"] == pytest.approx(average["total_power_W"], rel=0.01)
+
+
+def test_rows_past_the_pole_have_no_leds(param):
+    # fov_v_n_final 進位到 91.125°：越過極點的像素列 0 顆，與 LED map 逐列寫出的數量相同
+    res = _exact(dict(param, diameter=2000.0, fov_h=360.0, fov_v_n=88.0))
+    assert res["fov_v_n_final"] > 90
+    rows = led_map.pixel_row_led_counts(res).reshape(res["n_vertical_final"], -1)
+    assert (rows[0] == 0).any() and (rows >= 0).all()
+    assert res["n_module_led_counts"] == rows.sum(axis=1).tolist()
+    args = (res["diameter_mm"], res["fov_h_deg"], res["n_equator_final"], res["pitch_mm"])
+    assert ring_led_counts(*args, np.array([95.0, 90.0, -100.0])).tolist() == [0, 0, 0]
+
+
+def test_result_digest_tracks_param_and_result(param, result):
+    key = result_digest(param, result)
+    assert key == result_digest(dict(param), calculate(param))
+    # 同一個 document_no、不同設計 → 不同 key
+    assert result_digest(dict(param, luminance=1000), calculate(dict(param, luminance=1000))) != key
+    assert result_digest(param, _exact(param)) != key
+    # 陣列欄位依內容 hash
+    counts = np.asarray(result["n_module_led_counts"])
+    as_array = result_digest(param, dict(result, n_module_led_counts=counts))
+    assert as_array == result_digest(param, dict(result, n_module_led_counts=counts.copy()))
+    assert as_array != result_digest(param, dict(result, n_module_led_counts=counts + 1))
@@ -0,0 +1,52 @@
+import json
+import numpy as np
+import pytest
+import catalog
+
+
+def _linear(items, pitch):
+    # 逐項掃描的參考實作：[pitch_min, pitch_max)
+    return [
+        it for it in items
+        if (it.get("pitch_min") is None or it["pitch_min"] <= pitch)
+        and (it.get("pitch_max") is None or pitch < it["pitch_max"])
+    ]
+
+
+def test_pitch_index_matches_linear_scan():
+    items = catalog.load_catalog()
+    pitches = np.concatenate([np.linspace(0.1, 20, 400), [0.9, 1.2, 1.5, 2.5]])
+    for category, entries in items.items():
+        index = catalog.PitchIndex(entries)
+        for pitch in pitches:
+            assert index.query(pitch) == _linear(entries, pitch), (category, pitch)
+
+
+def test_boundaries_are_half_open():
+    index = catalog.PitchIndex([
+        {"id": "a", "pitch_min": None, "pitch_max": 1.0},
+        {"id": "b", "pitch_min": 1.0, "pitch_max": 2.0},
+        {"id": "c", "pitch_min": 1.5, "pitch_max": None},
+    ])
+    ids = lambda p: [it["id"] for it in index.query(p)]  # noqa: E731
+    assert ids(0.5) == ["a"]
+    assert ids(1.0) == ["b"]
+    assert ids(1.7) == ["b", "c"]
+    assert ids(2.0) == ["c"]
+
+
+def test_default_part_without_match_raises(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps({"hub": [{"part_no": "H", "price_usd": 1, "pitch_min": 2.0, "pitch_max": None}]}))
+    assert catalog.default_part("hub", 2.5, str(path))["part_no"] == "H"
+    with pytest.raises(ValueError, match="No hub"):
+        catalog.default_part("hub", 1.0, str(path))
+
+
+def test_led_options_put_power_model_package_first():
+    for pitch in (0.9, 1.5, 2.5, 4.0):
+        options = catalog.led_options_by_pitch(pitch)
+        package = catalog.led_package_for_pitch(pitch)["package"]
+        leds = {it["part_no"]: it for it in catalog.parts_for_pitch("led", pitch)}
+        packages = [leds[p]["package"] for p in options]
+        assert packages == sorted(packages, key=lambda pk: pk != package)
@@ -0,0 +1,143 @@
+import io
+import numpy as np
+import pytest
+import clearance
+from calculator import calculate
+
+
+def _cloud(result, n=1500, seed=3):
+    # 球面附近（淨空內外都有）+ 地板 + 遠處的點
+    rng = np.random.default_rng(seed)
+    center, R, _, _ = clearance.dome_frame(result, 500.0)
+    d = rng.normal(size=(n, 3))
+    d /= np.linalg.norm(d, axis=1, keepdims=True)
+    near = center + d * (R + rng.uniform(-700, 700, size=(n, 1)))
+    floor = np.c_[rng.uniform(-3000, 3000, (200, 2)), rng.uniform(0, 40, 200)]
+    far = rng.uniform(-8000, 8000, (200, 3)) + [0, 0, 8000]
+    return np.vstack([near, floor, far])
+
+
+def _sampled_distance(p, R, t0, t1, f0, f1, n=400):
+    t, f = np.meshgrid(np.linspace(t0, t1, n), np.linspace(f0, f1, n), indexing="ij")
+    q = R * np.stack([np.sin(t) * np.cos(f), np.sin(t) * np.sin(f), np.cos(t)], axis=-1)
+    return np.linalg.norm(q - p, axis=-1).min()
+
+
+def test_patch_distance_matches_sampling():
+    rng = np.random.default_rng(0)
+    R = 1500.0
+    t0, t1, f0, f1 = np.deg2rad([40.0, 55.0, -20.0, 5.0])
+    # 步長 15°/400 → 取樣誤差 < R · 0.04° ≈ 1 mm
+    for p in rng.uniform(-3000, 3000, size=(40, 3)):
+        exact = float(clearance.patch_distance(p, R, t0, t1, f0, f1))
+        sampled = _sampled_distance(p, R, t0, t1, f0, f1)
+        assert exact <= sampled + 1e-6
+        assert exact == pytest.approx(sampled, abs=1.5)
+    # 正對模組內部：距離 = |ρ - R|
+    inside = 1200.0 * np.array([np.sin(0.8) * np.cos(-0.1), np.sin(0.8) * np.sin(-0.1), np.cos(0.8)])
+    assert clearance.patch_distance(inside, R, t0, t1, f0, f1) == pytest.approx(300.0)
+
+
+@pytest.mark.parametrize("changes", [{}, {"fov_h": 360.0}])
+def test_analysis_matches_brute_force(param, changes):
+    result = calculate(dict(param, **changes))
+    points = _cloud(result)
+    out = clearance.analyze_clearance(result, clearance.PointIndex(points, cell=300.0), 500.0,
+                                      clearance=400.0, floor_z=50.0)
+
+    center, R, te, pe = clearance.dome_frame(result, 500.0)
+    n_v, n_e = len(te) - 1, len(pe) - 1
+    pts = points[points[:, 2] >= 50.0]
+    rows, cols = np.meshgrid(np.arange(n_v), np.arange(n_e), indexing="ij")
+    # (點, n_v, n_e)：每點到每片模組
+    d = clearance.patch_distance((pts - center)[:, None, None, :], R, te[rows], te[rows + 1], pe[cols], pe[cols + 1])
+    hit = d < 400.0
+
+    assert out["points_violating"] == int(hit.sum())
+    assert np.array_equal(out["module_points"], hit.sum(axis=0))
+    expected_min = np.where(hit.any(axis=0), np.where(hit, d, np.inf).min(axis=0), np.nan)
+    assert np.allclose(out["module_min_clearance_mm"], expected_min, equal_nan=True)
+    assert out["modules_violating"] == int(hit.any(axis=0).sum()) > 0
+    assert out["min_clearance_mm"] == pytest.approx(d.min(axis=(1, 2)).min())
+    assert out["n_cells_checked"] < out["n_cells"]
+
+    for r, c in zip(*np.nonzero(hit.any(axis=0))):
+        near = pts[hit[:, r, c]]
+        assert np.allclose(out["module_bbox_min"][r, c], near.min(axis=0))
+        assert np.allclose(out["module_bbox_max"][r, c], near.max(axis=0))
+        best = pts[np.argmin(np.where(hit[:, r, c], d[:, r, c], np.inf))]
+        assert np.allclose(out["module_nearest_point"][r, c], best)
+        assert out["module_inside"][r, c] == (np.linalg.norm(best - center) < R)
+
+    table = clearance.violation_table(out)
+    assert len(table) == out["modules_violating"]
+    assert table["Min Clearance (mm)"].is_monotonic_increasing
+    assert table["Points"].sum() == out["points_violating"]
+
+
+def test_floor_points_are_ignored(result):
+    # 球的最低點在 z = 500：z < 50 的點全部略過；floor_z=None 時列入
+    pts = np.array([[0.0, 0.0, 20.0], [-2000.0, 0.0, 30.0], [-2000.0, 0.0, 4000.0]])
+    index = clearance.PointIndex(pts)
+    out = clearance.analyze_clearance(result, index, 500.0, clearance=600.0)
+    assert out["n_candidates"] == 0 and out["modules_violating"] == 0
+    assert np.allclose(out["min_clearance_point"], pts[2])
+    everything = clearance.analyze_clearance(result, index, 500.0, clearance=600.0, floor_z=None)
+    assert everything["min_clearance_mm"] <= out["min_clearance_mm"]
+
+
+def test_point_index_gather():
+    rng = np.random.default_rng(1)
+    pts = rng.uniform(-1000, 1000, size=(500, 3))
+    index = clearance.PointIndex(pts, cell=200.0)
+    assert index.n_points == 500 and index.starts[-1] == 500
+    everything = index.gather(np.arange(len(index.cells)))
+    assert sorted(map(tuple, everything)) == sorted(map(tuple, pts))
+    # 每格的點都在該 voxel 內
+    for cid in (0, len(index.cells) // 2, len(index.cells) - 1):
+        lo = index.origin + index.cells[cid] * index.cell
+        inside = index.gather([cid])
+        assert np.all((inside >= lo - 1e-9) & (inside <= lo + index.cell + 1e-9))
+
+
+def test_read_xyz():
+    # 註解、表頭、點數列略過；多出來的欄位不讀
+    text = b"// scan export\n# units m\nX Y Z intensity\n2\n1 2 3 0.5\n-1  -2\t-3 7\n"
+    assert clearance.load_point_cloud(io.BytesIO(text)).tolist() == [[1000.0, 2000.0, 3000.0], [-1000.0, -2000.0, -3000.0]]
+    text = b"// scan export\nX,Y,Z,I\n3\n1,2,3,0.5\n4,5,6,1\nnan,1,1,1\n"
+    pts = clearance.load_point_cloud(io.BytesIO(text), "scan.xyz", units="cm")
+    assert pts.tolist() == [[10.0, 20.0, 30.0], [40.0, 50.0, 60.0]]
+    pts = clearance.load_point_cloud(b"0.5 1 2\n3 4 5 9 9\n", units="m")
+    assert pts.tolist() == [[500.0, 1000.0, 2000.0], [3000.0, 4000.0, 5000.0]]
+    with pytest.raises(ValueError):
+        clearance.load_point_cloud(io.BytesIO(b"x y z\nnone here\n"))
+
+
+def _ply(fmt, vertices, extra=b""):
+    header = (
+        f"ply\nformat {fmt} 1.0\ncomment test\nelement vertex {len(vertices)}\n"
+        "property float x\nproperty float y\nproperty uchar red\nproperty double z\n"
+        "element face 1\nproperty list uchar int vertex_indices\nend_header\n"
+    ).encode("ascii")
+    if fmt == "ascii":
+        body = "".join(f"{x} {y} 255 {z}\n" for x, y, z in vertices).encode("ascii") + b"3 0 1 2\n"
+    else:
+        order = "<" if fmt == "binary_little_endian" else ">"
+        rec = np.zeros(len(vertices), dtype=[("x", order + "f4"), ("y", order + "f4"),
+                                             ("red", "u1"), ("z", order + "f8")])
+        rec["x"], rec["y"], rec["z"] = np.asarray(vertices).T
+        body = rec.tobytes() + extra
+    return header + body
+
+
+@pytest.mark.parametrize("fmt", ["ascii", "binary_little_endian", "binary_big_endian"])
+def test_read_ply(fmt):
+    vertices = [(1.0, 2.0, 3.0), (-0.5, 0.25, 10.0), (4.0, 5.0, 6.0)]
+    pts = clearance.load_point_cloud(io.BytesIO(_ply(fmt, vertices, b"\x03" + b"\x00" * 12)), "room.ply")
+    assert np.allclose(pts, np.array(vertices) * 1000)
+
+    with pytest.raises(ValueError):
+        clearance.load_point_cloud(io.BytesIO(b"ply\nformat binary_vax 1.0\nend_header\n"), "x.ply")
+    with pytest.raises(ValueError):
+        clearance.load_point_cloud(io.BytesIO(b"ply\nformat ascii 1.0\nelement vertex 1\n"
+                                              b"property float x\nend_header\n1\n"), "x.ply")
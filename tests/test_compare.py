@@ -0,0 +1,62 @@
+import os
+import pytest
+import compare
+import metrics
+from calculator import calculate
+from psu import with_psu
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    yield compare.get_pool(2)
+    compare.shutdown_pool()
+
+
+def _pid(_):
+    return os.getpid()
+
+
+def _metric(sample):
+    for line in metrics.render_text().splitlines():
+        if line.startswith(sample + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_parallel_map_keeps_order():
+    assert compare.parallel_map(abs, [-3, 1, -2, 0]) == [3, 1, 2, 0]
+    assert os.getpid() not in compare.parallel_map(_pid, range(4))
+
+
+def test_variants_match_calculate_and_report_errors(param):
+    out = compare.evaluate_variants(param, [{}, {"diameter": 5000.0}, {"resolution_h": 3841}], thumbnails=False)
+    assert out["results"][0]["pitch_mm"] == calculate(param)["pitch_mm"]
+    assert out["results"][1]["pitch_mm"] == calculate(dict(param, diameter=5000.0))["pitch_mm"]
+    assert out["results"][2] is None and out["errors"][2].startswith("ValueError")
+
+    table = compare.comparison_table(out)
+    assert list(table.columns) == ["Design 1", "Design 2", "Design 3"]
+    assert table.loc["Error", "Design 3"] == out["errors"][2]
+
+
+def test_thumbnails_shared_by_same_geometry(param):
+    compare._THUMB_CACHE.clear()
+    sample = 'led_sphere_cache_requests_total{cache="compare_thumbnails",result="miss"}'
+    before = _metric(sample)
+    thumbs = compare.evaluate_variants(param, [{}, {"frame_rate": 120}, {"luminance": 1500.0}])["thumbnails"]
+    assert thumbs[0].startswith(b"\x89PNG") and thumbs[0] is thumbs[1] is thumbs[2]
+    assert _metric(sample) == before + 1
+
+
+def test_worker_timings_reach_the_parent(param):
+    sample = 'led_sphere_stage_seconds_count{stage="compare_calculate"}'
+    before = _metric(sample)
+    compare.evaluate_variants(param, [{}, {"diameter": 4000.0}], thumbnails=False)
+    assert _metric(sample) == before + 2
+
+
+def test_table_lists_psus_like_the_quote(param):
+    out = compare.evaluate_variants(param, [{}, {"diameter": 5000.0}], thumbnails=False)
+    table = compare.comparison_table(out)
+    assert "Hub Qty (with RX)" in table.index
+    assert table.loc["PSU Qty"].tolist() == [str(with_psu(r)["total_n_psu"]) for r in out["results"]]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import content_power
+from module_power import module_grid_shape
+
+
+def test_module_levels_match_brute_force_mean(result):
+    rng = np.random.default_rng(1)
+    frame = rng.random((301, 517, 3))
+    edges = content_power.module_edges(result, 517, 301, full_sphere=False)
+    levels = content_power.module_levels(frame, edges, gamma=1.0)
+    x0, x1, y0, y1 = edges
+    for r in range(len(y0)):
+        for c in range(0, len(x0), 7):
+            ref = frame[y0[r]:y1[r], x0[c]:x1[c]].reshape(-1, 3).mean(axis=0)
+            assert np.allclose(levels[r, c], ref)
+
+
+def test_integer_frames_use_gamma_lut(result):
+    frame = np.full((60, 120, 3), 128, dtype=np.uint8)
+    edges = content_power.module_edges(result, 120, 60, full_sphere=False)
+    levels = content_power.module_levels(frame, edges, gamma=2.2)
+    assert np.allclose(levels, (128 / 255) ** 2.2, rtol=1e-6)
+
+
+def test_full_white_content_matches_calculate(result):
+    white = np.ones((200, 400, 3))
+    out = content_power.simulate_content_power(result, [white], full_sphere=False)
+    assert out["peak_to_full_white"] == pytest.approx(1.0, rel=1e-6)
+
+
+def test_peak_average_and_step(result):
+    frames = [np.full((50, 100, 3), v, dtype=np.uint8) for v in (0, 255, 64, 255, 0)]
+    out = content_power.simulate_content_power(result, frames, full_sphere=False, keep_series=True)
+    series = out["total_series_W"]
+    assert out["n_frames"] == 5
+    assert out["peak_frame"] == 1
+    assert out["average_total_W"] == pytest.approx(series.mean())
+    assert series[0] < series[2] < series[1] == pytest.approx(series[3])
+    assert out["module_peak_W"].shape == module_grid_shape(result)
+
+    stepped = content_power.simulate_content_power(result, frames, full_sphere=False, step=2)
+    assert stepped["n_frames"] == 3
+    assert stepped["peak_total_W"] < out["peak_total_W"]
+
+
+def test_no_frames_raises(result):
+    with pytest.raises(ValueError):
+        content_power.simulate_content_power(result, [])
+
+
+def test_cli_reads_image_folder(tmp_path, capsys):
+    from PIL import Image
+
+    for i, v in enumerate((0, 255)):
+        Image.fromarray(np.full((90, 180, 3), v, dtype=np.uint8)).save(tmp_path / f"{i}.png")
+    csv = tmp_path / "power.csv"
+    assert content_power._main([str(tmp_path), "--csv", str(csv)]) == 0
+    assert "frames: 2" in capsys.readouterr().out
+    assert len(np.loadtxt(csv, skiprows=1)) == 2
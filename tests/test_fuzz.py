@@ -0,0 +1,58 @@
+import re
+import numpy as np
+import pytest
+import fuzz
+
+
+def test_signature_has_no_line_numbers():
+    sig, detail, _ = fuzz.check(dict(fuzz.BASE_PARAM, diameter=0.0), 5.0)
+    assert sig == "ZeroDivisionError@calculator.py:min_n_equator: float division by zero"
+    assert detail == "ZeroDivisionError: float division by zero"
+    assert not re.search(r"\.py:\d", sig)
+
+
+def test_input_checks_are_rejections_not_failures():
+    assert fuzz.check(dict(fuzz.BASE_PARAM, resolution_h=3841), 5.0)[0] == "rejected"
+    assert fuzz.check(dict(fuzz.BASE_PARAM), 5.0)[0] is None
+
+
+def test_random_params_include_edge_values():
+    params = fuzz.random_params(np.random.default_rng(0), 2000, p_edge=0.2)
+    assert len(params) == 2000 and set(params[0]) == set(fuzz.BASE_PARAM)
+    assert all(isinstance(p["resolution_h"], int) for p in params)
+    assert any(p["diameter"] in fuzz.EDGE_VALUES["diameter"] for p in params)
+
+
+def test_minimize_keeps_only_the_failing_field():
+    noisy = dict(fuzz.BASE_PARAM, diameter=0.0, luminance=1234.567, fov_h=200.123)
+    sig = fuzz.check(noisy, 5.0)[0]
+    reduced, _ = fuzz.minimize(noisy, sig, 5.0)
+    assert {k for k in reduced if reduced[k] != fuzz.BASE_PARAM[k]} == {"diameter"}
+
+
+def test_replay_reports_entries_that_still_fail(tmp_path):
+    path = str(tmp_path / "corpus.json")
+    entries = [
+        {"signature": "x", "detail": "", "changed": ["diameter"], "count": 1,
+         "param": dict(fuzz.BASE_PARAM, diameter=0.0)},
+        {"signature": "y", "detail": "", "changed": [], "count": 1, "param": dict(fuzz.BASE_PARAM)},
+    ]
+    fuzz.save_corpus(entries, path, budget_s=5.0)
+    still = fuzz.replay(path)
+    assert [e["signature"] for e in still] == ["x"]
+    assert still[0]["now"].startswith("ZeroDivisionError@calculator.py:")
+
+
+def test_replay_rejects_entries_missing_fields(tmp_path):
+    path = str(tmp_path / "corpus.json")
+    param = dict(fuzz.BASE_PARAM, diameter=0.0)
+    del param["gray_bits"], param["psu_derating"]
+    fuzz.save_corpus([{"signature": "x", "detail": "", "changed": ["diameter"], "count": 1, "param": param}], path)
+    with pytest.raises(ValueError, match="gray_bits, psu_derating"):
+        fuzz.replay(path)
+
+
+def test_shipped_corpus_has_every_field():
+    corpus = fuzz.load_corpus()
+    assert corpus["entries"]
+    assert all(set(e["param"]) == set(fuzz.BASE_PARAM) for e in corpus["entries"])
@@ -0,0 +1,84 @@
+import itertools
+import numpy as np
+import pytest
+import hardware
+from calculator import calculate
+from catalog import default_part, parts_for_pitch
+
+
+def _scalar_modules_per_receiver(module_px, capacity):
+    for n in hardware.MODULES_PER_RECEIVER_OPTIONS:
+        if module_px * n <= capacity:
+            return n
+    return 1
+
+
+def _scalar_scans(pxh, pxv, n_per_rx, frame_rate, gray_bits, dclk_limit, scan_ratio_limit):
+    scan_min = max(8, pxv // int(32 / n_per_rx))
+    return [
+        scan for scan in range(8, scan_ratio_limit + 1)
+        if scan >= scan_min and pxv % scan == 0 and scan * pxh * frame_rate * gray_bits / 1_000_000 <= dclk_limit
+    ]
+
+
+def test_receiver_capacity_at():
+    assert hardware.receiver_capacity_at(15728640, 60) == 262144
+    assert hardware.receiver_capacity_at(15728640, 120) == 131072
+    assert hardware.receiver_capacity_at(1000, np.array([3, 7])).tolist() == [333, 142]
+
+
+def test_modules_per_receiver_matches_scalar():
+    module_px = np.array([100, 5000, 21600, 32768, 65536, 300000])
+    capacity = np.array([131072, 262144])
+    got = hardware.modules_per_receiver(module_px[:, None], capacity[None, :])
+    expected = [[_scalar_modules_per_receiver(m, c) for c in capacity] for m in module_px]
+    assert got.tolist() == expected
+    # 一片都帶不動時仍回傳 1
+    assert hardware.modules_per_receiver(300000, 262144) == 1
+
+
+@pytest.mark.parametrize("pxh, pxv", [(120, 180), (96, 96), (128, 64), (160, 120)])
+def test_scan_feasibility_matches_scalar(pxh, pxv):
+    n_per_rx = np.array([8, 4, 2, 1])[:, None, None]
+    frame_rate = np.array([60, 120, 240])[None, :, None]
+    gray_bits = np.array([12, 16])[None, None, :]
+    scans, ok = hardware.scan_feasibility(pxh, pxv, n_per_rx, frame_rate, gray_bits, 12.5, 64)
+    assert scans.tolist() == list(range(8, 65))
+    assert ok.shape == (4, 3, 2, len(scans))
+    for (i, n), (j, fr), (k, bits) in itertools.product(
+            enumerate([8, 4, 2, 1]), enumerate([60, 120, 240]), enumerate([12, 16])):
+        assert scans[ok[i, j, k]].tolist() == _scalar_scans(pxh, pxv, n, fr, bits, 12.5, 64)
+
+
+def test_timing_support_agrees_with_calculate(param, result):
+    support = hardware.timing_support(result, param)
+    fr, bits = hardware.refresh_profiles(result["pitch_mm"])
+    receivers = parts_for_pitch("receiver", result["pitch_mm"])
+    assert len(support["receiver"]) == len(receivers) * len(fr) == len(support["supported"])
+
+    receiver = default_part("receiver", result["pitch_mm"])["part_no"]
+    for frame_rate in (60, 120):
+        res = calculate(dict(param, frame_rate=frame_rate, gray_bits=16))
+        row = [i for i in range(len(support["receiver"]))
+               if support["receiver"][i] == receiver and support["frame_rate"][i] == frame_rate
+               and support["gray_bits"][i] == 16]
+        assert len(row) == 1
+        i = row[0]
+        assert support["receiver_capacity"][i] == res["receiver_capacity"]
+        assert support["n_module_per_receiver"][i] == res["n_module_per_receiver"]
+        assert support["max_scan"][i] == res["max_scan"]
+        assert support["dclk_mhz"][i] == pytest.approx(res["dclk_mhz"])
+        assert bool(support["supported"][i])
+
+
+def test_unsupported_profiles(param, result):
+    # DCLK 上限壓低 → 高更新率找不到 scan
+    support = hardware.timing_support(result, dict(param, dclk_limit=3.0))
+    slow = support["dclk_mhz"][support["supported"]]
+    assert len(slow) and np.all(slow <= 3.0)
+    assert not support["supported"][support["frame_rate"] >= 120].any()
+    assert np.all(support["max_scan"][~support["supported"]] == 0)
+
+    table = hardware.support_matrix(support, support["receiver"][0])
+    assert table.loc["240 Hz", "16-bit"] == "✗"
+    assert table.loc["30 Hz", "12-bit"].startswith("✓ 1/")
@@ -0,0 +1,117 @@
+import sqlite3
+import time
+from contextlib import closing
+import pytest
+import jobs
+from calculator import calculate
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    jobs.init_db(path)
+    return path
+
+
+def _wait(job_id, path, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get_job(job_id, path)
+        if job["status"] not in jobs.ACTIVE:
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_parse_values():
+    assert jobs.parse_values("2000, 3000,5000") == [2000.0, 3000.0, 5000.0]
+    assert jobs.parse_values("10:12:0.5") == [10.0, 10.5, 11.0, 11.5, 12.0]
+    assert jobs.parse_values("0:1:0.3") == pytest.approx([0.0, 0.3, 0.6, 0.9])
+    for bad in ("", " , ", "5:1:1", "1:5:0", "a,b"):
+        with pytest.raises(ValueError):
+            jobs.parse_values(bad)
+
+
+def test_sweep_params(param):
+    params = jobs.sweep_params(param, {"diameter": [2000.0, 3000.0], "resolution_h": [1920.0, 3840.0, 7680.0]})
+    assert len(params) == 6
+    assert [(p["diameter"], p["resolution_h"]) for p in params[:3]] == [(2000.0, 1920), (2000.0, 3840), (2000.0, 7680)]
+    assert all(isinstance(p["resolution_h"], int) and p["luminance"] == param["luminance"] for p in params)
+    with pytest.raises(ValueError, match="Cannot sweep"):
+        jobs.sweep_params(param, {"pitch": [1.0]})
+    with pytest.raises(ValueError, match="limit"):
+        jobs.sweep_params(param, {"diameter": list(range(jobs.MAX_ITEMS + 1))})
+
+
+def test_submit_list_cancel_delete(db, param):
+    a = jobs.submit_job("sweep", "Dome A", [param, param], project="Dome A", path=db)
+    b = jobs.submit_job("reports", "Dome B/1", [param, dict(param, document_no="X-1")], project="Dome B", path=db)
+    assert [j["id"] for j in jobs.list_jobs(path=db)] == [b, a]
+    assert [j["id"] for j in jobs.list_jobs(project="Dome A", path=db)] == [a]
+    assert jobs.list_jobs(project="Dome C", path=db) == []
+
+    items = jobs.job_items(b, db)
+    assert [it["param"]["document_no"] for it in items] == ["Dome_B_1_1", "X-1"]
+    assert all(it["status"] == "queued" and it["summary"] is None for it in items)
+
+    # 沒有 dispatcher：queued 的工作直接取消
+    assert not jobs.delete_job(a, db)
+    jobs.cancel_job(a, db)
+    assert jobs.get_job(a, db)["status"] == "cancelled"
+    assert {it["status"] for it in jobs.job_items(a, db)} == {"cancelled"}
+    assert jobs.delete_job(a, db)
+    assert jobs.get_job(a, db) is None and jobs.job_items(a, db) == []
+
+    with pytest.raises(ValueError):
+        jobs.submit_job("render", "x", [param], path=db)
+    with pytest.raises(ValueError):
+        jobs.submit_job("sweep", "x", [], path=db)
+
+
+def test_old_db_gets_project_column(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    with closing(sqlite3.connect(path)) as con, con:
+        con.executescript(jobs.SCHEMA.replace("    project TEXT,\n", ""))
+        con.execute("INSERT INTO jobs (kind, title, status, options, n_items, created) "
+                    "VALUES ('sweep', 'Old Dome', 'done', '{}', 1, 0)")
+    jobs.init_db(path)
+    jobs.init_db(path)
+    assert [j["title"] for j in jobs.list_jobs(project="Old Dome", path=path)] == ["Old Dome"]
+
+
+def test_run_item_reports_errors(param):
+    summary, files, error, seconds = jobs.run_item("sweep", param, {})
+    r = calculate(param)
+    assert error is None and files == [] and seconds >= 0
+    assert summary["modules"] == r["total_n_module"] and summary["pitch_mm"] == r["pitch_mm"]
+
+    summary, files, error, _ = jobs.run_item("sweep", dict(param, resolution_h=3841), {})
+    assert summary is None and files == [] and error.startswith("ValueError")
+
+
+def test_runner_finishes_queued_and_orphaned_jobs(db, param):
+    ok = jobs.submit_job("sweep", "Dome", [param, dict(param, resolution_h=3841), dict(param, diameter=5000.0)],
+                         project="Dome", path=db)
+    # 上一個 process 留下的 running 工作（owner 已不存在）→ 重新排隊
+    orphan = jobs.submit_job("sweep", "Dome", [param], project="Dome", path=db)
+    with closing(jobs._connect(db)) as con, con:
+        con.execute("UPDATE jobs SET status = 'running', owner_pid = 999999999 WHERE id = ?", (orphan,))
+
+    runner = jobs.JobRunner(db, max_workers=2)
+    try:
+        job = _wait(ok, db)
+        assert (job["status"], job["n_done"], job["n_failed"]) == ("done", 2, 1)
+        items = jobs.job_items(ok, db)
+        assert [it["status"] for it in items] == ["done", "failed", "done"]
+        assert items[1]["error"].startswith("ValueError")
+        assert items[2]["summary"]["modules"] == calculate(dict(param, diameter=5000.0))["total_n_module"]
+        assert jobs.job_zip(ok, db) is None
+
+        table = jobs.items_table(items)
+        assert list(table["#"]) == [1, 2, 3]
+        assert "diameter" in table.columns and "resolution_h" in table.columns
+
+        assert _wait(orphan, db)["status"] == "done"
+    finally:
+        if runner._pool is not None:
+            runner._pool.shutdown(wait=True, cancel_futures=True)
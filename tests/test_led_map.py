@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import led_map
+from calculator import calculate
+
+
+# 3000 mm / 89°：fov_v_n_final 剛好 90°；2000 mm / 360° / 88°：fov_v_n_final 進位到 91.125°（越過極點）
+# 兩者最北幾列每片模組 0 顆 LED
+@pytest.mark.parametrize("diameter, fov_h, resolution_h, fov_v_n", [
+    (2000.0, 180.0, 1920, 67.5),
+    (3000.0, 180.0, 3840, 89.0),
+    (2000.0, 360.0, 3840, 88.0),
+])
+def test_led_counts_match_exact_mode(param, tmp_path, diameter, fov_h, resolution_h, fov_v_n):
+    r = calculate(dict(param, diameter=diameter, fov_h=fov_h, resolution_h=resolution_h, fov_v_n=fov_v_n,
+                       led_count_mode="exact"))
+    info = led_map.write_led_map(r, str(tmp_path / "map.bin"), mode="nearest")
+    m = led_map.load_led_map(info["path"])
+    per_module = np.asarray(m["row_led_per_module"]).reshape(int(r["n_vertical_final"]), -1).sum(axis=1)
+    assert per_module.tolist() == [int(v) for v in r["n_module_led_counts"]]
+    assert info["n_leds"] == int(np.asarray(m["row_offsets"])[-1])
+    assert info["n_leds"] == per_module.sum() * int(r["n_equator_final"])
+    assert (np.asarray(m["row_led_per_module"]) == 0).any() == (fov_v_n > 80)
+    assert (np.asarray(m["row_led_per_module"]) >= 0).all()
+
+
+@pytest.mark.parametrize("mode", ["nearest", "bilinear"])
+def test_round_trip_and_sampling(result, tmp_path, mode):
+    info = led_map.write_led_map(result, str(tmp_path / "map.bin"), mode=mode, src_w=512, src_h=256)
+    m = led_map.load_led_map(info["path"])
+    header = m["header"]
+    assert int(header["n_leds"]) == info["n_leds"] and int(header["src_w"]) == 512
+    assert np.asarray(m["x"]).max() < 512 and np.asarray(m["y"]).max() < 256
+    if mode == "bilinear":
+        assert 0 <= np.asarray(m["fx"]).min() and np.asarray(m["fx"]).max() <= 1
+
+    # 畫面只隨經度變化 → 每顆 LED 取到的值依 x 單調（同一列內）
+    frame = np.broadcast_to(np.arange(512, dtype=np.float32)[None, :, None], (256, 512, 3))
+    colors = led_map.sample_frame(m, frame)
+    assert colors.shape == (info["n_leds"], 3)
+    offsets = np.asarray(m["row_offsets"])
+    row = colors[offsets[3]:offsets[4], 0]
+    assert np.all(np.diff(row) >= 0)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        led_map.load_led_map(str(path))
+
+
+def test_cli(tmp_path, capsys):
+    out = tmp_path / "cli.bin"
+    assert led_map._main([str(out), "--mode", "nearest", "--diameter", "2000", "--resolution-h", "1920"]) == 0
+    assert "LEDs in" in capsys.readouterr().out
+    assert led_map.load_led_map(str(out))["header"]["mode"] == 0
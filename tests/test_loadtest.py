@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import loadtest
+
+
+def _session(index, latency, rss_ready, rss_peak, t_start, t_end, rejected=0):
+    return {
+        "session": index, "latency": latency, "errors": [], "rejected": rejected, "calculations": len(latency["calculate"]),
+        "t_start": t_start, "t_end": t_end, "process_rss_ready_mb": rss_ready, "process_rss_peak_mb": rss_peak,
+        "session_state_kb": 100.0 + index,
+    }
+
+
+def test_session_params_cover_every_widget():
+    widgets = loadtest.session_params(np.random.default_rng(0), 500)
+    assert len(widgets) == 500
+    assert all(set(w) == set(loadtest.PARAM_MIX) | {"in_exact_led_count"} for w in widgets)
+    assert all(w[k] in loadtest.PARAM_MIX[k] for w in widgets for k in loadtest.PARAM_MIX)
+    assert 0 < sum(w["in_exact_led_count"] for w in widgets) < 500
+
+
+def test_app_imports_lists_top_level_modules():
+    names = loadtest._app_imports()
+    assert {"streamlit", "calculator", "psu", "metrics"} <= set(names)
+
+
+def test_summarize_sessions():
+    empty = {step: [] for step in loadtest.STEPS}
+    a = _session(1, dict(empty, calculate=[0.1, 0.3], bom=[0.05], bom_toggle=[0.2, 0.2]), 300.0, 350.0, 10.0, 14.0)
+    b = _session(0, dict(empty, calculate=[0.2], bom=[], bom_toggle=[0.4]), 310.0, 330.0, 11.0, 15.0, rejected=1)
+    failed = {"session": 2, "errors": ["BrokenBarrierError: "]}
+    report = loadtest.summarize_sessions([a, failed, b], 3, 2, baseline_mb=250.0)
+
+    assert [s["session"] for s in report["sessions"]] == [0, 1, 2]
+    assert report["wall_s"] == 5.0 and report["calculations"] == 3
+    assert report["throughput_calc_per_s"] == pytest.approx(3 / 5)
+    assert report["throughput_actions_per_s"] == pytest.approx(7 / 5)
+    assert report["latency"]["calculate"]["n"] == 3 and report["latency"]["calculate"]["max"] == 0.3
+    assert report["latency"]["calculate"]["p50"] == pytest.approx(0.2)
+    assert report["latency"]["startup"] == {}
+
+    # session 記憶體 = worker 峰值 - 閒置基準；成長 = 峰值 - 暖機完成時
+    mem = report["memory"]
+    assert mem["idle_baseline_mb"] == 250.0
+    assert (mem["session_rss_mb"]["p50"], mem["session_rss_mb"]["max"]) == (90.0, 100.0)
+    assert (mem["session_rss_growth_mb"]["p50"], mem["session_rss_growth_mb"]["max"]) == (35.0, 50.0)
+    assert mem["process_rss_peak_mb"]["n"] == 2
+    assert report["rejected"] == 1 and report["errors"] == ["session 2: BrokenBarrierError: "]
+
+    nothing = loadtest.summarize_sessions([failed], 1, 2, baseline_mb=250.0)
+    assert nothing["wall_s"] == 0.0 and nothing["throughput_calc_per_s"] == 0.0
+    assert nothing["memory"]["session_rss_mb"] == {}
+
+
+@pytest.mark.slow
+def test_one_session_smoke(capsys):
+    report = loadtest.load_test(1, iterations=1, timeout=300)
+    assert report["errors"] == []
+    assert report["calculations"] == 1 and report["latency"]["calculate"]["n"] == 1
+    assert report["memory"]["session_rss_mb"]["n"] == 1
+    loadtest._print_report(report)
+    assert "1 concurrent session(s)" in capsys.readouterr().out
@@ -0,0 +1,119 @@
+import io
+import json
+import struct
+import numpy as np
+import pytest
+import mesh_export
+from module_power import module_grid_shape
+
+
+@pytest.fixture
+def mesh(result):
+    return mesh_export.panel_mesh(result, subdiv=2, bottom_edge_height=500.0)
+
+
+def _write(writer, mesh):
+    buf = io.BytesIO()
+    writer(mesh, buf)
+    return buf.getvalue()
+
+
+def test_panels_lie_on_the_sphere(result, mesh):
+    n_v, n_e = module_grid_shape(result)
+    assert (mesh["n_rows"], mesh["n_columns"], mesh["n_panels"]) == (n_v, n_e, n_v * n_e)
+    assert len(mesh["vertices"]) == mesh["n_panels"] * mesh["verts_per_panel"] == mesh["n_panels"] * 9
+    assert len(mesh["triangles"]) == mesh["n_panels"] * mesh["tris_per_panel"] == mesh["n_panels"] * 8
+
+    R = result["diameter_mm"] / 2
+    v = mesh["vertices"]
+    assert np.allclose(np.linalg.norm(mesh["normals"], axis=1), 1.0)
+    center = v - mesh["normals"] * R
+    assert np.allclose(center, center[0], atol=1e-6)
+    assert np.allclose(center[0][:2], 0.0, atol=1e-6)
+    assert v[:, 2].min() == pytest.approx(500.0)
+
+
+def test_triangles_face_outward(mesh):
+    n = mesh_export._triangle_normals(mesh["vertices"], mesh["triangles"])
+    vertex_normal = mesh["normals"][mesh["triangles"]].mean(axis=1)
+    assert np.all(np.einsum("ij,ij->i", n, vertex_normal) > 0)
+
+
+def test_panel_ids_are_column_major(mesh):
+    n_v = mesh["n_rows"]
+    tpp = mesh["tris_per_panel"]
+    assert np.array_equal(mesh["panel_id"], np.repeat(np.arange(mesh["n_panels"]), tpp))
+    assert np.array_equal(mesh["row_type"], mesh["panel_id"] % n_v)
+    # 同一 column 內 row 0 在最北（z 最大）
+    z = mesh["vertices"][:, 2].reshape(mesh["n_panels"], -1).mean(axis=1)
+    assert np.all(np.diff(z[:n_v]) < 0)
+
+
+def test_stl_round_trip(mesh):
+    data = _write(mesh_export.write_stl, mesh)
+    assert len(data) == 84 + 50 * len(mesh["triangles"])
+    assert data[:80].rstrip().decode("ascii").startswith(f'LED sphere {mesh["n_panels"]} panels')
+    (count,) = struct.unpack("<I", data[80:84])
+    assert count == len(mesh["triangles"])
+
+    rec = np.frombuffer(data[84:], dtype=mesh_export.STL_DTYPE)
+    assert np.allclose(rec["v"], mesh["vertices"][mesh["triangles"]], atol=1e-3)
+    assert np.array_equal(rec["attr"], mesh["row_type"])
+    assert np.allclose(np.linalg.norm(rec["normal"], axis=1), 1.0, atol=1e-5)
+
+
+def test_obj_round_trip(mesh):
+    lines = _write(mesh_export.write_obj, mesh).decode("ascii").splitlines()
+    kinds = [line.split(" ", 1)[0] for line in lines]
+    assert kinds.count("v") == kinds.count("vn") == len(mesh["vertices"])
+    assert kinds.count("o") == mesh["n_panels"]
+    assert kinds.count("f") == len(mesh["triangles"])
+
+    v = np.array([line.split()[1:] for line in lines if line.startswith("v ")], dtype=float)
+    assert np.allclose(v, mesh["vertices"], atol=1e-3)
+    faces = [line for line in lines if line.startswith("f ")]
+    tri = np.array([[int(p.split("//")[0]) for p in f.split()[1:]] for f in faces]) - 1
+    assert np.array_equal(tri, mesh["triangles"])
+
+    objects = [line for line in lines if line.startswith("o ")]
+    n_v = mesh["n_rows"]
+    assert objects[0] == "o M000000_R00"
+    assert objects[n_v + 1] == f"o M{n_v + 1:06d}_R01"
+
+
+def test_glb_round_trip(mesh):
+    data = _write(mesh_export.write_glb, mesh)
+    magic, version, total = struct.unpack("<4sII", data[:12])
+    assert (magic, version, total) == (b"glTF", 2, len(data))
+    js_len, js_type = struct.unpack("<I4s", data[12:20])
+    assert js_type == b"JSON" and js_len % 4 == 0
+    gltf = json.loads(data[20:20 + js_len])
+    bin_len, bin_type = struct.unpack("<I4s", data[20 + js_len:28 + js_len])
+    assert bin_type == b"BIN\x00"
+    assert bin_len == gltf["buffers"][0]["byteLength"] == len(data) - 28 - js_len
+    blob = data[28 + js_len:]
+
+    prim = gltf["meshes"][0]["primitives"][0]
+    assert gltf["meshes"][0]["extras"]["n_panels"] == mesh["n_panels"]
+
+    def read(index, dtype, width):
+        acc = gltf["accessors"][index]
+        view = gltf["bufferViews"][acc["bufferView"]]
+        arr = np.frombuffer(blob, dtype=dtype, count=acc["count"] * width, offset=view["byteOffset"])
+        return acc, arr.reshape(acc["count"], width) if width > 1 else arr
+
+    acc, pos = read(prim["attributes"]["POSITION"], "<f4", 3)
+    # Y 軸朝上、公尺
+    v = mesh["vertices"]
+    assert np.allclose(pos, np.stack([v[:, 0], v[:, 2], -v[:, 1]], axis=1) / 1000, atol=1e-6)
+    assert np.allclose(acc["min"], pos.min(axis=0)) and np.allclose(acc["max"], pos.max(axis=0))
+    _, idx = read(prim["indices"], "<u4", 1)
+    assert np.array_equal(idx, mesh["triangles"].ravel())
+    _, row = read(prim["attributes"]["_ROW_TYPE"], "<f4", 1)
+    assert row.max() == mesh["n_rows"] - 1
+
+
+@pytest.mark.parametrize("fmt", sorted(mesh_export.MESH_WRITERS))
+def test_export_mesh_matches_writer(result, fmt):
+    mesh = mesh_export.panel_mesh(result, subdiv=1, bottom_edge_height=0.0)
+    assert mesh_export.export_mesh(result, fmt, subdiv=1) == _write(mesh_export.MESH_WRITERS[fmt], mesh)
@@ -0,0 +1,135 @@
+import threading
+import urllib.error
+import urllib.request
+import uuid
+import pytest
+import metrics
+
+
+def _sample(lines, sample):
+    for line in lines:
+        if line.startswith(sample + " "):
+            return float(line.split()[-1])
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0, 0.5))
+    assert h.buckets == (0.1, 0.5, 1.0)
+    for v in (0.05, 0.1, 0.3, 0.7, 2.0):
+        h.observe(v, stage="a")
+    h.observe(0.2, stage='q"x')
+    lines = h.expose()
+    assert lines[:2] == ["# HELP led_sphere_test_seconds Test.", "# TYPE led_sphere_test_seconds histogram"]
+    # le 是上界（含）：0.1 落在 le="0.1"
+    assert _sample(lines, 'led_sphere_test_seconds_bucket{stage="a",le="0.1"}') == 2
+    assert _sample(lines, 'led_sphere_test_seconds_bucket{stage="a",le="0.5"}') == 3
+    assert _sample(lines, 'led_sphere_test_seconds_bucket{stage="a",le="1"}') == 4
+    assert _sample(lines, 'led_sphere_test_seconds_bucket{stage="a",le="+Inf"}') == 5
+    assert _sample(lines, 'led_sphere_test_seconds_count{stage="a"}') == 5
+    assert _sample(lines, 'led_sphere_test_seconds_sum{stage="a"}') == pytest.approx(3.15)
+    assert _sample(lines, 'led_sphere_test_seconds_count{stage="q\\"x"}') == 1
+
+
+def test_counter_and_collect():
+    c = metrics.Counter("test_total", "Test.", ("outcome",), collect=lambda: [(("external",), 7.0)])
+    c.inc(outcome="ok")
+    c.inc(2.5, outcome="ok")
+    lines = c.expose()
+    assert lines[1] == "# TYPE led_sphere_test_total counter"
+    assert _sample(lines, 'led_sphere_test_total{outcome="ok"}') == 3.5
+    assert _sample(lines, 'led_sphere_test_total{outcome="external"}') == 7
+
+
+def test_capture_and_record_round_trip():
+    stage = f"test_{uuid.uuid4().hex[:8]}"
+    count = f'led_sphere_stage_seconds_count{{stage="{stage}"}}'
+
+    def work(n):
+        for _ in range(n):
+            with metrics.timed(stage):
+                pass
+        return n * 2
+
+    result, observations = metrics.capture_observations(work, 3)
+    assert result == 6 and len(observations) == 3
+    assert {(name, labels["stage"]) for name, _, labels in observations} == {("led_sphere_stage_seconds", stage)}
+    # 擷取期間不記錄；結束後恢復
+    assert _sample(metrics.render_text().splitlines(), count) is None
+    metrics.record_observations(observations)
+    assert _sample(metrics.render_text().splitlines(), count) == 3
+    work(1)
+    assert _sample(metrics.render_text().splitlines(), count) == 4
+
+
+def test_capture_is_per_thread():
+    stage = f"test_{uuid.uuid4().hex[:8]}"
+    count = f'led_sphere_stage_seconds_count{{stage="{stage}"}}'
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=metrics.capture_observations, args=(slow,))
+    t.start()
+    started.wait(5)
+    with metrics.timed(stage):
+        pass
+    release.set()
+    t.join()
+    assert _sample(metrics.render_text().splitlines(), count) == 1
+
+
+def test_timed_records_exceptions():
+    stage = f"test_{uuid.uuid4().hex[:8]}"
+    with pytest.raises(RuntimeError):
+        with metrics.timed(stage):
+            raise RuntimeError("boom")
+    assert _sample(metrics.render_text().splitlines(), f'led_sphere_stage_seconds_count{{stage="{stage}"}}') == 1
+
+
+def test_cache_lookups_and_hit_ratio():
+    cache = f"test_{uuid.uuid4().hex[:8]}"
+    store = {}
+
+    @metrics.cache_lookups(cache)
+    def lookup(key):
+        if key not in store:
+            store[key] = fill(key)
+        return store[key]
+
+    @metrics.cache_fill
+    def fill(key):
+        return key * 2
+
+    assert [lookup(k) for k in (1, 1, 2, 1)] == [2, 2, 4, 2]
+    lines = metrics.render_text().splitlines()
+    assert _sample(lines, f'led_sphere_cache_requests_total{{cache="{cache}",result="hit"}}') == 2
+    assert _sample(lines, f'led_sphere_cache_requests_total{{cache="{cache}",result="miss"}}') == 2
+    assert _sample(lines, f'led_sphere_cache_hit_ratio{{cache="{cache}"}}') == 0.5
+
+
+def test_calculation_outcomes(monkeypatch):
+    before = _sample(metrics.CALCULATIONS.expose(), 'led_sphere_calculations_total{outcome="timeout"}') or 0
+    monkeypatch.setattr(metrics, "CALCULATE_BUDGET_S", 1.0)
+    metrics.record_calculation("ok", seconds=2.0)
+    metrics.record_calculation("ok", seconds=0.5)
+    after = _sample(metrics.CALCULATIONS.expose(), 'led_sphere_calculations_total{outcome="timeout"}')
+    assert after == before + 1
+
+
+def test_metrics_server():
+    server = metrics.start_metrics_server(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "# TYPE led_sphere_stage_seconds histogram" in resp.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=5)
+        # 同一個 port 再開一次 → None
+        assert metrics.start_metrics_server(port=server.server_address[1]) is None
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from calculator import calculate
+from module_power import hub_index, hub_sum, module_grid_shape, module_power_map
+
+
+@pytest.mark.parametrize("mode", ["average", "exact"])
+def test_power_map_total_matches_calculate(param, mode):
+    r = calculate(dict(param, led_count_mode=mode))
+    power_map = module_power_map(r)
+    assert power_map["module_power_W"].shape == module_grid_shape(r)
+    assert power_map["total_W"] == pytest.approx(r["total_power_W"] * 1000, rel=1e-9)
+
+
+def test_hub_index_is_column_major(result):
+    n_v, n_e = module_grid_shape(result)
+    per_rx = int(result["n_module_per_receiver"])
+    hub = hub_index(result)
+    for c in range(n_e):
+        for r in range(n_v):
+            assert hub[r, c] == (c * n_v + r) // per_rx
+    assert hub.max() + 1 == -(-n_v * n_e // per_rx)
+
+
+def test_hub_sum_matches_loop(result):
+    hub = hub_index(result)
+    values = np.random.default_rng(2).random(hub.shape)
+    sums = hub_sum(values, hub)
+    for h in range(0, len(sums), 5):
+        assert sums[h] == pytest.approx(values[hub == h].sum())
@@ -0,0 +1,138 @@
+import itertools
+import numpy as np
+import pytest
+import psu
+from calculator import calculate
+from module_power import module_grid_shape, module_channel_power, module_system_power, hub_power_w
+
+
+def _ffd(loads, capacity):
+    # 純量 first-fit decreasing（同重量依原順序）
+    bins = []
+    bin_of = [-1] * len(loads)
+    for i in sorted(range(len(loads)), key=lambda i: -loads[i]):
+        if loads[i] <= 0:
+            continue
+        for b, load in enumerate(bins):
+            if load + loads[i] <= capacity:
+                bins[b] += loads[i]
+                bin_of[i] = b
+                break
+        else:
+            bins.append(loads[i])
+            bin_of[i] = len(bins) - 1
+    return bin_of, bins
+
+
+def _optimal_bins(loads, capacity):
+    # 暴力：把每件分到 0..n-1 台，取最少台數
+    loads = [w for w in loads if w > 0]
+    for n_bins in range(1, len(loads) + 1):
+        for assign in itertools.product(range(n_bins), repeat=len(loads)):
+            totals = np.bincount(assign, weights=loads, minlength=n_bins)
+            if np.all(totals <= capacity):
+                return n_bins
+    return len(loads)
+
+
+def test_pack_ffd_matches_scalar_and_brute_force():
+    rng = np.random.default_rng(7)
+    loads = np.round(rng.uniform(5, 100, size=(40, 6)), 1)
+    loads[rng.random(loads.shape) < 0.2] = 0.0
+    bin_of, bins, n_bins = psu._pack_ffd(loads, 120.0)
+    for p in range(len(loads)):
+        ref_of, ref_bins = _ffd(loads[p].tolist(), 120.0)
+        assert bin_of[p].tolist() == ref_of
+        assert n_bins[p] == len(ref_bins)
+        assert np.allclose(bins[p, :n_bins[p]], ref_bins) and not bins[p, n_bins[p]:].any()
+        # FFD 的保證：≤ 11/9 OPT + 6/9
+        assert n_bins[p] <= 11 / 9 * _optimal_bins(loads[p], 120.0) + 6 / 9
+
+
+def test_oversized_item_gets_its_own_bin():
+    bin_of, bins, n_bins = psu._pack_ffd(np.array([[150.0, 30.0, 40.0]]), 100.0)
+    assert n_bins.tolist() == [2]
+    assert bin_of.tolist() == [[0, 1, 1]]
+    assert bins[0, :2].tolist() == [150.0, 70.0]
+
+
+def _hub_rows(result):
+    n_v, n_e = module_grid_shape(result)
+    n = int(result["n_module_per_receiver"])
+    module_row = np.arange(n_v * n_e) % n_v
+    return [module_row[start:start + n] for start in range(0, n_v * n_e, n)]
+
+
+@pytest.mark.parametrize("changes", [{}, {"diameter": 5000.0, "resolution_h": 7680}, {"fov_h": 200.0}])
+def test_hub_patterns_cover_every_hub(param, changes):
+    result = calculate(dict(param, **changes))
+    rows, counts, hub_pattern_of = psu.hub_patterns(result)
+    hubs = _hub_rows(result)
+    pat = hub_pattern_of(np.arange(len(hubs)))
+    assert counts.sum() == len(hubs)
+    assert np.bincount(pat, minlength=len(counts)).tolist() == counts.tolist()
+    for h, hub_rows in enumerate(hubs):
+        pattern = rows[pat[h]]
+        assert pattern[pattern >= 0].tolist() == hub_rows.tolist()
+
+
+def test_allocation_matches_per_hub_packing(param, result):
+    alloc = psu.allocate_psus(result, derating=0.8)
+    row_power = module_channel_power(result).sum(axis=1) + module_system_power(result)
+    usable = alloc["usable_W"]
+    n_psu = 0
+    load = 0.0
+    for hub_rows in _hub_rows(result):
+        _, bins = _ffd(row_power[hub_rows].tolist() + [hub_power_w(result)], usable)
+        n_psu += len(bins)
+        load += sum(bins)
+    assert alloc["total_n_psu"] == n_psu
+    assert alloc["total_load_W"] == pytest.approx(load)
+    assert alloc["max_utilization"] <= 0.8 + 1e-12
+    assert alloc["overloaded_modules"] == 0
+
+    # derating 越低，PSU 越多
+    assert psu.allocate_psus(result, derating=0.5)["total_n_psu"] >= n_psu
+    with pytest.raises(ValueError):
+        psu.allocate_psus(result, derating=0.0)
+
+
+def test_assignment_expands_every_module(param, result):
+    alloc = psu.allocate_psus(result)
+    a = psu.psu_assignment(result, alloc)
+    n_v, n_e = module_grid_shape(result)
+    n = int(result["n_module_per_receiver"])
+    assert a["module_psu"].shape == (n_v, n_e)
+    assert len(a["psu_hub"]) == alloc["total_n_psu"]
+
+    # 每片模組的 PSU 屬於它自己的 hub
+    module_id = np.arange(n_v * n_e).reshape(n_e, n_v).T
+    assert np.array_equal(a["psu_hub"][a["module_psu"]], module_id // n)
+
+    # 每台的負載 = 所接模組 + （hub 的第一台放得下時）hub 本身
+    row_power = module_channel_power(result).sum(axis=1) + module_system_power(result)
+    module_load = np.bincount(a["module_psu"].ravel(), weights=np.repeat(row_power[:, None], n_e, 1).ravel(),
+                              minlength=len(a["psu_hub"]))
+    extra = a["psu_load_W"] - module_load
+    assert np.allclose(extra[extra > 1e-9], hub_power_w(result))
+    assert (extra > 1e-9).sum() == a["psu_hub"].max() + 1
+    assert np.all(a["psu_load_W"] <= alloc["usable_W"] + 1e-9)
+    assert a["psu_modules"].sum() == n_v * n_e
+
+    table = psu.psu_table(a)
+    assert len(table) == alloc["total_n_psu"]
+
+
+def test_calculate_leaves_packing_to_with_psu(param, result):
+    # calculate 不做裝箱；with_psu 依 calculate 記錄的 derating 補上
+    assert "total_n_psu" not in result and result["psu_derating"] == param["psu_derating"]
+    alloc = psu.allocate_psus(result, derating=param["psu_derating"])
+    full = psu.with_psu(result)
+    assert full is not result and "total_n_psu" not in result
+    assert full["total_n_psu"] == alloc["total_n_psu"]
+    assert full["psu_max_utilization"] == alloc["max_utilization"]
+    assert psu.with_psu(full) is full
+    assert psu.with_psu(result, alloc) == full
+
+    low = calculate(dict(param, psu_derating=0.5))
+    assert psu.with_psu(low)["total_n_psu"] == psu.allocate_psus(low, derating=0.5)["total_n_psu"]
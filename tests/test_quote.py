@@ -0,0 +1,74 @@
+import io
+import os
+import re
+import numpy as np
+import pytest
+import quote
+from PIL import Image
+
+
+def _png(w, h, color):
+    buf = io.BytesIO()
+    Image.fromarray(np.full((h, w, 3), color, dtype=np.uint8)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def full_quote(param, result):
+    parts = {"LED": "no-such-part"}
+    return quote.build_quote("DOC_1", param, result, quote_parts=parts,
+                             figures=[_png(320, 240, 200), None, _png(200, 400, 50), _png(64, 64, 0)])
+
+
+def test_bom(full_quote, result, param):
+    led = full_quote["bom"][0]
+    assert led["item"] == "LED" and led["part_no"] != "no-such-part"
+    assert led["qty"] == int(result["total_n_led_kpcs"])
+    assert full_quote["bom_total"] == pytest.approx(sum(line["unit_price"] * line["qty"] for line in full_quote["bom"]))
+    assert quote.build_quote("DOC_2", param, result)["bom"] == []
+    assert len(full_quote["figures"]) == 3
+
+
+def test_xlsx_round_trip(full_quote):
+    from openpyxl import load_workbook
+
+    buf = io.BytesIO()
+    quote.write_quote_xlsx(full_quote, buf)
+    wb = load_workbook(io.BytesIO(buf.getvalue()))
+    assert wb.sheetnames == ["Specification", "BOM", "Figures"]
+
+    rows = list(wb["Specification"].iter_rows(values_only=True))
+    assert rows[1] == ("Document No.", "DOC_1")
+    assert [tuple(r) for r in rows[4:]] == [tuple(r) for r in full_quote["spec"]]
+
+    bom = list(wb["BOM"].iter_rows(values_only=True))
+    assert [r[1] for r in bom[1:1 + len(full_quote["bom"])]] == [line["part_no"] for line in full_quote["bom"]]
+    assert bom[-1][-1] == pytest.approx(full_quote["bom_total"])
+    assert len(wb["Figures"]._images) == 3
+
+
+def test_pdf_structure(full_quote):
+    buf = io.BytesIO()
+    quote.write_quote_pdf(full_quote, buf)
+    pdf = buf.getvalue()
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+
+    # xref 的每個 offset 都指向對應的 object
+    xref_pos = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n ", pdf[xref_pos:])
+    for oid, offset in enumerate(entries, start=1):
+        assert pdf[int(offset):].startswith(f"{oid} 0 obj".encode())
+
+    # 文字頁 + 圖頁（每頁兩張）
+    n_pages = int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", pdf).group(1))
+    assert n_pages == len(re.findall(rb"/Type /Page ", pdf))
+    assert len(re.findall(rb"/Subtype /Image", pdf)) == 3
+    assert n_pages >= 1 + 2
+    for label, _ in full_quote["spec"]:
+        escaped = label.encode("cp1252").replace(b"(", b"\\(").replace(b")", b"\\)")
+        assert b"(" + escaped + b") Tj" in pdf
+
+
+def test_export_quotes_writes_each_format(full_quote, tmp_path):
+    paths = list(quote.export_quotes(iter([full_quote]), str(tmp_path)))
+    assert sorted(os.path.basename(p) for p in paths) == ["DOC_1.pdf", "DOC_1.xlsx"]
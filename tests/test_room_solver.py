@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import room_solver
+from calculator import room_size
+
+
+def _room_size_scalar(diameter, fov_h, fov_v_n, fov_v_s, bottom):
+    # 向量化前的逐點公式
+    if fov_h <= 180:
+        w = diameter * math.sin(math.radians(fov_h / 2)) + 3000
+        l = diameter / 2 - diameter / 2 * math.cos(math.radians(fov_h / 2)) + 3000
+    else:
+        w = diameter + 3000
+        l = diameter / 2 + diameter / 2 * math.sin(math.radians((fov_h - 180) / 2)) + 3000
+    h = diameter / 2 * (math.sin(math.radians(fov_v_n)) + math.sin(math.radians(fov_v_s))) + 1500 + bottom
+    return w, l, h
+
+
+def test_room_size_vectorized_matches_scalar():
+    rng = np.random.default_rng(0)
+    d = rng.uniform(1000, 20000, 200)
+    fh = rng.uniform(10, 360, 200)
+    fvn = rng.uniform(0, 90, 200)
+    fvs = rng.uniform(0, 90, 200)
+    w, l, h = room_size(d, fh, fvn, fvs, 500.0)
+    for i in range(len(d)):
+        assert np.allclose((w[i], l[i], h[i]), _room_size_scalar(d[i], fh[i], fvn[i], fvs[i], 500.0))
+
+
+def test_solution_fits_and_is_near_largest(param):
+    room = (12000, 12000, 9000)
+    out = room_solver.solve_room(*room, 500, param, resolution_h=3840,
+                                 fov_h_options=(360.0,), fov_v_options=(90.0,))
+    best = out["pareto"][0]
+    assert best["room_size_w"] <= room[0] and best["room_size_l"] <= room[1] and best["room_size_h"] <= room[2]
+    # 再大 1% 就放不下（或無法計算）
+    _, r = room_solver._evaluate(best["diameter"] * 1.01, 360.0, best["fov_v_n"], best["fov_v_s"],
+                                 dict(param, bottom_edge_height=500.0), 3840, None)
+    assert r is None or not room_solver._fits(r, *room)
+
+
+def test_calculate_failures_are_not_treated_as_too_big(param, monkeypatch):
+    # 一段直徑 calculate 失敗（與房間無關）時，二分法不能把上界壓到那一段以下
+    evaluate = room_solver._evaluate
+
+    def flaky(d, *args):
+        p, r = evaluate(d, *args)
+        return (p, None) if 6000 <= d <= 8000 else (p, r)
+
+    monkeypatch.setattr(room_solver, "_evaluate", flaky)
+    out = room_solver.solve_room(12000, 12000, 9000, 500, param, resolution_h=3840,
+                                 fov_h_options=(360.0,), fov_v_options=(90.0,))
+    assert out["pareto"][0]["diameter"] > 8000
+
+
+def test_pareto_mask():
+    m = room_solver.pareto_mask([[1, 1], [2, 1], [1, 2], [0, 0], [2, 2]])
+    assert m.tolist() == [False, False, False, False, True]
+    assert room_solver.pareto_mask(np.zeros((0, 2))).tolist() == []
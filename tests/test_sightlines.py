@@ -0,0 +1,100 @@
+import io
+import math
+import numpy as np
+import pytest
+import sightlines
+
+
+def _brute_force(result, seats, bottom_edge_height, inward, max_angle_deg):
+    # 逐座位 × 逐模組直接以差向量計算
+    centers, normals, _, _ = sightlines.module_frame(result, bottom_edge_height, inward)
+    S, M = len(seats), len(centers)
+    angle = np.full((S, M), np.nan)
+    dist = np.zeros((S, M))
+    for i, s in enumerate(seats):
+        for j, (m, n) in enumerate(zip(centers, normals)):
+            d = s - m
+            dist[i, j] = math.sqrt(d @ d)
+            cos = (d @ n) / dist[i, j] if dist[i, j] > 0 else 0.0
+            if cos > 0:
+                angle[i, j] = math.degrees(math.acos(min(cos, 1.0)))
+    facing = ~np.isnan(angle)
+    ok = facing & (angle <= max_angle_deg + 1e-9)
+    return angle, dist, facing, ok
+
+
+@pytest.fixture
+def seats(result):
+    grid = sightlines.seat_grid(result, 500.0, spacing=700.0)
+    # 加幾個球外與貼近球面的位置
+    extra = np.array([[0.0, 0.0, 5000.0], [-2500.0, 300.0, 1200.0], [1400.0, 0.0, 900.0]])
+    return np.vstack([grid[::3], extra])
+
+
+@pytest.mark.parametrize("inward", [True, False])
+def test_matches_brute_force(result, seats, inward):
+    out = sightlines.analyze_sightlines(result, seats, 500.0, inward=inward, max_angle_deg=50.0)
+    angle, dist, facing, ok = _brute_force(result, seats, 500.0, inward, 50.0)
+    n_v, n_e = result["n_vertical_final"], result["n_equator_final"]
+    M = n_v * n_e
+    seen = facing.any(axis=0)
+
+    def grid(v):
+        return v.reshape(n_v, n_e)
+
+    assert np.array_equal(out["module_seats_facing"], grid(facing.sum(axis=0)))
+    assert np.array_equal(out["module_seats_within_limit"], grid(ok.sum(axis=0)))
+    worst = np.array([angle[facing[:, j], j].max() if seen[j] else np.nan for j in range(M)])
+    near = np.array([dist[facing[:, j], j].min() if seen[j] else np.nan for j in range(M)])
+    far = np.array([dist[facing[:, j], j].max() if seen[j] else np.nan for j in range(M)])
+    assert np.allclose(out["module_worst_angle_deg"], grid(worst), atol=1e-6, equal_nan=True)
+    assert np.allclose(out["module_min_distance_mm"], grid(near), equal_nan=True)
+    assert np.allclose(out["module_max_distance_mm"], grid(far), equal_nan=True)
+
+    assert np.allclose(out["seat_facing_ratio"], facing.sum(axis=1) / M)
+    assert np.allclose(out["seat_coverage"], ok.sum(axis=1) / M)
+    with np.errstate(invalid="ignore"):
+        mean = np.nansum(angle, axis=1) / np.where(facing.any(axis=1), facing.sum(axis=1), np.nan)
+    assert np.allclose(out["seat_mean_angle_deg"], mean, atol=1e-6, equal_nan=True)
+    nearest = np.array([dist[i, facing[i]].min() if facing[i].any() else np.nan for i in range(len(seats))])
+    assert np.allclose(out["seat_min_distance_mm"], nearest, equal_nan=True)
+
+    assert out["modules_unseen"] == int((~seen).sum())
+    assert out["modules_over_limit"] == int((seen & (ok.sum(axis=0) < facing.sum(axis=0))).sum())
+
+
+def test_chunking_does_not_change_results(result, seats):
+    whole = sightlines.analyze_sightlines(result, seats, 500.0)
+    tiny = sightlines.analyze_sightlines(result, seats, 500.0, chunk_bytes=1)
+    assert whole["chunk_seats"] >= len(seats) and tiny["chunk_seats"] == 1
+    # 矩陣乘法分塊不同只有捨入誤差；計數必須完全相同
+    for key, value in whole.items():
+        if key == "chunk_seats":
+            continue
+        if np.asarray(value).dtype.kind in "ib":
+            assert np.array_equal(value, tiny[key]), key
+        else:
+            assert np.allclose(value, tiny[key], rtol=1e-12, atol=1e-9, equal_nan=True), key
+
+
+def test_seat_grid_and_module_frame(result):
+    R = result["diameter_mm"] / 2
+    centers, normals, center, r = sightlines.module_frame(result, 500.0)
+    assert r == R and center[2] == pytest.approx(sightlines.sphere_center_z(result, 500.0))
+    assert np.allclose(np.linalg.norm(centers - center, axis=1), R)
+    assert np.allclose(centers + R * normals, center)     # 法線朝球心
+    assert centers[:, 2].min() > 500.0
+
+    inside = sightlines.seat_grid(result, 500.0, spacing=500.0, clearance=300.0)
+    outside = sightlines.seat_grid(result, 500.0, spacing=500.0, clearance=300.0, inward=False)
+    assert len(inside) and len(outside)
+    assert np.all(np.linalg.norm(inside - center, axis=1) <= R - 300.0)
+    assert np.all(np.linalg.norm(outside - center, axis=1) >= R + 300.0)
+    assert np.all(inside[:, 2] == sightlines.DEFAULT_EYE_HEIGHT)
+
+
+def test_load_seats():
+    assert sightlines.load_seats(io.StringIO("X,Y,Z\n1,2,3\n4,5,6\n")).tolist() == [[1, 2, 3], [4, 5, 6]]
+    assert sightlines.load_seats(io.StringIO("1,2,3\n4,5,6\n")).tolist() == [[1, 2, 3], [4, 5, 6]]
+    with pytest.raises(ValueError):
+        sightlines.load_seats(io.StringIO("x,y,z\n1,2,\n"))
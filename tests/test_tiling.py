@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+import tiling
+from calculator import calculate
+
+
+def _summary(name, param, result):
+    fn, _ = tiling.TILING_STRATEGIES[name]
+    return tiling.summarize_tiling(name, fn(param, result), param, result)
+
+
+@pytest.mark.parametrize("changes", [{}, {"diameter": 5000.0, "resolution_h": 7680}, {"fov_h": 360.0}])
+def test_meridian_reproduces_calculate(param, changes):
+    param = dict(param, **changes)
+    result = calculate(param)
+    s = _summary("meridian", param, result)
+    assert s["total_n_module"] == result["total_n_module"]
+    assert s["module_types"] == result["n_vertical_final"]
+    for key in ("total_n_led_kpcs", "total_n_pwm", "total_n_scan", "total_n_hub", "total_power_W"):
+        assert s[key] == pytest.approx(result[key]), key
+
+
+def test_tapered_matches_exact_mode(param, result):
+    exact = calculate(dict(param, led_count_mode="exact"))
+    s = _summary("tapered", param, result)
+    assert s["total_n_led_kpcs"] == pytest.approx(exact["total_n_led_kpcs"])
+    assert s["total_n_pwm"] == pytest.approx(exact["total_n_pwm"])
+
+
+def test_staggered_offsets_odd_rows(param, result):
+    layout = tiling.staggered(param, result)
+    n_v = result["n_vertical_final"]
+    n_e = result["n_equator_final"]
+    k = layout["px_per_module"] // (result["px_per_module_h"] * result["px_per_module_v"])
+    odd = np.arange(n_v) % 2 == 1
+    assert np.all(n_e % k == 0)
+    assert np.array_equal(layout["modules_per_row"], n_e // k - odd)
+    assert np.array_equal(layout["half_modules_per_row"], 2 * odd)
+    # 合併後每片不超過一張 receiver
+    assert np.all(layout["px_per_module"] <= result["receiver_capacity"])
+
+    s = tiling.summarize_tiling("staggered", layout, param, result)
+    meridian = _summary("meridian", param, result)
+    # 半片 = 半個 LED 數：LED 總數與 meridian 只差半片的四捨五入
+    assert s["total_n_led_kpcs"] == pytest.approx(meridian["total_n_led_kpcs"], rel=1e-3)
+    assert s["total_n_module"] == int((n_e // k).sum() + odd.sum())
+    # 半寬模組是另一種模組（只出現在錯開的列）
+    assert s["module_types"] == n_v + odd.sum()
+
+
+def test_staggered_full_ring_has_no_half_modules(param):
+    param = dict(param, fov_h=360.0)
+    result = calculate(param)
+    layout = tiling.staggered(param, result)
+    assert not layout["half_modules_per_row"].any()
+    k = layout["px_per_module"] // (result["px_per_module_h"] * result["px_per_module_v"])
+    assert np.array_equal(layout["modules_per_row"], result["n_equator_final"] // k)
+
+
+def test_banded_groups_rows_within_tolerance(param, result):
+    layout = tiling.banded(param, result)
+    width = tiling._pixel_row_counts(result).sum(axis=1)
+    row_type = layout["row_type"]
+    for t in np.unique(row_type):
+        members = width[row_type == t]
+        assert members.max() <= members.min() * (1 + tiling.BAND_PITCH_TOLERANCE)
+        # 每種模組依組內最窄列設計
+        assert np.all(layout["led_per_module"][row_type == t] == members.min())
+    assert 0 <= layout["max_pitch_deviation"] <= tiling.BAND_PITCH_TOLERANCE
+    assert len(np.unique(row_type)) < result["n_vertical_final"]
+
+    strict = tiling.banded(param, result, tolerance=0.0)
+    assert len(np.unique(strict["row_type"])) == len(np.unique(width))
+
+
+def test_evaluate_tilings_reports_errors_and_best(param, result, monkeypatch):
+    def broken(param, result):
+        raise RuntimeError("no layout")
+
+    monkeypatch.setitem(tiling.TILING_STRATEGIES, "broken", (broken, "always fails"))
+    out = tiling.evaluate_tilings(param, result)
+    by_name = {e["strategy"]: e for e in out["evaluations"]}
+    assert list(by_name) == list(tiling.TILING_STRATEGIES)
+    assert by_name["broken"]["error"] == "RuntimeError: no layout"
+    ok = [e for e in out["evaluations"] if "error" not in e]
+    assert out["best"] == min(ok, key=lambda e: e["build_hours"])["strategy"]
+
+    table = tiling.tiling_table(out)
+    assert (table["Strategy"] == out["best"] + " (fastest)").sum() == 1
+    assert table.loc[table["Strategy"] == "broken", "Note"].item() == "RuntimeError: no layout"
+
+    only = tiling.evaluate_tilings(param, strategies=["broken"])
+    assert only["best"] is None
+
+
+def test_rows_past_the_pole(param):
+    # fov_v_n_final 進位到 91.125°：越過極點的像素列 0 顆，不能把模組 LED 數拉低
+    param = dict(param, diameter=2000.0, fov_h=360.0, fov_v_n=88.0)
+    result = calculate(param)
+    assert result["fov_v_n_final"] > 90
+    counts = tiling._pixel_row_counts(result)
+    assert (counts >= 0).all() and (counts[0] == 0).any()
+
+    exact = calculate(dict(param, led_count_mode="exact"))
+    assert _summary("tapered", param, result)["total_n_led_kpcs"] == pytest.approx(exact["total_n_led_kpcs"])
+    layout = tiling.banded(param, result)
+    width = counts.sum(axis=1)
+    assert np.all(layout["led_per_module"] <= width)
+    assert 0 <= layout["max_pitch_deviation"] <= tiling.BAND_PITCH_TOLERANCE
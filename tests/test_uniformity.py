@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import pytest
+import uniformity
+from calculator import calculate
+
+
+def test_rows_cover_the_display_area(result):
+    u = uniformity.row_uniformity(result, 800.0)
+    n_v, n_e = result["n_vertical_final"], result["n_equator_final"]
+    area = np.asarray(result["n_module_led_counts"]) / u["density_px_m2"] * 1e6     # mm²
+    assert len(area) == n_v
+    assert area.sum() * n_e / 1e6 == pytest.approx(result["display_area"])
+
+
+def test_density_and_nits_follow_pitch(result):
+    u = uniformity.row_uniformity(result, 800.0)
+    pitch = result["pitch_mm"]
+    assert u["nominal_density_px_m2"] == pytest.approx(1e6 / pitch ** 2)
+    # 垂直方向沒有四捨五入：每列都是標稱 pitch
+    assert u["v_pitch_mm"] == pytest.approx(pitch)
+    # 水平 pitch 只差每圈半顆 LED 的四捨五入
+    half_led = pitch / 2 / np.asarray(result["horizontal_led_counts_upper"])
+    assert np.all(np.abs(u["h_pitch_top_mm"] - pitch) <= half_led + 1e-9)
+    assert np.allclose(u["density_ratio"], pitch ** 2 / (u["h_pitch_mm"] * u["v_pitch_mm"]))
+    assert np.allclose(u["nits"], 800.0 * u["density_ratio"])
+    assert u["min_nits"] <= 800.0 * 1.05 and u["max_nits"] >= 800.0 * 0.95
+    assert u["uniformity"] == pytest.approx(u["nits"].min() / u["nits"].max())
+
+
+def test_tolerance_flags_rows(result):
+    u = uniformity.row_uniformity(result, 800.0, tolerance=0.0)
+    deviation = np.abs(u["density_ratio"] - 1)
+    assert u["n_flagged"] == int((deviation > 0).sum())
+    threshold = float(np.median(deviation))
+    mid = uniformity.row_uniformity(result, 800.0, tolerance=threshold)
+    assert np.array_equal(mid["flagged"], deviation > threshold)
+    assert uniformity.row_uniformity(result, 800.0, tolerance=1.0)["n_flagged"] == 0
+
+    table = uniformity.uniformity_table(mid)
+    assert len(table) == result["n_vertical_final"]
+    assert (table["Out of Tolerance"] == "⚠️").sum() == mid["n_flagged"]
+
+
+def test_pole_row_has_no_top_pitch(param):
+    # 北緣剛好到極點：最上一圈 0 顆 LED → 該邊 pitch 為 NaN，表格顯示 —
+    result = calculate(dict(param, fov_v_n=89.0))
+    assert result["fov_v_n_final"] == pytest.approx(90.0)
+    u = uniformity.row_uniformity(result, 800.0)
+    assert result["horizontal_led_counts_upper"][0] == 0
+    assert math.isnan(u["h_pitch_top_mm"][0]) and not np.isnan(u["h_pitch_top_mm"][1:]).any()
+    assert uniformity.uniformity_table(u)["H Pitch Top / Bottom (mm)"][0].startswith("— / ")
+
+
+def test_module_nits(result):
+    u = uniformity.row_uniformity(result, 500.0)
+    grid = uniformity.module_nits(result, u)
+    assert grid.shape == (result["n_vertical_final"], result["n_equator_final"])
+    assert np.all(grid == u["nits"][:, None])
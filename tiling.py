@@ -0,0 +1,262 @@
+# tiling.py
+# 可替換的球面分割方式（tiling strategy）
+# 每個 strategy 回傳「每一列模組」的陣列（模組數、每片 LED 數、每片最寬像素列 LED 數、模組種類編號），
+# 可選：每片像素數（receiver 帶載，預設與 calculate 相同）、每列兩端的半片模組數（錯開的列）
+# 之後 LED / IC / 功耗 / hub / 施工工時的彙總全部共用同一套算法，彼此可直接比較
+# 新增方式：寫一個 (param, result) -> dict 的函式，加上 @register_tiling("name", "說明")
+import math
+import numpy as np
+import pandas as pd
+from calculator import calculate, ring_led_counts
+from catalog import led_package_for_pitch, default_part
+from hardware import modules_per_receiver
+
+TILING_STRATEGIES = {}
+
+# 施工工時估算（分鐘）：每片模組安裝、每種模組（分料 / 對位 / 備品）、每個 hub 配線
+BUILD_TIME_MIN = {
+    "per_module": 5.0,
+    "per_module_type": 45.0,
+    "per_hub": 8.0,
+}
+
+# banded：同一種模組套用到較窄列時，水平 pitch 容許放大的比例
+BAND_PITCH_TOLERANCE = 0.02
+
+
+def register_tiling(name, description):
+    def deco(fn):
+        TILING_STRATEGIES[name] = (fn, description)
+        return fn
+    return deco
+
+
+def _row_edges(result):
+    # 每列模組上下邊緣的緯度 (deg)，由北往南
+    n_v = int(result["n_vertical_final"])
+    apm_v = float(result["angle_per_module_v_deg"])
+    top = float(result["fov_v_n_final"]) - np.arange(n_v) * apm_v
+    return top, top - apm_v
+
+
+def _pixel_row_counts(result):
+    # (n_v, px_per_module_v)：每片模組（原本的 n_equator 等分）在各像素列的 LED 數
+    n_v = int(result["n_vertical_final"])
+    pxv = int(result["px_per_module_v"])
+    step = float(result["angle_per_module_v_deg"]) / pxv
+    lat = float(result["fov_v_n_final"]) - (np.arange(n_v * pxv) + 0.5) * step
+    counts = ring_led_counts(
+        float(result["diameter_mm"]), float(result["fov_h_deg"]), int(result["n_equator_final"]),
+        float(result["pitch_mm"]), lat,
+    )
+    return counts.reshape(n_v, pxv)
+
+
+@register_tiling("meridian", "Equal-width meridian modules (current layout)")
+def meridian(param, result):
+    n_v = int(result["n_vertical_final"])
+    upper = np.asarray(result["horizontal_led_counts_upper"], dtype=float)
+    lower = np.asarray(result["horizontal_led_counts_lower"], dtype=float)
+    return {
+        "modules_per_row": np.full(n_v, int(result["n_equator_final"])),
+        "led_per_module": np.asarray(result["n_module_led_counts"], dtype=float),
+        "max_pixel": np.maximum(upper, lower),
+        "row_type": np.arange(n_v),
+    }
+
+
+@register_tiling("tapered", "Tapered trapezoid modules (each pixel row follows its own circumference)")
+def tapered(param, result):
+    n_v = int(result["n_vertical_final"])
+    counts = _pixel_row_counts(result)
+    return {
+        "modules_per_row": np.full(n_v, int(result["n_equator_final"])),
+        "led_per_module": counts.sum(axis=1),
+        "max_pixel": counts.max(axis=1),
+        "row_type": np.arange(n_v),
+    }
+
+
+@register_tiling("staggered", "Staggered rows: modules merge toward the poles, odd rows offset by half a module")
+def staggered(param, result):
+    # 每列把 k = 2^j 片相鄰模組合成一片（寬度不超過模組寬度上限、像素不超過一張 receiver），
+    # 奇數列錯開半片：360° 整圈只是轉半片，片數不變；不滿一圈時兩端各多一片半寬模組（另一種模組）
+    n_v = int(result["n_vertical_final"])
+    n_e = int(result["n_equator_final"])
+    R = float(result["diameter_mm"]) / 2
+    top, bottom = _row_edges(result)
+    widest_lat = np.where(top * bottom <= 0, 0.0, np.minimum(np.abs(top), np.abs(bottom)))
+    module_w = 2 * np.pi * R * np.cos(np.deg2rad(widest_lat)) * float(result["fov_h_deg"]) / 360 / n_e
+
+    width_limit = min(
+        float(param["module_size_limit"]),
+        float(result["diameter_mm"]) * math.pi / (360 / float(param["module_angle_limit"])),
+    )
+    module_px = int(result["px_per_module_h"]) * int(result["px_per_module_v"])
+    k = np.ones(n_v, dtype=np.int64)
+    while True:
+        grow = (
+            (n_e % (k * 2) == 0)
+            & (module_w * k * 2 <= width_limit)
+            & (module_px * k * 2 <= int(result["receiver_capacity"]))
+        )
+        if not grow.any():
+            break
+        k = np.where(grow, k * 2, k)
+
+    full_ring = float(result["fov_h_deg"]) >= 360
+    offset = (np.arange(n_v) % 2 == 1) & (not full_ring)
+
+    base = meridian(param, result)
+    return {
+        # 錯開的列：整片少一片，兩端各一片半寬
+        "modules_per_row": n_e // k - offset,
+        "led_per_module": base["led_per_module"] * k,
+        "max_pixel": base["max_pixel"] * k,
+        "px_per_module": module_px * k,
+        "half_modules_per_row": 2 * offset,
+        "row_type": np.arange(n_v),
+    }
+
+
+@register_tiling("banded", "Latitude bands share one module type (mirror rows + pitch tolerance)")
+def banded(param, result, tolerance=BAND_PITCH_TOLERANCE):
+    # 依每片 LED 數（= 平均水平密度）由多到少排序，多/少 ≤ 1 + tolerance 的列歸同一種
+    # 模組依該組最少的列設計（其餘列水平 pitch 略放大）；南北對稱的列 LED 數相同，自然同組
+    n_v = int(result["n_vertical_final"])
+    counts = _pixel_row_counts(result)
+    width = counts.sum(axis=1)
+    order = np.argsort(-width, kind="stable")
+
+    row_type = np.empty(n_v, dtype=np.int64)
+    band_start = 0
+    band = 0
+    for pos, r in enumerate(order):
+        if width[order[band_start]] > width[r] * (1 + tolerance):
+            band += 1
+            band_start = pos
+        row_type[r] = band
+
+    # 每種模組 = 該組最窄列
+    design = np.zeros(band + 1, dtype=np.int64)
+    for t in range(band + 1):
+        members = np.flatnonzero(row_type == t)
+        design[t] = members[np.argmin(width[members])]
+    rep = design[row_type]
+    return {
+        "modules_per_row": np.full(n_v, int(result["n_equator_final"])),
+        "led_per_module": counts[rep].sum(axis=1),
+        "max_pixel": counts[rep].max(axis=1),
+        "row_type": row_type,
+        "max_pitch_deviation": float(np.max(width / np.maximum(width[rep], 1)) - 1),
+    }
+
+
+def summarize_tiling(name, layout, param, result):
+    # LED / IC / 功耗彙總（公式與 calculate 相同，只是以列為單位）
+    pitch = float(result["pitch_mm"])
+    dg = float(result["data_groups_per_module"])
+    max_scan = int(result["max_scan"])
+    threshold = float(param["channel_threshold_for_double_scan"])
+
+    n_full = np.asarray(layout["modules_per_row"], dtype=float)
+    n_half = np.asarray(layout.get("half_modules_per_row", np.zeros(len(n_full))), dtype=float)
+    led_full = np.asarray(layout["led_per_module"], dtype=float)
+    max_pixel_full = np.asarray(layout["max_pixel"], dtype=float)
+    px_full = np.broadcast_to(
+        np.asarray(layout.get("px_per_module", int(result["px_per_module_h"]) * int(result["px_per_module_v"]))),
+        n_full.shape,
+    )
+
+    # 整片 + 半片（兩端）串成同一組陣列再彙總
+    n_row = np.concatenate([n_full, n_half])
+    led = np.concatenate([led_full, np.round(led_full / 2)])
+    max_pixel = np.concatenate([max_pixel_full, np.ceil(max_pixel_full / 2)])
+    px = np.concatenate([px_full, np.ceil(px_full / 2)])
+
+    pwm = np.ceil(max_pixel / 16) * 3 * dg
+    scan = math.ceil(max_scan / 8) * np.where(max_pixel <= threshold, 1, 2) * dg
+
+    total_n_module = int(n_row.sum())
+    total_n_led = float((led * n_row).sum())
+    total_n_pwm = float((pwm * n_row).sum())
+    total_n_scan = float((scan * n_row).sum())
+    # hub 數與 calculate 相同算法：模組數 / 每張 receiver 帶的片數（依每片像素數）
+    total_n_hub = float((n_row / modules_per_receiver(px, int(result["receiver_capacity"]))).sum())
+    row_type = np.asarray(layout["row_type"])
+    module_types = int(len(np.unique(row_type)) + len(np.unique(row_type[n_half > 0])))
+
+    led_power_per_led = float(result["LED_power_W"]) / max(float(result["total_n_led_kpcs"]) * 1000, 1e-12)
+    gb_v = led_package_for_pitch(pitch)["vf_gb"]
+    system_power = (
+        total_n_pwm * default_part("pwm_ic", pitch)["current_A"]
+        + total_n_scan * default_part("scan_ic", pitch)["current_A"]
+    ) * gb_v + total_n_hub * default_part("hub", pitch)["power_W"]
+    total_power = (total_n_led * led_power_per_led + system_power) * 1.2
+
+    build_min = (
+        total_n_module * BUILD_TIME_MIN["per_module"]
+        + module_types * BUILD_TIME_MIN["per_module_type"]
+        + total_n_hub * BUILD_TIME_MIN["per_hub"]
+    )
+
+    return {
+        "strategy": name,
+        "description": TILING_STRATEGIES[name][1],
+        "module_types": module_types,
+        "total_n_module": total_n_module,
+        "total_n_led_kpcs": total_n_led / 1000,
+        "total_n_pwm": total_n_pwm,
+        "total_n_scan": total_n_scan,
+        "total_n_hub": total_n_hub,
+        "total_power_W": total_power / 1000,   # kW，與 calculate 的 total_power_W 相同單位
+        "build_hours": build_min / 60,
+        "max_pitch_deviation": float(layout.get("max_pitch_deviation", 0.0)),
+        "modules_per_row": np.asarray(layout["modules_per_row"]).tolist(),
+        "row_type": np.asarray(layout["row_type"]).tolist(),
+    }
+
+
+def _evaluate_one(task):
+    name, param, result = task
+    fn, _ = TILING_STRATEGIES[name]
+    try:
+        return summarize_tiling(name, fn(param, result), param, result)
+    except Exception as e:
+        return {"strategy": name, "error": f"{type(e).__name__}: {e}"}
+
+
+def evaluate_tilings(param, result=None, strategies=None):
+    # 所有 strategy 依序評估，回傳 {"evaluations", "best"}；best = 施工工時最短者
+    # 每個 strategy 只是幾個以列為單位的陣列運算（毫秒級），送進 process pool 的 pickle / 啟動成本反而更高
+    # best 只是比較用的標籤：calculate、BOM、報價單仍以 meridian 分割計算
+    if result is None:
+        result = calculate(param)
+    names = list(strategies or TILING_STRATEGIES.keys())
+    evaluations = [_evaluate_one((name, param, result)) for name in names]
+
+    ok = [e for e in evaluations if "error" not in e]
+    best = min(ok, key=lambda e: e["build_hours"])["strategy"] if ok else None
+    return {"evaluations": evaluations, "best": best}
+
+
+def tiling_table(tilings):
+    rows = []
+    for e in tilings["evaluations"]:
+        if "error" in e:
+            rows.append({"Strategy": e["strategy"], "Note": e["error"]})
+            continue
+        rows.append({
+            "Strategy": e["strategy"] + (" (fastest)" if e["strategy"] == tilings["best"] else ""),
+            "Module Types": e["module_types"],
+            "Module Qty": e["total_n_module"],
+            "LED (kpcs)": round(e["total_n_led_kpcs"], 1),
+            "PWM IC": int(e["total_n_pwm"]),
+            "SCAN IC": int(e["total_n_scan"]),
+            "Hub Qty": int(math.ceil(e["total_n_hub"])),
+            "Total Power (kW)": round(e["total_power_W"], 2),
+            "Build Time (h)": round(e["build_hours"], 1),
+            "Max Pitch Deviation (%)": round(e["max_pitch_deviation"] * 100, 2),
+            "Note": e["description"],
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,80 @@
+# uniformity.py
+# 每列模組的實際 pitch / 像素密度 / 預期亮度
+# 水平 LED 數四捨五入 → 每一圈的實際水平 pitch 都和標稱 pitch 不同；
+# 驅動電流是依標稱 pitch 算出目標亮度（calculate），所以亮度 ∝ 實際像素密度 / 標稱密度
+# 模組面積用球面帶的精確面積：R² · Δlon · (sin(lat_top) - sin(lat_bottom))
+# 全部以列為單位的陣列運算（n_vertical_final 個元素），每次 Calculate 都可以跑
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOLERANCE = 0.05
+
+
+def row_uniformity(result, luminance, tolerance=DEFAULT_TOLERANCE):
+    # 回傳每列（由北往南）的陣列 + 摘要；tolerance = 像素密度（亮度）相對標稱值的容許偏差
+    n_v = int(result["n_vertical_final"])
+    R = float(result["diameter_mm"]) / 2
+    pitch = float(result["pitch_mm"])
+    pxv = int(result["px_per_module_v"])
+    dlon = np.deg2rad(float(result["angle_per_module_h_deg"]))
+    apm_v = float(result["angle_per_module_v_deg"])
+
+    top = np.deg2rad(float(result["fov_v_n_final"]) - np.arange(n_v) * apm_v)
+    bottom = top - np.deg2rad(apm_v)
+    area = R * R * dlon * (np.sin(top) - np.sin(bottom))        # mm²
+
+    led = np.asarray(result["n_module_led_counts"], dtype=float)
+    upper = np.asarray(result["horizontal_led_counts_upper"], dtype=float)
+    lower = np.asarray(result["horizontal_led_counts_lower"], dtype=float)
+
+    v_pitch = R * np.deg2rad(apm_v) / pxv
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_pitch = np.where(led > 0, area / (led * v_pitch), np.nan)
+        h_pitch_top = np.where(upper > 0, R * np.cos(top) * dlon / upper, np.nan)
+        h_pitch_bottom = np.where(lower > 0, R * np.cos(bottom) * dlon / lower, np.nan)
+
+    density = led / area * 1e6                  # px / m²
+    nominal_density = 1e6 / (pitch * pitch)
+    ratio = density / nominal_density
+    nits = float(luminance) * ratio
+    flagged = np.abs(ratio - 1) > tolerance
+
+    return {
+        "tolerance": float(tolerance),
+        "nominal_pitch_mm": pitch,
+        "nominal_density_px_m2": nominal_density,
+        "v_pitch_mm": v_pitch,
+        "h_pitch_mm": h_pitch,
+        "h_pitch_top_mm": h_pitch_top,
+        "h_pitch_bottom_mm": h_pitch_bottom,
+        "density_px_m2": density,
+        "density_ratio": ratio,
+        "nits": nits,
+        "flagged": flagged,
+        "n_flagged": int(flagged.sum()),
+        "min_nits": float(nits.min()),
+        "max_nits": float(nits.max()),
+        "uniformity": float(nits.min() / nits.max()) if nits.max() > 0 else float("nan"),
+    }
+
+
+def module_nits(result, uniformity):
+    # (n_v, n_e)：同一列模組相同，給 make_sphere_fig(face_values=...) 疊在球面上
+    n_e = int(result["n_equator_final"])
+    return np.repeat(uniformity["nits"][:, None], n_e, axis=1)
+
+
+def uniformity_table(uniformity):
+    n_v = len(uniformity["nits"])
+    return pd.DataFrame({
+        "Row": np.arange(1, n_v + 1),
+        "H Pitch (mm)": np.round(uniformity["h_pitch_mm"], 4),
+        "H Pitch Top / Bottom (mm)": [
+            " / ".join("—" if np.isnan(v) else f"{v:.4f}" for v in pair)
+            for pair in zip(uniformity["h_pitch_top_mm"], uniformity["h_pitch_bottom_mm"])
+        ],
+        "Density (px/m²)": np.round(uniformity["density_px_m2"], 0),
+        "Density vs Nominal (%)": np.round((uniformity["density_ratio"] - 1) * 100, 2),
+        "Expected Nits": np.round(uniformity["nits"], 1),
+        "Out of Tolerance": np.where(uniformity["flagged"], "⚠️", ""),
+    })
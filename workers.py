@@ -0,0 +1,65 @@
+# workers.py
+# 共用的 spawn process pool（compare / animation / jobs）
+# Streamlit 把 app.py 掛成 sys.modules["__main__"]；multiprocessing 的 spawn 會把 __main__ 的路徑傳給子 process，
+# 子 process 啟動時以 __mp_main__ 重新執行整個 app.py（metrics server、job runner、atlas …）
+# 這裡的 worker 一律以 WORKER_PREFIX 命名，送給它們的 preparation data 不帶 __main__：
+# worker 只 import 送進來的函式所在的 module（都是可 import 的 module，不能是 app.py 裡的函式）。
+# 不替換全域的 sys.modules["__main__"]，其他 session 的 thread 看不到任何變化
+# 工作一律經 submit() 送出：worker 內的計時（metrics histogram）隨結果傳回，由主 process 記錄；結果用 unwrap() 取出
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import context, spawn
+from metrics import capture_observations, record_observations
+
+WORKER_PREFIX = "led-sphere-worker"
+
+# Streamlit 重新載入 module 時仍包在原本的函式外面，不會一層層疊加
+_preparation_data = getattr(spawn.get_preparation_data, "__wrapped__", spawn.get_preparation_data)
+
+
+def _worker_preparation_data(name):
+    data = _preparation_data(name)
+    if name.startswith(WORKER_PREFIX):
+        data.pop("init_main_from_path", None)
+        data.pop("init_main_from_name", None)
+    return data
+
+
+_worker_preparation_data.__wrapped__ = _preparation_data
+spawn.get_preparation_data = _worker_preparation_data
+
+
+class WorkerProcess(context.SpawnProcess):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = f"{WORKER_PREFIX}-{self.name}"
+
+
+class WorkerContext(context.SpawnContext):
+    Process = WorkerProcess
+
+
+def init_worker():
+    # 預先載入 matplotlib，第一張圖不必等 import
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+
+def make_pool(max_workers=None, initializer=init_worker):
+    # spawn 較安全：不 fork Streamlit 的 thread
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=WorkerContext(),
+        initializer=initializer,
+    )
+
+
+def submit(pool, fn, *args):
+    return pool.submit(capture_observations, fn, *args)
+
+
+def unwrap(future, timeout=None):
+    # 取出結果，同時記錄 worker 傳回的觀測值（在呼叫端 thread 記錄，取得結果時計時已經可見）
+    result, observations = future.result(timeout)
+    record_observations(observations)
+    return result